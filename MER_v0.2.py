@@ -20,23 +20,224 @@ Cambios v0.1 → v0.2:
 """
 
 import hashlib
+import importlib
 import json
+import os
+import re
+import struct
+import threading
 import time
+import zlib
+from collections import Counter, OrderedDict
+from collections.abc import MutableMapping
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
 from typing import List, Dict, Set, Optional
-import numpy as np
 
 # ============= DEPENDENCIAS =============
 # pip install ollama numpy
 # Requiere: ollama serve + nomic-embed-text instalado
 # ollama pull nomic-embed-text
+#
+# numpy y ollama se importan al primer uso, no al importar el módulo:
+# leer o exportar semillas de texto no paga su arranque (~100 ms de
+# numpy en el Mac, bastante más en el Redmi).
 
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
-    print("AVISO: ollama no disponible. Usando extracción de conceptos básica.")
+
+class _ModuloDiferido:
+    """
+    Importa el módulo `nombre` al primer acceso a uno de sus atributos y
+    se reemplaza por él en la global `alias`: los accesos siguientes
+    (bucles de recall) no pasan por __getattr__.
+    """
+
+    def __init__(self, nombre: str, alias: str):
+        self._nombre = nombre
+        self._alias = alias
+
+    def __getattr__(self, atributo):
+        modulo = importlib.import_module(self._nombre)
+        globals()[self._alias] = modulo
+        return getattr(modulo, atributo)
+
+
+np = _ModuloDiferido("numpy", "np")
+
+_ollama = None
+_ollama_probado = False
+
+
+def ollama_disponible() -> bool:
+    """Importa el cliente ollama la primera vez; avisa una sola vez si falta."""
+    global _ollama, _ollama_probado
+    if not _ollama_probado:
+        try:
+            import ollama
+            _ollama = ollama
+        except ImportError:
+            print("AVISO: ollama no disponible. Usando extracción de conceptos básica.")
+        _ollama_probado = True
+    return _ollama is not None
+
+
+# ============= CODEC BINARIO DE SEMILLAS =============
+# Formato compacto equivalente a las semillas de texto (to_seed/from_seed):
+#   - IDs truncados de ancho fijo: 8 hex → 4 bytes, 16 hex → 8 bytes
+#   - Valencia y pesos cuantizados a 2 decimales (int8/uint8), igual
+#     precisión que el texto, por lo que ambos formatos son intercambiables
+#   - Bloque opcional de embedding en int8 (con escala) o float16
+#   - Cuerpo comprimido con zlib (esencias y tokens son texto natural)
+
+_ID_BYTES = 4          # concept_id[:8]
+_HASH_BYTES = 8        # context_hash[:16] / dian_attribution_hash[:16]
+_ESCALA_Q = 100        # 2 decimales, como f"{v:.2f}"
+
+_EMB_NINGUNO = 0
+_EMB_INT8 = 1
+_EMB_FLOAT16 = 2
+_EMB_FLOAT32 = 3          # sin pérdida, solo para el almacén en disco
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_CONEXION = struct.Struct(f"<{_ID_BYTES}sB")
+_CONCEPTO = struct.Struct(f"<{_ID_BYTES}sbH")
+_EPISODIO = struct.Struct(f"<{_ID_BYTES}sdbHB")
+_EMB_CABECERA = struct.Struct("<BH")
+_EMB_ESCALA = struct.Struct("<f")
+
+MAGIC_BINARIO = b"MERB"
+VERSION_BINARIO = 1
+_FLAG_ZLIB = 0x01
+_CABECERA = struct.Struct("<4sBBdIII")
+
+
+def _cuantizar(valor: float, minimo: int, maximo: int) -> int:
+    """Cuantiza a 2 decimales con el mismo redondeo que f'{v:.2f}'."""
+    return max(minimo, min(maximo, round(round(valor, 2) * _ESCALA_Q)))
+
+
+def _id_a_bytes(identificador: str, n_bytes: int) -> bytes:
+    """Trunca un ID hexadecimal a ancho fijo (n_bytes)."""
+    try:
+        return bytes.fromhex(identificador[:n_bytes * 2].ljust(n_bytes * 2, "0"))
+    except ValueError:
+        raise ValueError(f"ID no hexadecimal, no codificable: {identificador!r}")
+
+
+def _texto_a_bytes(texto: str) -> bytes:
+    datos = texto.encode("utf-8")
+    return _U16.pack(len(datos)) + datos
+
+
+def _leer_texto(datos: bytes, offset: int) -> tuple:
+    (longitud,) = _U16.unpack_from(datos, offset)
+    offset += _U16.size
+    return datos[offset:offset + longitud].decode("utf-8"), offset + longitud
+
+
+def _codificar_embedding(embedding: Optional[List[float]],
+                         dtype: Optional[str]) -> bytes:
+    """Bloque de embedding: tipo(1) + dimensión(2) [+ escala(4)] + datos."""
+    if embedding is None or dtype is None:
+        return _U8.pack(_EMB_NINGUNO)
+    vec = np.asarray(embedding, dtype=np.float32)
+    if dtype == "float16":
+        return (_EMB_CABECERA.pack(_EMB_FLOAT16, len(vec))
+                + vec.astype("<f2").tobytes())
+    if dtype == "float32":
+        return (_EMB_CABECERA.pack(_EMB_FLOAT32, len(vec))
+                + vec.astype("<f4").tobytes())
+    if dtype == "int8":
+        escala = float(np.max(np.abs(vec))) / 127 if len(vec) else 0.0
+        escala = escala or 1.0
+        cuant = np.clip(np.round(vec / escala), -127, 127).astype(np.int8)
+        return (_EMB_CABECERA.pack(_EMB_INT8, len(vec))
+                + _EMB_ESCALA.pack(escala) + cuant.tobytes())
+    raise ValueError(f"dtype de embedding no soportado: {dtype}")
+
+
+def _leer_embedding(datos: bytes, offset: int) -> tuple:
+    (tipo,) = _U8.unpack_from(datos, offset)
+    if tipo == _EMB_NINGUNO:
+        return None, offset + _U8.size
+    _, dim = _EMB_CABECERA.unpack_from(datos, offset)
+    offset += _EMB_CABECERA.size
+    if tipo == _EMB_FLOAT16:
+        vec = np.frombuffer(datos, dtype="<f2", count=dim, offset=offset)
+        return vec.astype(np.float32).tolist(), offset + dim * 2
+    if tipo == _EMB_FLOAT32:
+        vec = np.frombuffer(datos, dtype="<f4", count=dim, offset=offset)
+        return vec.tolist(), offset + dim * 4
+    if tipo == _EMB_INT8:
+        (escala,) = _EMB_ESCALA.unpack_from(datos, offset)
+        offset += _EMB_ESCALA.size
+        vec = np.frombuffer(datos, dtype=np.int8, count=dim, offset=offset)
+        return (vec.astype(np.float32) * escala).tolist(), offset + dim
+    raise ValueError(f"Tipo de embedding desconocido: {tipo}")
+
+
+# ============= EXTRACCIÓN LOCAL (TF-IDF) =============
+
+_TOKEN = re.compile(r"\w{4,}")
+
+
+def _tfidf_sentence_scores(sentences: List[str]) -> "np.ndarray":
+    """
+    Puntaje TF-IDF por oración (cada oración es un documento).
+    Vectorizado: un solo diccionario de términos y bincount sobre los
+    pares (oración, término), normalizado por sqrt(nº de tokens).
+    """
+    vocab: Dict[str, int] = {}
+    sent_idx, term_idx, longitudes = [], [], []
+    for i, sentence in enumerate(sentences):
+        tokens = _TOKEN.findall(sentence.lower())
+        longitudes.append(len(tokens))
+        sent_idx.extend([i] * len(tokens))
+        term_idx.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+
+    n = len(sentences)
+    if not vocab:
+        return np.zeros(n)
+    pares, tf = np.unique(np.asarray(sent_idx, dtype=np.int64) * len(vocab)
+                          + np.asarray(term_idx, dtype=np.int64),
+                          return_counts=True)
+    oracion, termino = np.divmod(pares, len(vocab))
+    df = np.bincount(termino, minlength=len(vocab))
+    idf = np.log((1 + n) / (1 + df)) + 1.0
+    scores = np.bincount(oracion, weights=tf * idf[termino], minlength=n)
+    return scores / np.sqrt(np.maximum(np.asarray(longitudes), 1))
+
+
+_PUNTUACION = '.,;:!?()[]"\'«»¿¡'
+
+
+def _select_trigger_phrases(text: str, k: int = 5) -> List[str]:
+    """
+    Selección de frases gatillo en tiempo lineal.
+
+    Una sola pasada cuenta todas las ventanas de 3 palabras; candidatas
+    son las de más de 15 caracteres que aparecen como máximo 2 veces
+    (mismo criterio que v0.2). Puntaje: palabras alfabéticas de 4+
+    letras dividido por la frecuencia — frases informativas y raras;
+    a igual puntaje gana la primera aparición, como en v0.2.
+    Retorna las k mejores en orden de aparición.
+    """
+    words = text.split()
+    ngrams = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)]
+    frecuencia = Counter(ngrams)
+
+    candidatas = {}            # frase → (puntaje, primera posición)
+    for posicion, phrase in enumerate(ngrams):
+        if phrase in candidatas or len(phrase) <= 15 or frecuencia[phrase] > 2:
+            continue
+        contenido = sum(1 for w in phrase.split()
+                        if len(w) > 3 and w.strip(_PUNTUACION).isalpha())
+        candidatas[phrase] = (contenido / frecuencia[phrase], posicion)
+
+    mejores = sorted(candidatas.items(), key=lambda c: (-c[1][0], c[1][1]))[:k]
+    return [phrase for phrase, _ in sorted(mejores, key=lambda c: c[1][1])]
 
 
 # ============= COMPONENTES FUNDAMENTALES =============
@@ -101,6 +302,44 @@ class ConceptNode:
                     node.connections[cid] = float(weight)
         return node
 
+    def to_binary_seed(self, embedding_dtype: Optional[str] = None) -> bytes:
+        """
+        Semilla binaria equivalente a to_seed().
+        embedding_dtype: None | "int8" | "float16"
+        """
+        top_conns = sorted(
+            self.connections.items(), key=lambda x: x[1], reverse=True
+        )[:3]
+        essence = self.essence[:80].encode("utf-8")
+        partes = [
+            _CONCEPTO.pack(_id_a_bytes(self.concept_id, _ID_BYTES),
+                           _cuantizar(self.valence, -127, 127), len(essence)),
+            essence,
+            _U8.pack(len(top_conns)),
+        ]
+        for cid, w in top_conns:
+            partes.append(_CONEXION.pack(_id_a_bytes(cid, _ID_BYTES),
+                                         _cuantizar(w, 0, 255)))
+        partes.append(_codificar_embedding(self.embedding, embedding_dtype))
+        return b"".join(partes)
+
+    @staticmethod
+    def from_binary_seed(data: bytes, offset: int = 0) -> tuple:
+        """Reconstruye nodo desde semilla binaria. Retorna (nodo, offset)."""
+        cid, valence, n_essence = _CONCEPTO.unpack_from(data, offset)
+        offset += _CONCEPTO.size
+        essence = data[offset:offset + n_essence].decode("utf-8")
+        offset += n_essence
+        node = ConceptNode(cid.hex(), essence, valence / _ESCALA_Q)
+        (n_conns,) = _U8.unpack_from(data, offset)
+        offset += _U8.size
+        for _ in range(n_conns):
+            other, weight = _CONEXION.unpack_from(data, offset)
+            offset += _CONEXION.size
+            node.connections[other.hex()] = weight / _ESCALA_Q
+        node.embedding, offset = _leer_embedding(data, offset)
+        return node, offset
+
 
 class TriggerToken:
     """
@@ -152,6 +391,28 @@ class TriggerToken:
             context_hash=parts[2]
         )
 
+    def to_binary_seed(self, embedding_dtype: Optional[str] = None) -> bytes:
+        linked = [c for c in self.linked_concepts if c]
+        partes = [_texto_a_bytes(self.token), _U16.pack(len(linked))]
+        partes.extend(_id_a_bytes(c, _ID_BYTES) for c in linked)
+        partes.append(_id_a_bytes(self.context_hash, _HASH_BYTES))
+        partes.append(_codificar_embedding(self.embedding, embedding_dtype))
+        return b"".join(partes)
+
+    @staticmethod
+    def from_binary_seed(data: bytes, offset: int = 0) -> tuple:
+        token, offset = _leer_texto(data, offset)
+        (n_linked,) = _U16.unpack_from(data, offset)
+        offset += _U16.size
+        linked = []
+        for _ in range(n_linked):
+            linked.append(data[offset:offset + _ID_BYTES].hex())
+            offset += _ID_BYTES
+        context_hash = data[offset:offset + _HASH_BYTES].hex()
+        offset += _HASH_BYTES
+        embedding, offset = _leer_embedding(data, offset)
+        return TriggerToken(token, linked, context_hash, embedding), offset
+
 
 class MemoryEpisode:
     """
@@ -206,6 +467,447 @@ class MemoryEpisode:
         episode.concept_nodes = parts[4].split(",") if len(parts) > 4 else []
         return episode
 
+    def to_binary_seed(self) -> bytes:
+        concepts = [c for c in self.concept_nodes[:10] if c]
+        partes = [
+            _EPISODIO.pack(_id_a_bytes(self.episode_id, _ID_BYTES),
+                           self.timestamp,
+                           _cuantizar(self.emotional_signature, -127, 127),
+                           _cuantizar(self.complexity_score, 0, 65535),
+                           len(concepts)),
+        ]
+        partes.extend(_id_a_bytes(c, _ID_BYTES) for c in concepts)
+        if self.dian_attribution_hash:
+            partes.append(_U8.pack(1))
+            partes.append(_id_a_bytes(self.dian_attribution_hash, _HASH_BYTES))
+        else:
+            partes.append(_U8.pack(0))
+        return b"".join(partes)
+
+    @staticmethod
+    def from_binary_seed(data: bytes, offset: int = 0) -> tuple:
+        eid, ts, emotional, complexity, n_concepts = _EPISODIO.unpack_from(data, offset)
+        offset += _EPISODIO.size
+        concepts = []
+        for _ in range(n_concepts):
+            concepts.append(data[offset:offset + _ID_BYTES].hex())
+            offset += _ID_BYTES
+        (tiene_dian,) = _U8.unpack_from(data, offset)
+        offset += _U8.size
+        dian_hash = None
+        if tiene_dian:
+            dian_hash = data[offset:offset + _HASH_BYTES].hex()
+            offset += _HASH_BYTES
+        episode = MemoryEpisode(eid.hex(), ts, dian_hash)
+        episode.emotional_signature = emotional / _ESCALA_Q
+        episode.complexity_score = complexity / _ESCALA_Q
+        episode.concept_nodes = concepts
+        return episode, offset
+
+
+# ============= ALMACÉN PERSISTENTE EN DISCO =============
+# Backend opcional para nodos con poca RAM (Redmi 8GB). Estructura:
+#   conceptos.log  — registro append-only de nodos (la última versión gana)
+#   conceptos.idx  — tabla hash memory-mapped: clave → (offset, longitud)
+#   triggers.log   — append-only, se carga completo al primer acceso
+#   episodios.log  — append-only, se carga completo al primer acceso
+#   estado.json    — session_id y timestamp actuales
+# Abrir el almacén es O(1): solo se mapea el índice. Cada concepto se lee
+# del log la primera vez que se accede a él.
+
+_IDX_MAGIC = b"MERIDX01"
+_IDX_CABECERA = struct.Struct("<8sQQ")           # magic, capacidad, ocupados
+_IDX_SLOT = [("clave", "<u8"), ("offset", "<u8"),     # dtype estructurado de numpy
+             ("longitud", "<u4"), ("_relleno", "<u4")]
+_IDX_SLOT_BYTES = struct.calcsize("<QQII")
+_IDX_BORRADO = 0xFFFFFFFFFFFFFFFF                # offset de slot eliminado
+_IDX_CARGA_MAX = 0.7
+_IDX_CAPACIDAD_INICIAL = 1024
+_CACHE_LOTE = 256                                # nodos que se expulsan de una vez
+
+_MARCO = struct.Struct("<I")                     # longitud de cada registro
+_F64 = struct.Struct("<d")
+_U32 = struct.Struct("<I")
+_REG_CONCEPTO = struct.Struct("<dIdI")   # valence, activaciones, última, n_conexiones
+_REG_EPISODIO = struct.Struct("<dddH")   # timestamp, emocional, complejidad, n_conceptos
+
+
+def _clave_concepto(concept_id: str) -> int:
+    """Clave de 64 bits para el índice (0 reservado para slot vacío)."""
+    digest = hashlib.blake2b(concept_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _concepto_a_registro(node: ConceptNode) -> bytes:
+    """Registro sin pérdida (IDs completos, todas las conexiones, float32)."""
+    partes = [
+        _texto_a_bytes(node.concept_id),
+        _texto_a_bytes(node.essence),
+        _REG_CONCEPTO.pack(node.valence, node.activation_count,
+                           node.last_activation, len(node.connections)),
+    ]
+    for cid, peso in node.connections.items():
+        partes.append(_texto_a_bytes(cid))
+        partes.append(_F64.pack(peso))
+    partes.append(_codificar_embedding(node.embedding, "float32"))
+    return b"".join(partes)
+
+
+def _registro_a_concepto(datos: bytes) -> ConceptNode:
+    concept_id, offset = _leer_texto(datos, 0)
+    essence, offset = _leer_texto(datos, offset)
+    valence, activaciones, ultima, n_conexiones = \
+        _REG_CONCEPTO.unpack_from(datos, offset)
+    offset += _REG_CONCEPTO.size
+    node = ConceptNode(concept_id, essence, valence)
+    node.activation_count = activaciones
+    node.last_activation = ultima
+    for _ in range(n_conexiones):
+        cid, offset = _leer_texto(datos, offset)
+        (node.connections[cid],) = _F64.unpack_from(datos, offset)
+        offset += _F64.size
+    node.embedding, _ = _leer_embedding(datos, offset)
+    return node
+
+
+def _trigger_a_registro(trigger: TriggerToken) -> bytes:
+    partes = [_texto_a_bytes(trigger.token), _U16.pack(len(trigger.linked_concepts))]
+    partes.extend(_texto_a_bytes(c) for c in trigger.linked_concepts)
+    partes.append(_texto_a_bytes(trigger.context_hash))
+    partes.append(_codificar_embedding(trigger.embedding, "float32"))
+    return b"".join(partes)
+
+
+def _registro_a_trigger(datos: bytes) -> TriggerToken:
+    token, offset = _leer_texto(datos, 0)
+    (n_linked,) = _U16.unpack_from(datos, offset)
+    offset += _U16.size
+    linked = []
+    for _ in range(n_linked):
+        cid, offset = _leer_texto(datos, offset)
+        linked.append(cid)
+    context_hash, offset = _leer_texto(datos, offset)
+    embedding, _ = _leer_embedding(datos, offset)
+    return TriggerToken(token, linked, context_hash, embedding)
+
+
+def _episodio_a_registro(episode: MemoryEpisode) -> bytes:
+    partes = [
+        _texto_a_bytes(episode.episode_id),
+        _texto_a_bytes(episode.dian_attribution_hash or ""),
+        _REG_EPISODIO.pack(episode.timestamp, episode.emotional_signature,
+                           episode.complexity_score, len(episode.concept_nodes)),
+    ]
+    partes.extend(_texto_a_bytes(c) for c in episode.concept_nodes)
+    return b"".join(partes)
+
+
+def _registro_a_episodio(datos: bytes) -> MemoryEpisode:
+    episode_id, offset = _leer_texto(datos, 0)
+    dian_hash, offset = _leer_texto(datos, offset)
+    timestamp, emocional, complejidad, n_conceptos = \
+        _REG_EPISODIO.unpack_from(datos, offset)
+    offset += _REG_EPISODIO.size
+    episode = MemoryEpisode(episode_id, timestamp, dian_hash or None)
+    episode.emotional_signature = emocional
+    episode.complexity_score = complejidad
+    for _ in range(n_conceptos):
+        cid, offset = _leer_texto(datos, offset)
+        episode.concept_nodes.append(cid)
+    return episode
+
+
+class MemoryStore:
+    """
+    Almacén en disco para un EmergentMemorySystem.
+
+    Solo conoce registros: la caché de conceptos y el seguimiento de
+    cambios viven en PersistentConceptGraph.
+    """
+
+    def __init__(self, path: str, sync: bool = True):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.sync = sync               # fsync en cada checkpoint
+        self._ruta_log = self.path / "conceptos.log"
+        self._ruta_idx = self.path / "conceptos.idx"
+        self._ruta_estado = self.path / "estado.json"
+        self._fd_log = os.open(self._ruta_log, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._fin_log = os.fstat(self._fd_log).st_size
+        if not self._ruta_idx.exists():
+            self._crear_indice(self._ruta_idx, _IDX_CAPACIDAD_INICIAL, [])
+        self._abrir_indice()
+
+    # ── Índice memory-mapped ──────────────────────────────────
+
+    @staticmethod
+    def _crear_indice(ruta: Path, capacidad: int, entradas: list):
+        """Escribe un índice nuevo de forma atómica (tmp + replace)."""
+        tmp = ruta.with_suffix(".idx.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_IDX_CABECERA.pack(_IDX_MAGIC, capacidad, 0))
+            f.truncate(_IDX_CABECERA.size + capacidad * _IDX_SLOT_BYTES)
+        slots = np.memmap(tmp, dtype=_IDX_SLOT, mode="r+",
+                          offset=_IDX_CABECERA.size, shape=(capacidad,))
+        for clave, offset, longitud in entradas:
+            i = clave % capacidad
+            while slots["clave"][i] != 0:
+                i = (i + 1) % capacidad
+            slots[i] = (clave, offset, longitud, 0)
+        slots.flush()
+        del slots
+        with open(tmp, "r+b") as f:
+            f.write(_IDX_CABECERA.pack(_IDX_MAGIC, capacidad, len(entradas)))
+        os.replace(tmp, ruta)
+
+    def _abrir_indice(self):
+        with open(self._ruta_idx, "rb") as f:
+            magic, self.capacidad, self.ocupados = \
+                _IDX_CABECERA.unpack(f.read(_IDX_CABECERA.size))
+        if magic != _IDX_MAGIC:
+            raise ValueError(f"Índice MER no reconocido: {self._ruta_idx}")
+        self._slots = np.memmap(self._ruta_idx, dtype=_IDX_SLOT, mode="r+",
+                                offset=_IDX_CABECERA.size, shape=(self.capacidad,))
+
+    def _buscar(self, clave: int) -> tuple:
+        """Sondeo lineal. Retorna (slot, encontrado)."""
+        claves = self._slots["clave"]
+        offsets = self._slots["offset"]
+        i = clave % self.capacidad
+        libre = None
+        while True:
+            k = int(claves[i])
+            if k == 0:
+                return (i if libre is None else libre), False
+            borrado = int(offsets[i]) == _IDX_BORRADO
+            if k == clave and not borrado:
+                return i, True
+            if borrado and libre is None:
+                libre = i
+            i = (i + 1) % self.capacidad
+
+    def _crecer(self):
+        vivos = (self._slots["clave"] != 0) & (self._slots["offset"] != _IDX_BORRADO)
+        entradas = list(zip(self._slots["clave"][vivos].tolist(),
+                            self._slots["offset"][vivos].tolist(),
+                            self._slots["longitud"][vivos].tolist()))
+        self._slots.flush()
+        del self._slots
+        self._crear_indice(self._ruta_idx, self.capacidad * 2, entradas)
+        self._abrir_indice()
+
+    def _guardar_cabecera(self):
+        self._slots.flush()
+        with open(self._ruta_idx, "r+b") as f:
+            f.write(_IDX_CABECERA.pack(_IDX_MAGIC, self.capacidad, self.ocupados))
+
+    # ── Conceptos ─────────────────────────────────────────────
+
+    def contains(self, concept_id: str) -> bool:
+        return self._buscar(_clave_concepto(concept_id))[1]
+
+    def load_concept(self, concept_id: str) -> Optional[ConceptNode]:
+        slot, encontrado = self._buscar(_clave_concepto(concept_id))
+        if not encontrado:
+            return None
+        offset = int(self._slots["offset"][slot])
+        longitud = int(self._slots["longitud"][slot])
+        node = _registro_a_concepto(os.pread(self._fd_log, longitud, offset))
+        return node if node.concept_id == concept_id else None
+
+    def iter_concepts(self):
+        """Recorre todos los conceptos vigentes en orden de índice."""
+        vivos = np.nonzero((self._slots["clave"] != 0)
+                           & (self._slots["offset"] != _IDX_BORRADO))[0]
+        for slot in vivos.tolist():
+            offset = int(self._slots["offset"][slot])
+            longitud = int(self._slots["longitud"][slot])
+            yield _registro_a_concepto(os.pread(self._fd_log, longitud, offset))
+
+    def write_concepts(self, nodes: List[ConceptNode]):
+        """Añade nuevas versiones al log y actualiza el índice."""
+        if not nodes:
+            return
+        registros = [_concepto_a_registro(n) for n in nodes]
+        os.write(self._fd_log, b"".join(registros))
+        if self.sync:
+            os.fsync(self._fd_log)
+
+        offset = self._fin_log
+        for node, registro in zip(nodes, registros):
+            if self.ocupados + 1 > self.capacidad * _IDX_CARGA_MAX:
+                self._crecer()
+            clave = _clave_concepto(node.concept_id)
+            slot, encontrado = self._buscar(clave)
+            self._slots[slot] = (clave, offset, len(registro), 0)
+            if not encontrado:
+                self.ocupados += 1
+            offset += len(registro)
+        self._fin_log = offset
+        self._guardar_cabecera()
+
+    def delete_concept(self, concept_id: str) -> bool:
+        slot, encontrado = self._buscar(_clave_concepto(concept_id))
+        if encontrado:
+            self._slots["offset"][slot] = _IDX_BORRADO
+            self.ocupados -= 1
+            self._guardar_cabecera()
+        return encontrado
+
+    def clear_concepts(self):
+        os.ftruncate(self._fd_log, 0)
+        self._fin_log = 0
+        self._slots.flush()
+        del self._slots
+        self._crear_indice(self._ruta_idx, _IDX_CAPACIDAD_INICIAL, [])
+        self._abrir_indice()
+
+    # ── Triggers, episodios y estado ──────────────────────────
+
+    def _anexar(self, nombre: str, registros: List[bytes], reemplazar: bool):
+        with open(self.path / nombre, "wb" if reemplazar else "ab") as f:
+            f.write(b"".join(_MARCO.pack(len(r)) + r for r in registros))
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+
+    def _leer_log(self, nombre: str) -> List[bytes]:
+        ruta = self.path / nombre
+        if not ruta.exists():
+            return []
+        datos = ruta.read_bytes()
+        registros, offset = [], 0
+        while offset + _MARCO.size <= len(datos):
+            (longitud,) = _MARCO.unpack_from(datos, offset)
+            offset += _MARCO.size
+            if offset + longitud > len(datos):
+                break                  # registro incompleto (corte de energía)
+            registros.append(datos[offset:offset + longitud])
+            offset += longitud
+        return registros
+
+    def append_triggers(self, triggers: List[TriggerToken], replace: bool = False):
+        self._anexar("triggers.log", [_trigger_a_registro(t) for t in triggers], replace)
+
+    def load_triggers(self) -> Dict[str, TriggerToken]:
+        triggers = {}
+        for registro in self._leer_log("triggers.log"):
+            trigger = _registro_a_trigger(registro)
+            triggers[trigger.token] = trigger
+        return triggers
+
+    def append_episodes(self, episodes: List[MemoryEpisode], replace: bool = False):
+        self._anexar("episodios.log", [_episodio_a_registro(e) for e in episodes], replace)
+
+    def load_episodes(self) -> List[MemoryEpisode]:
+        return [_registro_a_episodio(r) for r in self._leer_log("episodios.log")]
+
+    def save_state(self, estado: dict):
+        tmp = self._ruta_estado.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(estado), encoding="utf-8")
+        os.replace(tmp, self._ruta_estado)
+
+    def load_state(self) -> dict:
+        if not self._ruta_estado.exists():
+            return {}
+        return json.loads(self._ruta_estado.read_text(encoding="utf-8"))
+
+    def close(self):
+        self._guardar_cabecera()
+        os.close(self._fd_log)
+
+
+class PersistentConceptGraph(MutableMapping):
+    """
+    concept_graph respaldado por MemoryStore, con la interfaz de un dict.
+
+    Los nodos se cargan al primer acceso y se mantienen en una caché LRU.
+    Los nodos asignados o marcados (mark_dirty) se escriben en flush(), o
+    antes si la caché se llena: se expulsan por lotes desde el extremo LRU y
+    los sucios de cada lote se escriben juntos con write_concepts().
+    """
+
+    def __init__(self, store: MemoryStore, cache_size: int = 100_000):
+        self.store = store
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, ConceptNode]" = OrderedDict()
+        self._sucios: Set[str] = set()
+        self._nuevos: Set[str] = set()    # asignados y aún no escritos
+
+    def _cachear(self, concept_id: str, node: ConceptNode):
+        self._cache[concept_id] = node
+        self._cache.move_to_end(concept_id)
+        exceso = len(self._cache) - self.cache_size
+        if exceso > 0:
+            self._expulsar(max(exceso, min(self.cache_size, _CACHE_LOTE)))
+
+    def _expulsar(self, cantidad: int):
+        """Expulsa los `cantidad` nodos más antiguos; los sucios se escriben antes en un lote."""
+        viejos = list(islice(self._cache, cantidad))
+        sucios = [cid for cid in viejos if cid in self._sucios]
+        if sucios:
+            self.store.write_concepts([self._cache[cid] for cid in sucios])
+            self._sucios.difference_update(sucios)
+            self._nuevos.difference_update(sucios)
+        for cid in viejos:
+            del self._cache[cid]
+
+    def __getitem__(self, concept_id: str) -> ConceptNode:
+        node = self._cache.get(concept_id)
+        if node is not None:
+            self._cache.move_to_end(concept_id)
+            return node
+        node = self.store.load_concept(concept_id)
+        if node is None:
+            raise KeyError(concept_id)
+        self._cachear(concept_id, node)
+        return node
+
+    def __setitem__(self, concept_id: str, node: ConceptNode):
+        if concept_id not in self._cache and not self.store.contains(concept_id):
+            self._nuevos.add(concept_id)
+        self._sucios.add(concept_id)
+        self._cachear(concept_id, node)
+
+    def __delitem__(self, concept_id: str):
+        en_disco = self.store.delete_concept(concept_id)
+        en_cache = self._cache.pop(concept_id, None) is not None
+        self._sucios.discard(concept_id)
+        self._nuevos.discard(concept_id)
+        if not (en_disco or en_cache):
+            raise KeyError(concept_id)
+
+    def __contains__(self, concept_id) -> bool:
+        return concept_id in self._cache or self.store.contains(concept_id)
+
+    def __len__(self) -> int:
+        return self.store.ocupados + len(self._nuevos)
+
+    def __iter__(self):
+        for node in self.store.iter_concepts():
+            if node.concept_id in self._nuevos:
+                continue
+            if node.concept_id not in self._cache:
+                self._cachear(node.concept_id, node)
+            yield node.concept_id
+        yield from list(self._nuevos)
+
+    def clear(self):
+        self.store.clear_concepts()
+        self._cache.clear()
+        self._sucios.clear()
+        self._nuevos.clear()
+
+    def mark_dirty(self, concept_ids: List[str]):
+        """Marca nodos modificados in situ (activate, connect_to)."""
+        self._sucios.update(cid for cid in concept_ids if cid in self._cache)
+
+    def flush(self):
+        nodes = [self._cache[cid] for cid in self._sucios if cid in self._cache]
+        self.store.write_concepts(nodes)
+        self._sucios.clear()
+        self._nuevos.clear()
+
 
 # ============= SISTEMA INTEGRADO =============
 
@@ -223,15 +925,101 @@ class EmergentMemorySystem:
     """
 
     def __init__(self, nodo_id: str = "nodo-local",
-                 embedding_model: str = "nomic-embed-text"):
+                 embedding_model: str = "nomic-embed-text",
+                 store_path: Optional[str] = None,
+                 encode_workers: int = 2, max_pending: int = 64,
+                 concept_extraction: str = "embedding"):
+        """
+        store_path: directorio de un MemoryStore. Si se indica, la memoria
+        vive en disco, se carga bajo demanda y se guarda tras cada
+        encode_conversation. Sin él, todo permanece en RAM (v0.2).
+
+        encode_workers / max_pending: pool de codificación en segundo plano
+        de encode_with_dian_attribution_async y tamaño máximo de su cola.
+
+        concept_extraction: "embedding" (v0.2, un embedding por oración) o
+        "local" (TF-IDF sin Ollama; solo se embeben los conceptos nuevos).
+        """
+        if concept_extraction not in ("embedding", "local"):
+            raise ValueError(f"concept_extraction desconocido: {concept_extraction}")
         self.nodo_id = nodo_id
         self.embedding_model = embedding_model
+        self.concept_extraction = concept_extraction
+        self.max_concepts = 20
+        self.store: Optional[MemoryStore] = None
         self.concept_graph: Dict[str, ConceptNode] = {}
-        self.trigger_tokens: Dict[str, TriggerToken] = {}
-        self.episodes: List[MemoryEpisode] = []
+        self._trigger_tokens: Optional[Dict[str, TriggerToken]] = {}
+        self._episodes: Optional[List[MemoryEpisode]] = []
         self.current_session_id = self._generate_id()
         self.current_timestamp = time.time()
 
+        # Serializa las mutaciones del grafo entre hilos de codificación
+        self._lock = threading.RLock()
+        self.encode_workers = encode_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._futures: Set[Future] = set()
+        self._cerrado = False
+
+        if store_path:
+            self.store = MemoryStore(store_path)
+            self.concept_graph = PersistentConceptGraph(self.store)
+            self._trigger_tokens = None      # se cargan al primer acceso
+            self._episodes = None
+            estado = self.store.load_state()
+            self.current_session_id = estado.get("session_id", self.current_session_id)
+            self.current_timestamp = estado.get("timestamp", self.current_timestamp)
+
+    @property
+    def trigger_tokens(self) -> Dict[str, TriggerToken]:
+        if self._trigger_tokens is None:
+            self._trigger_tokens = self.store.load_triggers()
+        return self._trigger_tokens
+
+    @trigger_tokens.setter
+    def trigger_tokens(self, value: Dict[str, TriggerToken]):
+        self._trigger_tokens = value
+
+    @property
+    def episodes(self) -> List[MemoryEpisode]:
+        if self._episodes is None:
+            self._episodes = self.store.load_episodes()
+        return self._episodes
+
+    @episodes.setter
+    def episodes(self, value: List[MemoryEpisode]):
+        self._episodes = value
+
+    def _checkpoint(self, triggers: List[TriggerToken],
+                    episodes: List[MemoryEpisode], replace: bool = False):
+        """
+        Guarda en disco los cambios de la última operación.
+        replace=True reescribe triggers y episodios completos (importación).
+        """
+        if self.store is None:
+            return
+        self.concept_graph.flush()
+        self.store.append_triggers(triggers, replace)
+        self.store.append_episodes(episodes, replace)
+        self.store.save_state({
+            "session_id": self.current_session_id,
+            "timestamp": self.current_timestamp,
+        })
+
+    def close(self):
+        """
+        Termina la codificación pendiente y cierra el almacén en disco.
+        Después, encode_with_dian_attribution_async lanza RuntimeError.
+        """
+        with self._lock:
+            self._cerrado = True
+        self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.store is not None:
+            self.store.close()
+
     def _generate_id(self, seed: str = "") -> str:
         return hashlib.sha256(f"{time.time()}{seed}".encode()).hexdigest()[:16]
 
@@ -240,10 +1028,10 @@ class EmergentMemorySystem:
         v0.2: embedding real via nomic-embed-text local.
         Fallback a None si Ollama no está disponible.
         """
-        if not OLLAMA_AVAILABLE:
+        if not ollama_disponible():
             return None
         try:
-            response = ollama.embeddings(model=self.embedding_model, prompt=text)
+            response = _ollama.embeddings(model=self.embedding_model, prompt=text)
             return response['embedding']
         except Exception as e:
             print(f"AVISO: embedding falló ({e}). Usando fallback.")
@@ -258,55 +1046,89 @@ class EmergentMemorySystem:
 
         v0.2: acepta hash de atribución DIAN para vincular episodio.
         Retorna: episode_id para trazabilidad.
-        """
-        concepts = self._extract_key_concepts(text)
 
-        episode = MemoryEpisode(
-            episode_id=dian_attribution_hash[:16] if dian_attribution_hash
-                       else self._generate_id(),
-            timestamp=self.current_timestamp,
-            dian_attribution_hash=dian_attribution_hash
-        )
+        Seguro entre hilos: las llamadas de embedding corren en paralelo
+        y solo la actualización del grafo se serializa.
+        """
+        concepts, embeddings, triggers = self._prepare_encoding(text)
+
+        with self._lock:
+            episode = MemoryEpisode(
+                episode_id=dian_attribution_hash[:16] if dian_attribution_hash
+                           else self._generate_id(),
+                timestamp=self.current_timestamp,
+                dian_attribution_hash=dian_attribution_hash
+            )
 
-        for i, (essence, concept_id) in enumerate(concepts):
-            if concept_id not in self.concept_graph:
-                valence = self._estimate_valence(essence, text)
-                node = ConceptNode(concept_id, essence, valence)
-                # v0.2: guardar embedding en el nodo
-                node.embedding = self._get_embedding(essence)
-                self.concept_graph[concept_id] = node
-            else:
-                node = self.concept_graph[concept_id]
-
-            node.activate(self.current_timestamp)
-            episode.add_concept(concept_id)
-
-            # Conexiones Hebbian con conceptos co-ocurrentes
-            for j in range(max(0, i - 3), min(len(concepts), i + 4)):
-                if i != j:
-                    other_id = concepts[j][1]
-                    strength = 1.0 / (abs(i - j) + 1)
-                    node.connect_to(other_id, strength)
-
-        triggers = self._identify_triggers(text, episode)
-        for trigger in triggers:
-            self.trigger_tokens[trigger.token] = trigger
-
-        episode.compute_signature(self.concept_graph)
-        self.episodes.append(episode)
-        self.current_timestamp += 1.0
+            for i, (essence, concept_id) in enumerate(concepts):
+                if concept_id not in self.concept_graph:
+                    valence = self._estimate_valence(essence, text)
+                    node = ConceptNode(concept_id, essence, valence)
+                    # v0.2: guardar embedding en el nodo
+                    node.embedding = (embeddings[concept_id] if concept_id in embeddings
+                                      else self._get_embedding(essence))
+                    self.concept_graph[concept_id] = node
+                else:
+                    node = self.concept_graph[concept_id]
+
+                node.activate(self.current_timestamp)
+                episode.add_concept(concept_id)
+
+                # Conexiones Hebbian con conceptos co-ocurrentes
+                for j in range(max(0, i - 3), min(len(concepts), i + 4)):
+                    if i != j:
+                        other_id = concepts[j][1]
+                        strength = 1.0 / (abs(i - j) + 1)
+                        node.connect_to(other_id, strength)
+
+            for trigger in triggers:
+                self.trigger_tokens[trigger.token] = trigger
+
+            episode.compute_signature(self.concept_graph)
+            self.episodes.append(episode)
+            self.current_timestamp += 1.0
+
+            if self.store is not None:
+                self.concept_graph.mark_dirty(episode.concept_nodes)
+                self._checkpoint(triggers, [episode])
 
         return episode.episode_id
 
+    def _prepare_encoding(self, text: str) -> tuple:
+        """
+        Parte costosa de encode_conversation: extracción de conceptos,
+        embeddings de conceptos nuevos y triggers. No modifica el grafo.
+        Retorna (concepts, embeddings por concept_id, triggers).
+        """
+        concepts = self._extract_key_concepts(text)
+
+        provisional = MemoryEpisode(episode_id="", timestamp=0.0)
+        nuevos: Dict[str, str] = {}
+        with self._lock:
+            for essence, concept_id in concepts:
+                provisional.add_concept(concept_id)
+                if concept_id not in self.concept_graph:
+                    nuevos.setdefault(concept_id, essence)
+
+        embeddings = {
+            concept_id: self._get_embedding(essence)
+            for concept_id, essence in nuevos.items()
+        }
+        triggers = self._identify_triggers(text, provisional)
+        return concepts, embeddings, triggers
+
     def _extract_key_concepts(self, text: str) -> List[tuple]:
         """
         v0.2: usa embeddings reales si están disponibles.
         Fallback a heurística mejorada para español.
         """
+        if self.concept_extraction == "local":
+            return self._extract_key_concepts_local(text)
+
         sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 15]
         concepts = []
 
-        for sentence in sentences[:20]:
+        for sentence in sentences[:self.max_concepts]:
             embedding = self._get_embedding(sentence)
             essence = sentence[:80]
             concept_id = hashlib.sha256(essence.encode()).hexdigest()
@@ -320,6 +1142,25 @@ class EmergentMemorySystem:
 
         return concepts
 
+    def _extract_key_concepts_local(self, text: str) -> List[tuple]:
+        """
+        Extracción rápida sin Ollama: mismas oraciones candidatas que
+        _extract_key_concepts, pero si hay más de max_concepts se conservan
+        las de mayor puntaje TF-IDF (no las primeras), en orden original.
+
+        IDs = sha256(essence), idénticos al fallback sin embeddings.
+        """
+        sentences = [s.strip() for s in text.split('.') if len(s.strip()) > 15]
+
+        if len(sentences) > self.max_concepts:
+            scores = _tfidf_sentence_scores(sentences)
+            top = np.argpartition(-scores, self.max_concepts)[:self.max_concepts]
+            sentences = [sentences[i] for i in sorted(top.tolist())]
+
+        essences = [sentence[:80] for sentence in sentences]
+        ids = [hashlib.sha256(e.encode()).hexdigest() for e in essences]
+        return list(zip(essences, ids))
+
     def _estimate_valence(self, concept: str, context: str) -> float:
         """Estima valencia emocional en contexto."""
         positive = {'excelente', 'brillante', 'fascinante', 'perfecto',
@@ -343,24 +1184,23 @@ class EmergentMemorySystem:
                            episode: MemoryEpisode) -> List[TriggerToken]:
         """
         v0.2: triggers con embeddings reales para activación semántica.
+        Selección lineal (_select_trigger_phrases): el hash de contexto se
+        calcula una vez y solo se embeben las frases elegidas.
         """
-        triggers = []
-        words = text.split()
-
-        for i in range(len(words) - 2):
-            phrase = " ".join(words[i:i + 3])
-            if len(phrase) > 15 and text.count(phrase) <= 2:
-                context_hash = hashlib.sha256(text.encode()).hexdigest()
-                embedding = self._get_embedding(phrase)
-                trigger = TriggerToken(
-                    token=phrase[:50],
-                    linked_concepts=episode.concept_nodes[:5],
-                    context_hash=context_hash,
-                    embedding=embedding
-                )
-                triggers.append(trigger)
-
-        return triggers[:5]
+        phrases = _select_trigger_phrases(text, 5)
+        if not phrases:
+            return []
+
+        context_hash = hashlib.sha256(text.encode()).hexdigest()
+        return [
+            TriggerToken(
+                token=phrase[:50],
+                linked_concepts=episode.concept_nodes[:5],
+                context_hash=context_hash,
+                embedding=self._get_embedding(phrase)
+            )
+            for phrase in phrases
+        ]
 
     # ============= FASE 2: RECONSTRUCCIÓN =============
 
@@ -370,33 +1210,34 @@ class EmergentMemorySystem:
         """
         trigger_embedding = self._get_embedding(trigger_text)
 
-        activated = []
-        for token, trigger in self.trigger_tokens.items():
-            if trigger.should_activate(trigger_text, trigger_embedding):
-                activated.append(trigger)
-
-        if not activated:
-            return None
-
-        activated_concepts: Set[str] = set()
-        for trigger in activated:
-            activated_concepts.update(trigger.linked_concepts)
-
-        # Propagación Hebbian — 2 saltos
-        wave = list(activated_concepts)
-        for _ in range(2):
-            new_wave = []
-            for cid in wave:
-                if cid in self.concept_graph:
-                    strong = [
-                        c for c, w in self.concept_graph[cid].connections.items()
-                        if w > 0.5
-                    ]
-                    new_wave.extend(strong)
-            wave = new_wave
-            activated_concepts.update(wave)
-
-        return self._synthesize_narrative(activated_concepts)
+        with self._lock:
+            activated = []
+            for token, trigger in self.trigger_tokens.items():
+                if trigger.should_activate(trigger_text, trigger_embedding):
+                    activated.append(trigger)
+
+            if not activated:
+                return None
+
+            activated_concepts: Set[str] = set()
+            for trigger in activated:
+                activated_concepts.update(trigger.linked_concepts)
+
+            # Propagación Hebbian — 2 saltos
+            wave = list(activated_concepts)
+            for _ in range(2):
+                new_wave = []
+                for cid in wave:
+                    if cid in self.concept_graph:
+                        strong = [
+                            c for c, w in self.concept_graph[cid].connections.items()
+                            if w > 0.5
+                        ]
+                        new_wave.extend(strong)
+                wave = new_wave
+                activated_concepts.update(wave)
+
+            return self._synthesize_narrative(activated_concepts)
 
     def _synthesize_narrative(self, concept_ids: Set[str]) -> str:
         """Sintetiza narrativa desde conceptos activados."""
@@ -445,14 +1286,8 @@ class EmergentMemorySystem:
 
     # ============= FASE 3: INTEGRACIÓN DIAN =============
 
-    def encode_with_dian_attribution(self, text: str,
-                                     nodo_id: Optional[str] = None) -> dict:
-        """
-        v0.2 — Método principal de integración DIAN + MER.
-
-        Registra atribución humana Y codifica en grafo MER.
-        Retorna trazabilidad completa.
-        """
+    def _create_attribution(self, text: str, nodo_id: Optional[str]) -> dict:
+        """Registro de atribución DIAN — no depende de la codificación MER."""
         # Hash de atribución (equivalente a DIAN_Attribution.registrar_aporte)
         timestamp = str(time.time())
         content_hash = hashlib.sha256(text.encode()).hexdigest()
@@ -461,19 +1296,93 @@ class EmergentMemorySystem:
             f"{node}:{timestamp}:{content_hash}".encode()
         ).hexdigest()
 
-        # Codificar en MER con vínculo de atribución
-        episode_id = self.encode_conversation(text, attribution_hash)
-
         return {
             "attribution_hash": attribution_hash,
             "content_hash": content_hash,
-            "episode_id": episode_id,
+            "episode_id": attribution_hash[:16],
             "timestamp": timestamp,
             "nodo_id": node,
             "mer_concepts": len(self.concept_graph),
             "protocol": "DIAN-MER-v0.2"
         }
 
+    def encode_with_dian_attribution(self, text: str,
+                                     nodo_id: Optional[str] = None) -> dict:
+        """
+        v0.2 — Método principal de integración DIAN + MER.
+
+        Registra atribución humana Y codifica en grafo MER.
+        Retorna trazabilidad completa.
+        """
+        registro = self._create_attribution(text, nodo_id)
+
+        # Codificar en MER con vínculo de atribución
+        registro["episode_id"] = self.encode_conversation(
+            text, registro["attribution_hash"]
+        )
+        registro["mer_concepts"] = len(self.concept_graph)
+        return registro
+
+    def encode_with_dian_attribution_async(self, text: str,
+                                           nodo_id: Optional[str] = None,
+                                           callback=None) -> tuple:
+        """
+        Como encode_with_dian_attribution, pero sin esperar a MER.
+
+        La atribución se calcula y retorna de inmediato; la codificación
+        se encola en el pool de segundo plano. Si ya hay max_pending
+        codificaciones en cola, bloquea hasta que se libere una
+        (backpressure).
+
+        Retorna (registro, future). future.result() es el episode_id.
+        callback(registro, future) se invoca al terminar, con éxito o error.
+        mer_concepts en el registro es el total al momento de encolar.
+        """
+        registro = self._create_attribution(text, nodo_id)
+
+        self._pending.acquire()
+        try:
+            with self._lock:
+                if self._cerrado:
+                    raise RuntimeError("EmergentMemorySystem cerrado")
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.encode_workers,
+                        thread_name_prefix="mer-encode"
+                    )
+                future = self._executor.submit(
+                    self.encode_conversation, text, registro["attribution_hash"]
+                )
+                self._futures.add(future)
+        except BaseException:
+            # Sin future no hay _encode_done que devuelva el cupo
+            self._pending.release()
+            raise
+        future.add_done_callback(self._encode_done)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(registro, f))
+        return registro, future
+
+    def _encode_done(self, future: Future):
+        self._pending.release()
+        with self._lock:
+            self._futures.discard(future)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"AVISO: codificación MER falló ({error}).")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que terminen las codificaciones en segundo plano.
+        Retorna False si vence el timeout con tareas pendientes.
+        """
+        with self._lock:
+            pendientes = set(self._futures)
+        _, no_terminadas = wait(pendientes, timeout=timeout)
+        return not no_terminadas
+
     # ============= FASE 4: EXPORTACIÓN PARA RAG DISTRIBUIDO =============
 
     def export_memory_seeds(self, include_embeddings: bool = False) -> str:
@@ -485,24 +1394,25 @@ class EmergentMemorySystem:
 
         include_embeddings: False por defecto (reduce tamaño, aumenta privacidad)
         """
-        export = {
-            "version": "0.2",
-            "nodo_id": self.nodo_id,
-            "concepts": [node.to_seed() for node in self.concept_graph.values()],
-            "triggers": [t.to_seed() for t in self.trigger_tokens.values()],
-            "episodes": [ep.to_seed() for ep in self.episodes],
-            "session_id": self.current_session_id,
-            "timestamp": self.current_timestamp,
-            "dian_episodes": [
-                ep.dian_attribution_hash
-                for ep in self.episodes if ep.dian_attribution_hash
-            ]
-        }
-
-        export_str = json.dumps(export, sort_keys=True)
-        export["integrity_hash"] = hashlib.sha256(export_str.encode()).hexdigest()
-
-        return json.dumps(export, indent=2, ensure_ascii=False)
+        with self._lock:
+            export = {
+                "version": "0.2",
+                "nodo_id": self.nodo_id,
+                "concepts": [node.to_seed() for node in self.concept_graph.values()],
+                "triggers": [t.to_seed() for t in self.trigger_tokens.values()],
+                "episodes": [ep.to_seed() for ep in self.episodes],
+                "session_id": self.current_session_id,
+                "timestamp": self.current_timestamp,
+                "dian_episodes": [
+                    ep.dian_attribution_hash
+                    for ep in self.episodes if ep.dian_attribution_hash
+                ]
+            }
+
+            export_str = json.dumps(export, sort_keys=True)
+            export["integrity_hash"] = hashlib.sha256(export_str.encode()).hexdigest()
+
+            return json.dumps(export, indent=2, ensure_ascii=False)
 
     def import_memory_seeds(self, seeds_json: str):
         """Importa y verifica sistema de memoria desde semillas."""
@@ -516,35 +1426,111 @@ class EmergentMemorySystem:
         if stated_hash != computed_hash:
             raise ValueError("Integridad comprometida — hash no coincide.")
 
-        self.concept_graph = {}
-        for seed in data["concepts"]:
-            node = ConceptNode.from_seed(seed)
-            self.concept_graph[node.concept_id] = node
+        with self._lock:
+            self.concept_graph.clear()
+            for seed in data["concepts"]:
+                node = ConceptNode.from_seed(seed)
+                self.concept_graph[node.concept_id] = node
+
+            self.trigger_tokens = {}
+            for seed in data["triggers"]:
+                trigger = TriggerToken.from_seed(seed)
+                self.trigger_tokens[trigger.token] = trigger
+
+            self.episodes = [MemoryEpisode.from_seed(s) for s in data["episodes"]]
+            self.current_session_id = data["session_id"]
+            self.current_timestamp = data["timestamp"]
+            self._checkpoint(list(self.trigger_tokens.values()), self.episodes,
+                             replace=True)
+
+    def export_memory_seeds_binary(self, include_embeddings: bool = False,
+                                   embedding_dtype: str = "int8",
+                                   comprimir: bool = True) -> bytes:
+        """
+        Exporta las mismas semillas que export_memory_seeds() en formato
+        binario compacto. El contenido es intercambiable con las semillas
+        de texto; los embeddings se cuantizan a int8 o float16.
+
+        Estructura: cabecera | cuerpo (zlib opcional) | sha256(cabecera+cuerpo)
+        Cuerpo:     nodo_id | session_id | conceptos | triggers | episodios
+        """
+        dtype = embedding_dtype if include_embeddings else None
+        with self._lock:
+            partes = [
+                _texto_a_bytes(self.nodo_id),
+                _texto_a_bytes(self.current_session_id),
+            ]
+            partes.extend(n.to_binary_seed(dtype) for n in self.concept_graph.values())
+            partes.extend(t.to_binary_seed(dtype) for t in self.trigger_tokens.values())
+            partes.extend(ep.to_binary_seed() for ep in self.episodes)
+            conteos = (self.current_timestamp, len(self.concept_graph),
+                       len(self.trigger_tokens), len(self.episodes))
+
+        cuerpo = b"".join(partes)
+        if comprimir:
+            cuerpo = zlib.compress(cuerpo, 6)
+        cabecera = _CABECERA.pack(
+            MAGIC_BINARIO, VERSION_BINARIO, _FLAG_ZLIB if comprimir else 0,
+            *conteos
+        )
+        datos = cabecera + cuerpo
+        return datos + hashlib.sha256(datos).digest()
 
-        self.trigger_tokens = {}
-        for seed in data["triggers"]:
-            trigger = TriggerToken.from_seed(seed)
-            self.trigger_tokens[trigger.token] = trigger
+    def import_memory_seeds_binary(self, seeds: bytes):
+        """Importa y verifica sistema de memoria desde semillas binarias."""
+        datos, stated_hash = seeds[:-32], seeds[-32:]
+        if hashlib.sha256(datos).digest() != stated_hash:
+            raise ValueError("Integridad comprometida — hash no coincide.")
 
-        self.episodes = [MemoryEpisode.from_seed(s) for s in data["episodes"]]
-        self.current_session_id = data["session_id"]
-        self.current_timestamp = data["timestamp"]
+        magic, version, flags, timestamp, n_concepts, n_triggers, n_episodes = \
+            _CABECERA.unpack_from(datos, 0)
+        if magic != MAGIC_BINARIO or version != VERSION_BINARIO:
+            raise ValueError(f"Formato binario no reconocido: {magic!r} v{version}")
+        cuerpo = datos[_CABECERA.size:]
+        if flags & _FLAG_ZLIB:
+            cuerpo = zlib.decompress(cuerpo)
+
+        _, offset = _leer_texto(cuerpo, 0)                 # nodo_id de origen
+        session_id, offset = _leer_texto(cuerpo, offset)
+
+        with self._lock:
+            self.concept_graph.clear()
+            for _ in range(n_concepts):
+                node, offset = ConceptNode.from_binary_seed(cuerpo, offset)
+                self.concept_graph[node.concept_id] = node
+
+            self.trigger_tokens = {}
+            for _ in range(n_triggers):
+                trigger, offset = TriggerToken.from_binary_seed(cuerpo, offset)
+                self.trigger_tokens[trigger.token] = trigger
+
+            self.episodes = []
+            for _ in range(n_episodes):
+                episode, offset = MemoryEpisode.from_binary_seed(cuerpo, offset)
+                self.episodes.append(episode)
+
+            self.current_session_id = session_id
+            self.current_timestamp = timestamp
+            self._checkpoint(list(self.trigger_tokens.values()), self.episodes,
+                             replace=True)
 
     def get_statistics(self) -> dict:
         """Estadísticas del sistema."""
-        dian_linked = sum(1 for ep in self.episodes if ep.dian_attribution_hash)
-        return {
-            "version": "0.2",
-            "nodo_id": self.nodo_id,
-            "total_concepts": len(self.concept_graph),
-            "total_triggers": len(self.trigger_tokens),
-            "total_episodes": len(self.episodes),
-            "episodes_with_dian_attribution": dian_linked,
-            "avg_connections": float(np.mean([
-                len(n.connections) for n in self.concept_graph.values()
-            ])) if self.concept_graph else 0,
-            "embeddings_active": OLLAMA_AVAILABLE
-        }
+        with self._lock:
+            dian_linked = sum(1 for ep in self.episodes if ep.dian_attribution_hash)
+            return {
+                "version": "0.2",
+                "nodo_id": self.nodo_id,
+                "total_concepts": len(self.concept_graph),
+                "total_triggers": len(self.trigger_tokens),
+                "total_episodes": len(self.episodes),
+                "episodes_with_dian_attribution": dian_linked,
+                "avg_connections": float(np.mean([
+                    len(n.connections) for n in self.concept_graph.values()
+                ])) if self.concept_graph else 0,
+                "embeddings_active": ollama_disponible(),
+                "store_path": str(self.store.path) if self.store else None
+            }
 
 
 # ============= DEMOSTRACIÓN =============
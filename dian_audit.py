@@ -27,6 +27,15 @@ from dataclasses import dataclass, asdict
 from pathlib import Path
 from typing import Optional
 
+try:
+    from dian_metricas import REGISTRO as _METRICAS
+    _ESCRITURAS_AUDIT = _METRICAS.contador(
+        "dian_audit_escrituras_total", "Entradas escritas en el log de auditoría")
+    _BYTES_AUDIT = _METRICAS.contador(
+        "dian_audit_bytes_total", "Bytes escritos en el log de auditoría")
+except ImportError:
+    _ESCRITURAS_AUDIT = _BYTES_AUDIT = None
+
 # ─────────────────────────────────────────────
 # CONFIGURACIÓN
 # ─────────────────────────────────────────────
@@ -113,6 +122,10 @@ def registrar(zona: Zona, accion: str, detalle: str, resultado: str) -> EntradaA
     with open(LOG_FILE, "a", encoding="utf-8") as f:
         f.write(linea)
 
+    if _ESCRITURAS_AUDIT is not None:
+        _ESCRITURAS_AUDIT.inc(zona=entrada.zona)
+        _BYTES_AUDIT.inc(len(linea.encode("utf-8")))
+
     return entrada
 
 
@@ -261,6 +274,8 @@ MAPA_ZONAS = {
     "ping_nodo":         Zona.VERDE,
     "write_log":         Zona.VERDE,
     "ollama_run":        Zona.VERDE,
+    "perfilar_proceso":  Zona.VERDE,
+    "listar_tareas":     Zona.VERDE,
 
     # ZONA AMARILLA — requiere confirmación
     "ollama_pull":       Zona.AMARILLA,
@@ -0,0 +1,995 @@
+"""
+DIAN — dian_bench.py v0.1
+Benchmarks de dian_nodos sin Ollama ni dispositivos reales.
+
+Implementa:
+  - MinHash/LSH: precisión frente a Jaccard exacto y tiempo de búsqueda
+  - Ollama simulado (OllamaSimulado): slots paralelos, coste por token y
+    recarga de pesos al cambiar de modelo
+  - Micro-lotes: tokens/s con y sin LoteadorOllama
+  - Transporte: bytes en el cable y latencia con JSON, gzip/zstd y sobre
+    binario a través de un enlace lento simulado (EnlaceLento)
+  - Arranque: tiempo de proceso e imports (-X importtime) de los modos
+    ping, cliente, servidor y de MER, en intérpretes nuevos
+  - Clúster simulado (ClusterSimulado): un proceso iniciar_servidor por
+    nodo en localhost, cada uno con su Ollama simulado (tokens/s, latencia,
+    fallos y bloqueos inyectados). Mide solicitudes/s, tokens/s y latencia
+    p50/p95/p99 de las cargas cliente, consenso, lote y MER; guarda JSON
+    y compara con una corrida anterior para detectar regresiones
+
+Uso:
+    python dian_bench.py --bench minhash --respuestas 2000
+    python dian_bench.py --bench lotes --solicitudes 48
+    python dian_bench.py --bench transporte --kbps 1000 --latencia-ms 30
+    python dian_bench.py --bench arranque --escenarios ping,cliente --repeticiones 20
+    python dian_bench.py --bench cluster --salida base.json
+    python dian_bench.py --bench cluster --fallos 0.05 --bloqueos 0.02
+    python dian_bench.py --bench cluster --comparar base.json --tolerancia 0.2
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+import dian_nodos
+import dian_trazas
+from dian_cliente_async import ClienteDIAN
+
+
+def _cronometrar(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+def vocabulario_dian() -> list:
+    """Palabras de la documentación del repo, para respuestas sintéticas."""
+    raiz = Path(__file__).parent
+    texto = " ".join(p.read_text(encoding="utf-8")
+                     for p in [*raiz.glob("*.md"), *raiz.glob("docs/*.md")])
+    return re.findall(r"[^\W\d_]{3,}", texto.lower()) or ["dian"]
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: MINHASH / LSH
+# ─────────────────────────────────────────────
+
+def respuestas_sinteticas(n: int, palabras: int = 60, semilla: int = 7) -> list:
+    """
+    n respuestas: una de cada cuatro es original; las demás son variantes
+    de una original con 0–60% de palabras reemplazadas, de modo que haya
+    pares en todo el rango de similitud.
+    """
+    rng = random.Random(semilla)
+    vocab = vocabulario_dian()
+    respuestas = []
+    for i in range(n):
+        if i % 4 == 0 or not respuestas:
+            respuestas.append([rng.choice(vocab) for _ in range(palabras)])
+        else:
+            base = list(rng.choice(respuestas[-4:]))
+            tasa = rng.uniform(0.0, 0.6)
+            for j in range(len(base)):
+                if rng.random() < tasa:
+                    base[j] = rng.choice(vocab)
+            respuestas.append(base)
+    return [" ".join(r) for r in respuestas]
+
+
+def _jaccard(a: set, b: set) -> float:
+    union = a | b
+    return len(a & b) / len(union) if union else 1.0
+
+
+def bench_minhash(n: int = 2000, consultas: int = 200, umbral: float = 0.5) -> dict:
+    textos = respuestas_sinteticas(n)
+    shingles = [dian_nodos._shingles(t, 3) for t in textos]
+    firmas, t_firmas = _cronometrar(lambda: [dian_nodos.firma_minhash(t) for t in textos])
+
+    indice = dian_nodos.IndiceLSH()
+    for i, firma in enumerate(firmas):
+        indice.agregar(str(i), firma)
+
+    rng = random.Random(11)
+    muestra = rng.sample(range(n), min(consultas, n))
+
+    # Error de estimación sobre pares cercanos (misma ventana) y aleatorios
+    errores = []
+    for i in muestra:
+        for j in (max(0, i - 1), rng.randrange(n)):
+            exacto = _jaccard(shingles[i], shingles[j])
+            errores.append(abs(exacto - dian_nodos.similitud_minhash(firmas[i], firmas[j])))
+
+    # Recall / precisión del LSH frente a búsqueda exacta por fuerza bruta
+    def exacta(i):
+        return {j for j in range(n) if _jaccard(shingles[i], shingles[j]) >= umbral}
+
+    def lsh(i):
+        return {int(c) for c, _ in indice.buscar(firmas[i], umbral)}
+
+    verdad, t_exacta = _cronometrar(lambda: [exacta(i) for i in muestra])
+    aprox, t_lsh = _cronometrar(lambda: [lsh(i) for i in muestra])
+    aciertos = sum(len(v & a) for v, a in zip(verdad, aprox))
+    total_verdad = sum(len(v) for v in verdad)
+    total_aprox = sum(len(a) for a in aprox)
+
+    return {
+        "respuestas": n,
+        "consultas": len(muestra),
+        "umbral": umbral,
+        "firma_ms": round(1000 * t_firmas / n, 3),
+        "error_medio_jaccard": round(sum(errores) / len(errores), 4),
+        "error_max_jaccard": round(max(errores), 4),
+        "recall": round(aciertos / max(total_verdad, 1), 4),
+        "precision": round(aciertos / max(total_aprox, 1), 4),
+        "consulta_exacta_ms": round(1000 * t_exacta / len(muestra), 3),
+        "consulta_lsh_ms": round(1000 * t_lsh / len(muestra), 3),
+    }
+
+
+def imprimir_minhash(r: dict):
+    print(f"\n{'='*55}")
+    print(f"  DIAN — MinHash/LSH ({r['respuestas']} respuestas, "
+          f"{r['consultas']} consultas, umbral {r['umbral']})")
+    print(f"{'='*55}")
+    print(f"  Firma por respuesta:      {r['firma_ms']} ms")
+    print(f"  Error vs Jaccard exacto:  medio {r['error_medio_jaccard']}  "
+          f"máx {r['error_max_jaccard']}")
+    print(f"  LSH recall / precisión:   {r['recall']:.2%} / {r['precision']:.2%}")
+    print(f"  Consulta exacta:          {r['consulta_exacta_ms']} ms")
+    print(f"  Consulta LSH:             {r['consulta_lsh_ms']} ms")
+    print(f"{'='*55}\n")
+
+
+# ─────────────────────────────────────────────
+# OLLAMA SIMULADO
+# ─────────────────────────────────────────────
+
+class OllamaSimulado:
+    """
+    Servidor Ollama local (/api/chat, /api/embed, /api/tags, /api/ps,
+    /api/generate) que imita su planificador:
+
+      - `paralelo` slots por modelo (OLLAMA_NUM_PARALLEL); el resto espera
+        en cola FIFO
+      - un solo modelo residente: cambiar de modelo espera a que terminen
+        las solicitudes en curso y cuesta `carga_s` (recarga de pesos)
+      - cada solicitud cuesta `latencia_s` de evaluación del prompt y cada
+        token `paso_s`, algo más con slots ocupados en paralelo (el
+        rendimiento agregado crece, el de cada solicitud baja)
+      - inyección de fallos: con probabilidad `tasa_fallos` responde 500 al
+        instante; con `tasa_bloqueos` se cuelga `bloqueo_s` y luego 500
+        (`semilla` fija la secuencia)
+
+    Responde `tokens` palabras y eval_count / eval_duration / load_duration /
+    prompt_eval_duration / total_duration como Ollama. /api/embed devuelve
+    vectores de bolsa de palabras (textos parecidos → vectores parecidos).
+    /api/generate (carga y descarga de GestorResidencia) no tiene efecto.
+    """
+
+    def __init__(self, paralelo: int = 4, tokens: int = 64, paso_s: float = 0.004,
+                 carga_s: float = 0.3, penalizacion_paralela: float = 0.15,
+                 vocabulario: list = None, latencia_s: float = 0.0,
+                 tasa_fallos: float = 0.0, tasa_bloqueos: float = 0.0,
+                 bloqueo_s: float = 30.0, semilla: int = None, dim_embed: int = 64):
+        self.paralelo = paralelo
+        self.vocabulario = vocabulario
+        self.tokens = tokens
+        self.paso_s = paso_s
+        self.carga_s = carga_s
+        self.penalizacion = penalizacion_paralela
+        self.latencia_s = latencia_s
+        self.tasa_fallos = tasa_fallos
+        self.tasa_bloqueos = tasa_bloqueos
+        self.bloqueo_s = bloqueo_s
+        self.dim_embed = dim_embed
+        self.cargado = None
+        self.activos = 0
+        self.recargas = 0
+        self.solicitudes = 0
+        self.fallos = 0
+        self._rng = random.Random(semilla)
+        self._turnos = []
+        self._cond = threading.Condition()
+        simulado = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in ("/api/tags", "/api/ps"):
+                    self._responder(200, {"models": []})
+                else:
+                    self._responder(404, {"error": "ruta no encontrada"})
+
+            def do_POST(self):
+                longitud = int(self.headers.get('Content-Length', 0))
+                cuerpo = json.loads(self.rfile.read(longitud))
+                if self.path == "/api/embed":
+                    self._responder(200, simulado.embeber(cuerpo.get("input", [])))
+                elif self.path == "/api/generate":
+                    self._responder(200, {"model": cuerpo.get("model"), "done": True})
+                elif simulado.fallar():
+                    self._responder(500, {"error": "fallo simulado"})
+                else:
+                    self._responder(200, simulado.atender(cuerpo.get("model", "?")))
+
+            def _responder(self, codigo, datos):
+                salida = json.dumps(datos).encode()
+                self.send_response(codigo)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', len(salida))
+                self.end_headers()
+                self.wfile.write(salida)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def fallar(self) -> bool:
+        """Sortea la inyección de fallos de una solicitud /api/chat."""
+        with self._cond:
+            self.solicitudes += 1
+            sorteo = self._rng.random()
+            falla = sorteo < self.tasa_fallos + self.tasa_bloqueos
+            if falla:
+                self.fallos += 1
+        if falla and sorteo >= self.tasa_fallos:
+            time.sleep(self.bloqueo_s)
+        return falla
+
+    def embeber(self, textos) -> dict:
+        vectores = []
+        for texto in [textos] if isinstance(textos, str) else textos:
+            vector = [0.0] * self.dim_embed
+            for palabra in texto.lower().split():
+                vector[zlib.crc32(palabra.encode()) % self.dim_embed] += 1.0
+            norma = sum(v * v for v in vector) ** 0.5 or 1.0
+            vectores.append([v / norma for v in vector])
+        return {"embeddings": vectores}
+
+    def atender(self, modelo: str) -> dict:
+        turno = object()
+        carga = 0.0
+        with self._cond:
+            self._turnos.append(turno)
+            while not (self._turnos[0] is turno and self.activos < self.paralelo
+                       and (self.cargado == modelo or self.activos == 0)):
+                self._cond.wait()
+            self._turnos.pop(0)
+            if self.cargado != modelo:
+                carga = self.carga_s
+                self.recargas += 1
+                self.cargado = modelo
+            self.activos += 1
+            concurrentes = self.activos
+            self._cond.notify_all()
+        time.sleep(carga + self.latencia_s)
+        duracion = self.tokens * self.paso_s * (1 + self.penalizacion * (concurrentes - 1))
+        time.sleep(duracion)
+        with self._cond:
+            self.activos -= 1
+            self._cond.notify_all()
+        if self.vocabulario:
+            rng = random.Random()
+            contenido = " ".join(rng.choice(self.vocabulario) for _ in range(self.tokens))
+        else:
+            contenido = " ".join(["token"] * self.tokens)
+        return {
+            "model": modelo,
+            "message": {"role": "assistant", "content": contenido},
+            "eval_count": self.tokens,
+            "eval_duration": int(duracion * 1e9),
+            "load_duration": int(carga * 1e9),
+            "prompt_eval_duration": int(self.latencia_s * 1e9),
+            "total_duration": int((carga + self.latencia_s + duracion) * 1e9),
+            "done": True,
+        }
+
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: MICRO-LOTES
+# ─────────────────────────────────────────────
+
+def _rafaga(consultar, solicitudes: int, modelos: list, llegada_s: float, semilla: int = 3):
+    """Clientes concurrentes con llegadas repartidas en `llegada_s`; retorna (tokens, segundos)."""
+    rng = random.Random(semilla)
+    plan = sorted((rng.uniform(0, llegada_s), rng.choice(modelos)) for _ in range(solicitudes))
+    tokens = [0] * solicitudes
+    inicio = time.perf_counter()
+
+    def cliente(i, retardo, modelo):
+        time.sleep(max(0.0, inicio + retardo - time.perf_counter()))
+        tokens[i] = len(consultar(f"prompt {i}", modelo).split())
+
+    hilos = [threading.Thread(target=cliente, args=(i, r, m)) for i, (r, m) in enumerate(plan)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return sum(tokens), time.perf_counter() - inicio
+
+
+def bench_lotes(solicitudes: int = 48, paralelo: int = 4, modelos: int = 2,
+                llegada_s: float = 0.5) -> dict:
+    nombres = [f"modelo-{i}" for i in range(modelos)]
+    resultados = {}
+    for modo in ("directo", "lotes"):
+        ollama = OllamaSimulado(paralelo=paralelo)
+        url_original = dian_nodos.OLLAMA_URL
+        dian_nodos.OLLAMA_URL = ollama.url
+        loteador = None
+        try:
+            if modo == "lotes":
+                loteador = dian_nodos.LoteadorOllama(paralelismo=paralelo)
+                consultar = loteador.enviar
+            else:
+                consultar = dian_nodos.consultar_ollama_local
+            tokens, segundos = _rafaga(consultar, solicitudes, nombres, llegada_s)
+        finally:
+            if loteador:
+                loteador.cerrar()
+            dian_nodos.OLLAMA_URL = url_original
+            ollama.cerrar()
+        resultados[modo] = {
+            "tokens_s": round(tokens / segundos, 1),
+            "segundos": round(segundos, 3),
+            "recargas": ollama.recargas,
+            "lotes": loteador.estadisticas()["lotes"] if loteador else solicitudes,
+        }
+    return {
+        "solicitudes": solicitudes,
+        "paralelo": paralelo,
+        "modelos": modelos,
+        **resultados,
+        "aceleracion": round(resultados["lotes"]["tokens_s"] / resultados["directo"]["tokens_s"], 2),
+    }
+
+
+def imprimir_lotes(r: dict):
+    print(f"\n{'='*55}")
+    print(f"  DIAN — Micro-lotes ({r['solicitudes']} solicitudes, "
+          f"{r['modelos']} modelos, paralelo {r['paralelo']})")
+    print(f"{'='*55}")
+    for modo in ("directo", "lotes"):
+        d = r[modo]
+        print(f"  {modo:<8} {d['tokens_s']:>8} tok/s  {d['segundos']:>6}s  "
+              f"recargas {d['recargas']:>3}  lotes {d['lotes']}")
+    print(f"  Aceleración: {r['aceleracion']}×")
+    print(f"{'='*55}\n")
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: FORMATO DE TRANSPORTE
+# ─────────────────────────────────────────────
+
+class EnlaceLento:
+    """
+    Proxy TCP local que imita el WiFi hacia el nodo móvil: `latencia_s`
+    por tramo y ancho de banda de `kbps` por sentido. Cuenta los bytes
+    que cruzan en cada sentido (cabeceras HTTP incluidas).
+    """
+
+    def __init__(self, destino_puerto: int, kbps: float = 1000, latencia_s: float = 0.03):
+        self.destino = ('127.0.0.1', destino_puerto)
+        self.bytes_por_s = kbps * 1000 / 8
+        self.latencia_s = latencia_s
+        self.bytes_subida = 0
+        self.bytes_bajada = 0
+        self._lock = threading.Lock()
+        self._escucha = socket.socket()
+        self._escucha.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._escucha.bind(('127.0.0.1', 0))
+        self._escucha.listen(64)
+        self.puerto = self._escucha.getsockname()[1]
+        threading.Thread(target=self._aceptar, daemon=True).start()
+
+    def _aceptar(self):
+        while True:
+            try:
+                cliente, _ = self._escucha.accept()
+            except OSError:
+                return
+            servidor = socket.create_connection(self.destino)
+            threading.Thread(target=self._bombear, args=(cliente, servidor, "bytes_subida"),
+                             daemon=True).start()
+            threading.Thread(target=self._bombear, args=(servidor, cliente, "bytes_bajada"),
+                             daemon=True).start()
+
+    def _bombear(self, origen, destino, contador: str):
+        primero = True
+        try:
+            while True:
+                datos = origen.recv(4096)
+                if not datos:
+                    break
+                if primero:
+                    time.sleep(self.latencia_s)
+                    primero = False
+                time.sleep(len(datos) / self.bytes_por_s)
+                with self._lock:
+                    setattr(self, contador, getattr(self, contador) + len(datos))
+                destino.sendall(datos)
+        except OSError:
+            pass
+        finally:
+            for s in (origen, destino):
+                try:
+                    s.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def reiniciar(self):
+        with self._lock:
+            self.bytes_subida = self.bytes_bajada = 0
+
+    def cerrar(self):
+        self._escucha.close()
+
+
+def bench_transporte(solicitudes: int = 20, kbps: float = 1000, latencia_ms: float = 30,
+                     tokens: int = 400) -> dict:
+    """Mismo nodo y mismas respuestas; varía Accept / Accept-Encoding del cliente."""
+    ollama = OllamaSimulado(paralelo=4, tokens=tokens, paso_s=0.0, carga_s=0.0,
+                            vocabulario=vocabulario_dian())
+    url_original = dian_nodos.OLLAMA_URL
+    dian_nodos.OLLAMA_URL = ollama.url
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), dian_nodos.DIANHandler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    enlace = EnlaceLento(servidor.server_port, kbps, latencia_ms / 1000)
+    nodo = {"ip": "127.0.0.1", "puerto": enlace.puerto, "descripcion": "enlace lento"}
+
+    modos = {"json": ((), False), "json+gzip": (("gzip",), False),
+             "sobre": ((), True), "sobre+gzip": (("gzip",), True)}
+    if "zstd" in dian_nodos.codificaciones_soportadas():
+        modos["json+zstd"] = (("zstd",), False)
+        modos["sobre+zstd"] = (("zstd",), True)
+
+    resultados = {}
+    try:
+        for modo, (codificaciones, sobre) in modos.items():
+            enlace.reiniciar()
+            latencias = []
+            for i in range(solicitudes):
+                inicio = time.perf_counter()
+                r = dian_nodos.consultar_nodo_remoto(f"prompt {i}", nodo,
+                                                     codificaciones=codificaciones, sobre=sobre)
+                latencias.append(time.perf_counter() - inicio)
+                assert "error" not in r, r
+            latencias.sort()
+            resultados[modo] = {
+                "bytes_bajada": enlace.bytes_bajada // solicitudes,
+                "bytes_subida": enlace.bytes_subida // solicitudes,
+                "latencia_p50_ms": round(1000 * latencias[len(latencias) // 2], 1),
+                "latencia_media_ms": round(1000 * sum(latencias) / len(latencias), 1),
+            }
+    finally:
+        enlace.cerrar()
+        servidor.shutdown()
+        servidor.server_close()
+        ollama.cerrar()
+        dian_nodos.OLLAMA_URL = url_original
+    return {"solicitudes": solicitudes, "kbps": kbps, "latencia_ms": latencia_ms,
+            "tokens": tokens, "modos": resultados}
+
+
+def imprimir_transporte(r: dict):
+    print(f"\n{'='*62}")
+    print(f"  DIAN — Transporte ({r['solicitudes']} solicitudes, {r['tokens']} palabras, "
+          f"{r['kbps']} kbps, {r['latencia_ms']} ms)")
+    print(f"{'='*62}")
+    base = r["modos"]["json"]
+    print(f"  {'modo':<12} {'bajada B':>9} {'vs json':>8} {'subida B':>9} {'p50 ms':>8} {'media ms':>9}")
+    for modo, m in r["modos"].items():
+        print(f"  {modo:<12} {m['bytes_bajada']:>9} "
+              f"{m['bytes_bajada'] / base['bytes_bajada']:>7.0%} {m['bytes_subida']:>9} "
+              f"{m['latencia_p50_ms']:>8} {m['latencia_media_ms']:>9}")
+    print(f"{'='*62}\n")
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: ARRANQUE
+# ─────────────────────────────────────────────
+
+# Lo que importa cada modo antes de tocar la red. Cada escenario se ejecuta
+# en un intérprete nuevo con -X importtime (como cada `--modo cliente`)
+_MER_DIRECTO = ("import importlib.util as u; "
+                "s = u.spec_from_file_location('mer_v02', 'MER_v0.2.py'); "
+                "s.loader.exec_module(u.module_from_spec(s))")
+ESCENARIOS_ARRANQUE = {
+    "interprete": ["-c", "pass"],
+    "ayuda": ["dian_nodos.py", "--help"],
+    "ping": ["-c", "import dian_nodos, dian_cliente_async; dian_nodos.NODOS"],
+    "cliente": ["-c", "import dian_nodos, dian_cliente_async; "
+                      "dian_nodos.preparar_inferencia('hola', 'nodo-3-redmi')"],
+    "servidor": ["-c", "import dian_nodos; dian_nodos.DIANHandler"],
+    "mer": ["-c", _MER_DIRECTO],
+}
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def _importtime(stderr: str) -> dict:
+    """{módulo: µs acumulados} de los imports de primer nivel."""
+    modulos = {}
+    for linea in stderr.splitlines():
+        m = _IMPORTTIME.match(linea)
+        if m and not m.group(3):
+            modulos[m.group(4)] = int(m.group(2))
+    return modulos
+
+
+def bench_arranque(escenarios: list = None, repeticiones: int = 10) -> dict:
+    """
+    Tiempo de arranque por escenario: pared del proceso completo (mediana y
+    mínimo) e imports según -X importtime (mediana), con los módulos de
+    primer nivel más caros.
+    """
+    directorio = Path(__file__).resolve().parent
+    resultados = {}
+    for nombre in escenarios or ESCENARIOS_ARRANQUE:
+        paredes, imports, por_modulo = [], [], {}
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            proceso = subprocess.run(
+                [sys.executable, "-X", "importtime", *ESCENARIOS_ARRANQUE[nombre]],
+                cwd=directorio, capture_output=True, text=True)
+            paredes.append(time.perf_counter() - inicio)
+            modulos = _importtime(proceso.stderr)
+            imports.append(sum(modulos.values()))
+            for modulo, us in modulos.items():
+                por_modulo.setdefault(modulo, []).append(us)
+        caros = sorted(((statistics.median(v) / 1000, m) for m, v in por_modulo.items()),
+                       reverse=True)[:5]
+        resultados[nombre] = {
+            "pared_ms": round(statistics.median(paredes) * 1000, 1),
+            "pared_min_ms": round(min(paredes) * 1000, 1),
+            "imports_ms": round(statistics.median(imports) / 1000, 1),
+            "modulos": {m: round(ms, 1) for ms, m in caros},
+        }
+    return {"repeticiones": repeticiones, "python": platform.python_version(),
+            "escenarios": resultados}
+
+
+def imprimir_arranque(r: dict):
+    print(f"\n{'='*62}")
+    print(f"  DIAN — Arranque (Python {r['python']}, mediana de {r['repeticiones']})")
+    print(f"{'='*62}")
+    print(f"  {'escenario':<12} {'pared ms':>9} {'mín ms':>8} {'imports ms':>11}")
+    for nombre, e in r["escenarios"].items():
+        print(f"  {nombre:<12} {e['pared_ms']:>9} {e['pared_min_ms']:>8} {e['imports_ms']:>11}")
+    for nombre, e in r["escenarios"].items():
+        if e["modulos"]:
+            print(f"  {nombre}: " + ", ".join(f"{m} {ms}" for m, ms in e["modulos"].items()))
+    print(f"{'='*62}\n")
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: CLÚSTER SIMULADO
+# ─────────────────────────────────────────────
+
+# Velocidades relativas de los equipos de NODOS, aceleradas para que una
+# corrida dure segundos: tokens/s, evaluación del prompt y slots de Ollama
+PERFILES_CLUSTER = [
+    {"nodo_id": "nodo-1-mac-principal", "tokens_s": 400, "latencia_s": 0.05, "paralelo": 2},
+    {"nodo_id": "nodo-2-mbp2011", "tokens_s": 250, "latencia_s": 0.08, "paralelo": 1},
+    {"nodo_id": "nodo-3-redmi", "tokens_s": 150, "latencia_s": 0.12, "paralelo": 1},
+]
+
+# Cada nodo es un proceso aparte con su propio iniciar_servidor (LOTEADOR,
+# RESIDENCIA y SALUD son globales del módulo, como en un equipo real)
+_ARRANQUE_NODO = (
+    "import sys, dian_nodos\n"
+    "dian_nodos.OLLAMA_URL = sys.argv[3]\n"
+    "dian_nodos.iniciar_servidor(sys.argv[1], puerto=int(sys.argv[2]),"
+    " paralelismo=int(sys.argv[4]))\n"
+)
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class ClusterSimulado:
+    """
+    Un proceso `iniciar_servidor` por perfil en 127.0.0.1, cada uno con su
+    OllamaSimulado (tokens/s, latencia, slots y fallos del perfil).
+    `nodos`: [(nodo_id, config)] con el formato de NODOS.
+    """
+
+    def __init__(self, perfiles: list = None, tokens: int = 32, carga_s: float = 0.2,
+                 tasa_fallos: float = 0.0, tasa_bloqueos: float = 0.0,
+                 bloqueo_s: float = 5.0, semilla: int = 11, arranque_s: float = 20.0):
+        self.perfiles = perfiles or PERFILES_CLUSTER
+        self.ollamas = []
+        self.procesos = []
+        self.nodos = []
+        vocabulario = vocabulario_dian()
+        try:
+            for i, perfil in enumerate(self.perfiles):
+                ollama = OllamaSimulado(
+                    paralelo=perfil["paralelo"], tokens=tokens,
+                    paso_s=1 / perfil["tokens_s"], carga_s=carga_s,
+                    latencia_s=perfil["latencia_s"], vocabulario=vocabulario,
+                    tasa_fallos=perfil.get("tasa_fallos", tasa_fallos),
+                    tasa_bloqueos=perfil.get("tasa_bloqueos", tasa_bloqueos),
+                    bloqueo_s=bloqueo_s, semilla=semilla + i)
+                self.ollamas.append(ollama)
+                puerto = _puerto_libre()
+                self.procesos.append(subprocess.Popen(
+                    [sys.executable, "-c", _ARRANQUE_NODO, perfil["nodo_id"], str(puerto),
+                     ollama.url, str(perfil["paralelo"])],
+                    cwd=Path(__file__).parent, stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL))
+                self.nodos.append((perfil["nodo_id"], {
+                    "ip": "127.0.0.1", "puerto": puerto, "platform": "simulado",
+                    "descripcion": f"{perfil['nodo_id']} (simulado)", "modelos": {},
+                }))
+            self._esperar(arranque_s)
+        except BaseException:
+            self.cerrar()
+            raise
+
+    def _esperar(self, arranque_s: float):
+        limite = time.monotonic() + arranque_s
+        for proceso, (nodo_id, config) in zip(self.procesos, self.nodos):
+            url = f"http://127.0.0.1:{config['puerto']}/ping"
+            while True:
+                if proceso.poll() is not None:
+                    raise RuntimeError(f"{nodo_id} terminó al arrancar ({proceso.returncode})")
+                try:
+                    with urllib.request.urlopen(url, timeout=1):
+                        break
+                except OSError:
+                    if time.monotonic() > limite:
+                        raise RuntimeError(f"{nodo_id} no respondió en {arranque_s}s")
+                    time.sleep(0.05)
+
+    def cerrar(self):
+        for proceso in self.procesos:
+            proceso.terminate()
+        for proceso in self.procesos:
+            try:
+                proceso.wait(5)
+            except subprocess.TimeoutExpired:
+                proceso.kill()
+        for ollama in self.ollamas:
+            ollama.cerrar()
+
+    def __enter__(self) -> 'ClusterSimulado':
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _percentiles(segundos: list) -> dict:
+    """p50 / p95 / p99 por rango más cercano, en ms."""
+    if not segundos:
+        return {"n": 0}
+    orden = sorted(segundos)
+
+    def p(q):
+        return round(1000 * orden[min(len(orden) - 1, max(0, math.ceil(q * len(orden)) - 1))], 1)
+
+    return {"n": len(orden), "p50_ms": p(0.50), "p95_ms": p(0.95), "p99_ms": p(0.99),
+            "media_ms": round(1000 * sum(orden) / len(orden), 1),
+            "max_ms": round(1000 * orden[-1], 1)}
+
+
+def _fallida(resultado: dict) -> bool:
+    # Un fallo de Ollama llega como texto "ERROR_OLLAMA: ..." con HTTP 200
+    return "error" in resultado or resultado.get("output", "").startswith("ERROR_OLLAMA")
+
+
+def _resumen_carga(latencias: list, segundos: float, errores: int, tokens: int) -> dict:
+    n = len(latencias)
+    return {
+        "solicitudes": n,
+        "errores": errores,
+        "segundos": round(segundos, 3),
+        "solicitudes_s": round(n / segundos, 2) if segundos else 0.0,
+        "tokens_s": round(tokens / segundos, 1) if segundos else 0.0,
+        "latencia": _percentiles(latencias),
+    }
+
+
+async def _carga_cliente(cliente, nodos: list, solicitudes: int, concurrencia: int) -> dict:
+    """Consultas interactivas sueltas, `concurrencia` a la vez, repartidas entre nodos."""
+    pendientes = list(range(solicitudes))
+    latencias, errores, tokens = [], 0, 0
+
+    async def trabajador():
+        nonlocal errores, tokens
+        while pendientes:
+            i = pendientes.pop()
+            nodo_id, config = nodos[i % len(nodos)]
+            inicio = time.perf_counter()
+            r = await cliente.consultar_medido(f"consulta {i}", nodo_id, config,
+                                               prioridad="interactiva")
+            latencias.append(time.perf_counter() - inicio)
+            errores += _fallida(r)
+            tokens += len(r.get("output", "").split())
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return _resumen_carga(latencias, time.perf_counter() - inicio, errores, tokens)
+
+
+async def _carga_consenso(cliente, nodos: list, rondas: int) -> dict:
+    """Rondas de consenso sucesivas sobre todos los nodos."""
+    latencias, errores, tokens = [], 0, 0
+    inicio = time.perf_counter()
+    for i in range(rondas):
+        t0 = time.perf_counter()
+        r = await cliente.consenso(f"ronda de consenso {i}", [(n, dict(c)) for n, c in nodos])
+        latencias.append(time.perf_counter() - t0)
+        for respuesta in r["resultados"]:
+            errores += _fallida(respuesta["resultado"])
+            tokens += len(respuesta["resultado"].get("output", "").split())
+    return _resumen_carga(latencias, time.perf_counter() - inicio, errores, tokens)
+
+
+async def _carga_lote(cliente, nodos: list, prompts: int) -> dict:
+    """ClienteDIAN.lote: latencia de cada consulta tomada de su tramo de traza."""
+    inicio = time.perf_counter()
+    with dian_trazas.tramo("bench.lote") as traza:
+        filas = await cliente.lote([f"lote {i}" for i in range(prompts)], nodos)
+    segundos = time.perf_counter() - inicio
+    latencias = [t["duracion_s"] for t in dian_trazas.TRAZADOR.tramos(traza["traza"])
+                 if t["nombre"] == "cliente.consultar" and not t.get("error")]
+    errores = sum(_fallida(f["resultado"]) for f in filas)
+    tokens = sum(len(f["resultado"].get("output", "").split()) for f in filas)
+    resumen = _resumen_carga(latencias, segundos, errores, tokens)
+    resumen["solicitudes"] = prompts
+    resumen["solicitudes_s"] = round(prompts / segundos, 2)
+    return resumen
+
+
+async def _carga_mer(cliente, nodos: list, conversaciones: int) -> dict:
+    """
+    Consulta a un nodo y codificación de la conversación en MER
+    (encode_with_dian_attribution, extracción local) con los embeddings
+    de /api/embed del Ollama simulado. Latencia de la tubería completa;
+    "mer" es solo la parte de MER.
+    """
+    import mer_bench  # numpy + MER_v0.2: solo si se pide esta carga
+    sistema = mer_bench.mer.EmergentMemorySystem(nodo_id="nodo-bench",
+                                                 concept_extraction="local")
+    sistema._get_embedding = lambda texto: (dian_nodos._ollama_post(
+        "/api/embed", {"model": dian_nodos.MODELO_EMBED, "input": texto}, timeout=30)
+        or {"embeddings": [None]})["embeddings"][0]
+    bucle = asyncio.get_running_loop()
+    latencias, latencias_mer, errores, tokens = [], [], 0, 0
+    inicio = time.perf_counter()
+    for i in range(conversaciones):
+        nodo_id, config = nodos[i % len(nodos)]
+        t0 = time.perf_counter()
+        r = await cliente.consultar_medido(f"conversación {i}", nodo_id, config)
+        t1 = time.perf_counter()
+        await bucle.run_in_executor(None, sistema.encode_with_dian_attribution,
+                                    f"conversación {i}\n{r.get('output', '')}", nodo_id)
+        latencias.append(time.perf_counter() - t0)
+        latencias_mer.append(time.perf_counter() - t1)
+        errores += _fallida(r)
+        tokens += len(r.get("output", "").split())
+    sistema.close()
+    resumen = _resumen_carga(latencias, time.perf_counter() - inicio, errores, tokens)
+    resumen["mer"] = _percentiles(latencias_mer)
+    resumen["conceptos"] = len(sistema.concept_graph)
+    return resumen
+
+
+CARGAS_CLUSTER = ("cliente", "consenso", "lote", "mer")
+
+
+def bench_cluster(perfiles: list = None, solicitudes: int = 60, concurrencia: int = 8,
+                  rondas: int = 10, conversaciones: int = 20, tokens: int = 32,
+                  tasa_fallos: float = 0.0, tasa_bloqueos: float = 0.0,
+                  bloqueo_s: float = 5.0, semilla: int = 11,
+                  cargas: tuple = CARGAS_CLUSTER) -> dict:
+    """
+    Arranca un ClusterSimulado y mide rendimiento y latencia p50/p95/p99 de
+    cada carga con un ClienteDIAN nuevo. La salida de consola de consenso
+    y MER se descarta.
+    """
+    perfiles = perfiles or PERFILES_CLUSTER
+    configuracion = {
+        "perfiles": perfiles, "solicitudes": solicitudes, "concurrencia": concurrencia,
+        "rondas": rondas, "conversaciones": conversaciones, "tokens": tokens,
+        "tasa_fallos": tasa_fallos, "tasa_bloqueos": tasa_bloqueos,
+        "bloqueo_s": bloqueo_s, "semilla": semilla,
+    }
+    resultados = {}
+    url_original = dian_nodos.OLLAMA_URL
+    with ClusterSimulado(perfiles, tokens=tokens, tasa_fallos=tasa_fallos,
+                         tasa_bloqueos=tasa_bloqueos, bloqueo_s=bloqueo_s,
+                         semilla=semilla) as cluster:
+        # Embeddings del consenso y de MER: el Ollama simulado del primer nodo
+        dian_nodos.OLLAMA_URL = cluster.ollamas[0].url
+
+        async def medir(carga):
+            async with ClienteDIAN("bench", limite_por_nodo=concurrencia) as cliente:
+                if carga == "cliente":
+                    return await _carga_cliente(cliente, cluster.nodos, solicitudes, concurrencia)
+                if carga == "consenso":
+                    return await _carga_consenso(cliente, cluster.nodos, rondas)
+                if carga == "lote":
+                    return await _carga_lote(cliente, cluster.nodos, solicitudes)
+                return await _carga_mer(cliente, cluster.nodos, conversaciones)
+
+        try:
+            for carga in cargas:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    resultados[carga] = asyncio.run(medir(carga))
+        finally:
+            dian_nodos.OLLAMA_URL = url_original
+        fallos = {o.url: o.fallos for o in cluster.ollamas}
+    return {
+        "version": 1,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "plataforma": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "configuracion": configuracion,
+        "fallos_inyectados": sum(fallos.values()),
+        "cargas": resultados,
+    }
+
+
+def imprimir_cluster(r: dict):
+    c = r["configuracion"]
+    print(f"\n{'='*78}")
+    print(f"  DIAN — Clúster simulado ({len(c['perfiles'])} nodos, {c['tokens']} tokens, "
+          f"fallos {c['tasa_fallos']:.0%}, bloqueos {c['tasa_bloqueos']:.0%})")
+    print(f"{'='*78}")
+    print(f"  {'carga':<10} {'n':>5} {'err':>4} {'sol/s':>8} {'tok/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for carga, m in r["cargas"].items():
+        lat = m["latencia"]
+        print(f"  {carga:<10} {m['solicitudes']:>5} {m['errores']:>4} {m['solicitudes_s']:>8} "
+              f"{m['tokens_s']:>8} {lat.get('p50_ms', '—'):>9} {lat.get('p95_ms', '—'):>9} "
+              f"{lat.get('p99_ms', '—'):>9}")
+    if "mer" in r["cargas"]:
+        mer_lat = r["cargas"]["mer"]["mer"]
+        print(f"  (MER sola: p50 {mer_lat.get('p50_ms')} ms, p95 {mer_lat.get('p95_ms')} ms)")
+    print(f"  Fallos inyectados: {r['fallos_inyectados']}")
+    print(f"{'='*78}\n")
+
+
+def guardar_resultados(r: dict, ruta: str) -> Path:
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    ruta.write_text(json.dumps(r, ensure_ascii=False, indent=2), encoding="utf-8")
+    return ruta
+
+
+def comparar_resultados(base: dict, actual: dict, tolerancia: float = 0.15) -> list:
+    """
+    Regresiones de `actual` frente a `base` (mismo JSON de bench_cluster):
+    p95 más de `tolerancia` por encima o solicitudes/s más de `tolerancia`
+    por debajo. Retorna [(carga, métrica, base, actual)].
+    """
+    regresiones = []
+    for carga, m in actual["cargas"].items():
+        b = base.get("cargas", {}).get(carga)
+        if not b:
+            continue
+        p95_base, p95 = b["latencia"].get("p95_ms"), m["latencia"].get("p95_ms")
+        if p95_base and p95 and p95 > p95_base * (1 + tolerancia):
+            regresiones.append((carga, "p95_ms", p95_base, p95))
+        if b["solicitudes_s"] and m["solicitudes_s"] < b["solicitudes_s"] * (1 - tolerancia):
+            regresiones.append((carga, "solicitudes_s", b["solicitudes_s"], m["solicitudes_s"]))
+    return regresiones
+
+
+def imprimir_comparacion(regresiones: list, tolerancia: float):
+    if not regresiones:
+        print(f"  Sin regresiones (tolerancia {tolerancia:.0%})\n")
+        return
+    print(f"  REGRESIONES (tolerancia {tolerancia:.0%}):")
+    for carga, metrica, antes, ahora in regresiones:
+        print(f"    {carga:<10} {metrica:<14} {antes} → {ahora}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DIAN — Benchmarks de nodos')
+    parser.add_argument('--bench', choices=['minhash', 'lotes', 'transporte', 'arranque',
+                                            'cluster', 'todos'],
+                        default='todos', help='Benchmark a ejecutar')
+    parser.add_argument('--respuestas', type=int, default=2000,
+                        help='Respuestas sintéticas indexadas (minhash)')
+    parser.add_argument('--solicitudes', type=int, default=48,
+                        help='Solicitudes concurrentes (lotes); por carga (cluster)')
+    parser.add_argument('--paralelo', type=int, default=4,
+                        help='Slots paralelos del Ollama simulado (lotes)')
+    parser.add_argument('--modelos', type=int, default=2,
+                        help='Modelos distintos en la ráfaga (lotes)')
+    parser.add_argument('--kbps', type=float, default=1000,
+                        help='Ancho de banda del enlace simulado (transporte)')
+    parser.add_argument('--latencia-ms', type=float, default=30,
+                        help='Latencia del enlace simulado (transporte)')
+    parser.add_argument('--escenarios', type=str, default=','.join(ESCENARIOS_ARRANQUE),
+                        help='Escenarios de arranque separados por comas')
+    parser.add_argument('--repeticiones', type=int, default=10,
+                        help='Procesos nuevos por escenario (arranque)')
+    parser.add_argument('--cargas', type=str, default=','.join(CARGAS_CLUSTER),
+                        help='Cargas del clúster separadas por comas (cliente,consenso,lote,mer)')
+    parser.add_argument('--concurrencia', type=int, default=8,
+                        help='Consultas simultáneas del cliente (cluster)')
+    parser.add_argument('--rondas', type=int, default=10,
+                        help='Rondas de consenso (cluster)')
+    parser.add_argument('--conversaciones', type=int, default=20,
+                        help='Conversaciones codificadas en MER (cluster)')
+    parser.add_argument('--fallos', type=float, default=0.0,
+                        help='Probabilidad de 500 inmediato del Ollama simulado (cluster)')
+    parser.add_argument('--bloqueos', type=float, default=0.0,
+                        help='Probabilidad de que el Ollama simulado se cuelgue (cluster)')
+    parser.add_argument('--semilla', type=int, default=11,
+                        help='Semilla de la inyección de fallos (cluster)')
+    parser.add_argument('--salida', type=str, default='',
+                        help='JSON de resultados (cluster; por defecto bench_resultados/cluster_<fecha>.json)')
+    parser.add_argument('--comparar', type=str, default='',
+                        help='JSON de una corrida anterior: informa regresiones y sale con código 1')
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help='Margen de p95 y solicitudes/s antes de marcar regresión')
+    args = parser.parse_args()
+
+    if args.bench in ('minhash', 'todos'):
+        imprimir_minhash(bench_minhash(args.respuestas))
+    if args.bench in ('lotes', 'todos'):
+        imprimir_lotes(bench_lotes(args.solicitudes, args.paralelo, args.modelos))
+    if args.bench in ('transporte', 'todos'):
+        imprimir_transporte(bench_transporte(kbps=args.kbps, latencia_ms=args.latencia_ms))
+    if args.bench in ('arranque', 'todos'):
+        imprimir_arranque(bench_arranque([e for e in args.escenarios.split(',') if e],
+                                         args.repeticiones))
+    if args.bench in ('cluster', 'todos'):
+        r = bench_cluster(solicitudes=args.solicitudes, concurrencia=args.concurrencia,
+                          rondas=args.rondas, conversaciones=args.conversaciones,
+                          tasa_fallos=args.fallos, tasa_bloqueos=args.bloqueos,
+                          semilla=args.semilla,
+                          cargas=tuple(c for c in args.cargas.split(',') if c))
+        imprimir_cluster(r)
+        salida = args.salida or f"bench_resultados/cluster_{datetime.now():%Y%m%d_%H%M%S}.json"
+        print(f"  Resultados: {guardar_resultados(r, salida)}")
+        if args.comparar:
+            base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+            regresiones = comparar_resultados(base, r, args.tolerancia)
+            imprimir_comparacion(regresiones, args.tolerancia)
+            if regresiones:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,569 @@
+"""
+DIAN — dian_cliente_async.py v0.1
+Cliente asyncio para nodos DIAN.
+
+Implementa:
+  - HTTP/1.1 sobre asyncio (solo stdlib) con conexiones persistentes por nodo
+  - Semáforo por nodo: a lo sumo `limite_por_nodo` solicitudes en vuelo
+  - Timeouts por solicitud y cancelación real: una solicitud cancelada
+    descarta su conexión en vez de dejar un hilo bloqueado
+  - Consulta, ping, barrido del clúster, consenso y lotes como corrutinas
+  - Si el nodo se cae con una consulta ya enviada, se recupera su resultado
+    de GET /resultado/<hash_aporte> cuando el nodo la reanuda desde su diario
+  - ejecutar(): puente síncrono sobre un bucle compartido en segundo plano;
+    consultar_nodo_remoto, ping_nodo, consenso_distribuido, barrido_cluster
+    y demás funciones cliente de dian_nodos son envoltorios finos sobre él,
+    así que también reutilizan las conexiones
+
+Uso:
+    import asyncio
+    import dian_nodos
+    from dian_cliente_async import ClienteDIAN
+
+    async def principal():
+        async with ClienteDIAN("orquestador") as cliente:
+            filas = await cliente.barrido()
+            consenso = await cliente.consenso("¿Qué es DIAN?",
+                                              list(dian_nodos.NODOS.items()))
+            respuestas = await cliente.lote(["prompt 1", "prompt 2", ...])
+
+    asyncio.run(principal())
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import asyncio
+import threading
+import time
+
+import dian_nodos
+import dian_trazas
+
+RECUPERACION_S = 60.0        # espera máxima a que un nodo caído vuelva con el resultado
+ESPERA_RESULTADO_S = 15.0    # espera larga por cada GET /resultado
+
+
+# ─────────────────────────────────────────────
+# HTTP/1.1 SOBRE ASYNCIO
+# ─────────────────────────────────────────────
+
+async def _leer_respuesta(lector: asyncio.StreamReader) -> tuple:
+    """(código, cabeceras en minúsculas, cuerpo, conexión reutilizable)."""
+    linea = await lector.readline()
+    if not linea:
+        raise ConnectionResetError("El nodo cerró la conexión")
+    partes = linea.decode('latin-1').split(None, 2)
+    version, codigo = partes[0], int(partes[1])
+
+    cabeceras = {}
+    while True:
+        linea = await lector.readline()
+        if linea in (b"\r\n", b"\n", b""):
+            break
+        nombre, _, valor = linea.decode('latin-1').partition(":")
+        cabeceras[nombre.strip().lower()] = valor.strip()
+
+    delimitado = True
+    if "content-length" in cabeceras:
+        cuerpo = await lector.readexactly(int(cabeceras["content-length"]))
+    elif cabeceras.get("transfer-encoding", "").lower() == "chunked":
+        trozos = []
+        while True:
+            largo = int((await lector.readline()).split(b";")[0].strip() or b"0", 16)
+            if largo == 0:
+                await lector.readline()
+                break
+            trozos.append(await lector.readexactly(largo))
+            await lector.readline()
+        cuerpo = b"".join(trozos)
+    else:
+        cuerpo = await lector.read()
+        delimitado = False
+
+    reutilizable = delimitado and version == "HTTP/1.1" and \
+        cabeceras.get("connection", "").lower() != "close"
+    return codigo, cabeceras, cuerpo, reutilizable
+
+
+class ClienteDIAN:
+    """
+    Cliente asíncrono de nodos DIAN.
+
+    Mantiene hasta `limite_por_nodo` conexiones HTTP/1.1 abiertas por nodo
+    y el mismo límite de solicitudes simultáneas (semáforo por nodo).
+    Todas las solicitudes tienen timeout; al cancelarse una tarea su
+    conexión se cierra y no vuelve al pool.
+
+    Comparte con dian_nodos el registro SALUD, los histogramas de latencia
+    y el presupuesto de cobertura.
+
+    Si el nodo corta la conexión con una consulta ya enviada, se espera
+    hasta `recuperacion_s` (0: no esperar) a que vuelva y la entregue desde
+    su diario por /resultado.
+    """
+
+    def __init__(self, nodo_local_id: str = "cliente", limite_por_nodo: int = 4,
+                 timeout: float = 180.0, recuperacion_s: float = RECUPERACION_S):
+        self.nodo_local_id = nodo_local_id
+        self.limite_por_nodo = limite_por_nodo
+        self.timeout = timeout
+        self.recuperacion_s = recuperacion_s
+        self._libres: dict = {}
+        self._semaforos: dict = {}
+        self._cerrado = False
+
+    async def __aenter__(self) -> 'ClienteDIAN':
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.cerrar()
+
+    def _semaforo(self, clave: tuple) -> asyncio.Semaphore:
+        if clave not in self._semaforos:
+            self._semaforos[clave] = asyncio.Semaphore(self.limite_por_nodo)
+        return self._semaforos[clave]
+
+    async def solicitud(self, nodo_config: dict, metodo: str, ruta: str,
+                        cuerpo: bytes = None, cabeceras: dict = None,
+                        timeout: float = None) -> tuple:
+        """(código, cabeceras, cuerpo) de una solicitud HTTP al nodo."""
+        clave = (nodo_config['ip'], int(nodo_config['puerto']))
+        async with self._semaforo(clave):
+            return await asyncio.wait_for(
+                self._intercambio(clave, metodo, ruta, cuerpo, cabeceras or {}),
+                timeout or self.timeout)
+
+    async def _intercambio(self, clave: tuple, metodo: str, ruta: str,
+                           cuerpo: bytes, cabeceras: dict) -> tuple:
+        for intento in range(2):
+            libres = self._libres.get(clave)
+            reutilizada = bool(libres)
+            if reutilizada:
+                lector, escritor = libres.pop()
+            else:
+                lector, escritor = await asyncio.open_connection(*clave)
+            lineas = [f"{metodo} {ruta} HTTP/1.1", f"Host: {clave[0]}:{clave[1]}"]
+            lineas += [f"{nombre}: {valor}" for nombre, valor in cabeceras.items()]
+            if cuerpo is not None:
+                lineas.append(f"Content-Length: {len(cuerpo)}")
+            try:
+                escritor.write(("\r\n".join(lineas) + "\r\n\r\n").encode('latin-1') + (cuerpo or b""))
+                await escritor.drain()
+                codigo, cab, datos, reutilizable = await _leer_respuesta(lector)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                escritor.close()
+                # Una conexión del pool que el nodo ya cerró: reintentar con una nueva
+                if reutilizada and intento == 0:
+                    continue
+                raise
+            except BaseException:
+                escritor.close()  # timeout o cancelación: la respuesta quedó a medias
+                raise
+            if codigo == 503 and cab.get("x-dian-drenando") and intento == 0:
+                # Nodo en relevo: la conexión nueva llega al proceso que lo reemplaza
+                escritor.close()
+                continue
+            if reutilizable and not self._cerrado and \
+                    len(self._libres.setdefault(clave, [])) < self.limite_por_nodo:
+                self._libres[clave].append((lector, escritor))
+            else:
+                escritor.close()
+            return codigo, cab, datos
+
+    async def _get_json(self, nodo_config: dict, ruta: str, timeout: float) -> dict:
+        codigo, cab, cuerpo = await self.solicitud(
+            nodo_config, "GET", ruta,
+            cabeceras={"Accept-Encoding": ", ".join(dian_nodos.codificaciones_soportadas())},
+            timeout=timeout)
+        datos = dian_nodos.leer_cuerpo(cuerpo, cab.get("content-type"), cab.get("content-encoding"))
+        if codigo >= 400:
+            raise ConnectionError(datos.get("error", f"HTTP {codigo}"))
+        return datos
+
+    async def cerrar(self):
+        self._cerrado = True
+        for conexiones in self._libres.values():
+            for _, escritor in conexiones:
+                escritor.close()
+        self._libres.clear()
+
+    # ─────────────────────────────────────────
+    # INFERENCIA
+    # ─────────────────────────────────────────
+
+    async def consultar(self, prompt: str, nodo_config: dict, nodo_local_id: str = None,
+                        codificaciones: tuple = None, sobre: bool = False,
+                        plazo_s: float = None, **opciones) -> dict:
+        """Equivalente asíncrono de dian_nodos.consultar_nodo_remoto."""
+        nodo_id = nodo_config.get('id') or f"{nodo_config['ip']}:{nodo_config['puerto']}"
+        with dian_trazas.tramo("cliente.consultar", nodo_id=nodo_id) as traza:
+            aporte, payload, cabeceras = dian_nodos.preparar_inferencia(
+                prompt, nodo_local_id or self.nodo_local_id,
+                codificaciones=codificaciones, sobre=sobre, plazo_s=plazo_s, **opciones)
+            timeout = self.timeout if plazo_s is None else plazo_s + 5
+            limite = time.monotonic() + timeout
+            try:
+                codigo, cab, cuerpo = await self.solicitud(
+                    nodo_config, "POST", "/inferencia", payload, cabeceras, timeout)
+            except asyncio.TimeoutError:
+                traza["error"] = "timeout"
+                return dian_nodos.resultado_error(
+                    f"Nodo no alcanzable: sin respuesta en {timeout}s", nodo_config, aporte)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                recuperado = None
+                if isinstance(e, (ConnectionResetError, BrokenPipeError,
+                                  asyncio.IncompleteReadError)):
+                    # Conexión cortada con la solicitud ya enviada: el nodo pudo
+                    # reiniciarse y reanudarla desde su diario
+                    recuperado = await self._recuperar(
+                        nodo_config, aporte, cabeceras,
+                        min(limite, time.monotonic() + self.recuperacion_s))
+                if recuperado is None:
+                    traza["error"] = str(e)
+                    return dian_nodos.resultado_error(f"Nodo no alcanzable: {e}",
+                                                      nodo_config, aporte)
+                codigo, cab, cuerpo = recuperado
+                traza["atributos"]["recuperada"] = True
+
+            try:
+                datos = dian_nodos.leer_cuerpo(cuerpo, cab.get("content-type"),
+                                               cab.get("content-encoding"))
+            except Exception as e:
+                datos = {"error": f"Respuesta ilegible: {e}"}
+            if codigo >= 400:
+                traza["error"] = f"HTTP {codigo}"
+                return dian_nodos.resultado_error(datos.get("error", f"HTTP {codigo}"),
+                                                  nodo_config, aporte, codigo)
+        dian_trazas.TRAZADOR.importar(datos.pop("tramos", None))
+        datos["aporte_local"] = aporte
+        datos["traza_id"] = traza["traza"]
+        return datos
+
+    async def _recuperar(self, nodo_config: dict, aporte: dict, cabeceras: dict,
+                         limite: float) -> tuple:
+        """
+        (código, cabeceras, cuerpo) de GET /resultado/<hash_aporte> cuando el
+        nodo tenga la respuesta, reintentando mientras se reinicia. None si el
+        nodo no conoce la solicitud (no llegó a anotarla, o no tiene diario)
+        o si se alcanza `limite` (time.monotonic()).
+        """
+        from urllib.parse import quote
+        ruta = f"/resultado/{aporte['hash_aporte']}?timestamp={quote(aporte['timestamp'])}"
+        cabeceras = {k: v for k, v in cabeceras.items() if k != "Content-Type"}
+        while (restante := limite - time.monotonic()) > 0:
+            espera = min(restante, ESPERA_RESULTADO_S)
+            try:
+                codigo, cab, cuerpo = await self.solicitud(
+                    nodo_config, "GET", f"{ruta}&espera={espera:.1f}",
+                    cabeceras=cabeceras, timeout=espera + 5)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                codigo = None          # nodo aún reiniciándose
+            if codigo == 404:
+                return None
+            if codigo not in (None, 202, 503):
+                return codigo, cab, cuerpo
+            if codigo != 202:
+                await asyncio.sleep(min(1.0, max(0.0, limite - time.monotonic())))
+        return None
+
+    async def consultar_medido(self, prompt: str, nodo_id: str, nodo_config: dict,
+                               nodo_local_id: str = None, **opciones) -> dict:
+        """Equivalente asíncrono de dian_nodos.consultar_nodo_medido."""
+        salud = dian_nodos.SALUD
+        if not salud.disponible(nodo_id):
+            return {"error": "Nodo no disponible (circuito abierto)",
+                    "nodo": nodo_config['descripcion']}
+        dian_nodos.registrar_en_curso(nodo_id, +1)
+        inicio = time.time()
+        try:
+            resultado = await self.consultar(prompt, nodo_config, nodo_local_id, **opciones)
+        except asyncio.CancelledError:
+            # Cancelada por la cobertura: tardó al menos esto (cota inferior)
+            dian_nodos.histograma_nodo(nodo_id).observar(time.time() - inicio)
+            salud.liberar_prueba(nodo_id)
+            raise
+        finally:
+            dian_nodos.registrar_en_curso(nodo_id, -1)
+        dian_nodos.registrar_resultado_nodo(nodo_id, resultado, time.time() - inicio)
+        return resultado
+
+    async def consultar_con_cobertura(self, prompt: str, nodo_id: str, nodo_config: dict,
+                                      reservas: list, nodo_local_id: str = None,
+                                      presupuesto: 'dian_nodos.PresupuestoCobertura' = None,
+                                      timeout: float = 180, **opciones) -> dict:
+        """
+        Equivalente asíncrono de dian_nodos.consultar_con_cobertura. Aquí la
+        solicitud perdedora sí se cancela en cuanto llega la primera
+        respuesta válida.
+        """
+        presupuesto = dian_nodos.PRESUPUESTO_COBERTURA if presupuesto is None else presupuesto
+        presupuesto.registrar_primaria()
+        bucle = asyncio.get_running_loop()
+        inicio = bucle.time()
+
+        def lanzar(nid, config):
+            tarea = asyncio.ensure_future(
+                self.consultar_medido(prompt, nid, config, nodo_local_id, **opciones))
+            tareas[tarea] = nid
+
+        tareas: dict = {}
+        lanzar(nodo_id, nodo_config)
+        histograma = dian_nodos.histograma_nodo(nodo_id)
+        p90 = histograma.percentil(0.9) \
+            if histograma.total >= dian_nodos.MUESTRAS_MINIMAS_COBERTURA else None
+
+        ultimo = None
+        cubierto_por = None
+        try:
+            while tareas:
+                transcurrido = bucle.time() - inicio
+                restante = timeout - transcurrido
+                if restante <= 0:
+                    break
+                espera = restante
+                if p90 is not None and cubierto_por is None:
+                    espera = max(0.0, min(restante, p90 - transcurrido))
+                hechas, _ = await asyncio.wait(list(tareas), timeout=espera,
+                                               return_when=asyncio.FIRST_COMPLETED)
+                if not hechas:
+                    if p90 is not None and cubierto_por is None:
+                        reserva = dian_nodos._elegir_reserva(nodo_id, reservas)
+                        if reserva and presupuesto.consumir():
+                            cubierto_por = reserva[0]
+                            print(f"  [⏱] {nodo_id} supera p90 ({p90:.1f}s) — "
+                                  f"duplicando en {cubierto_por}")
+                            lanzar(*reserva)
+                        else:
+                            p90 = None  # sin reserva ni presupuesto: esperar al primario
+                    continue
+                for tarea in hechas:
+                    ultimo = (tareas.pop(tarea), tarea.result())
+                    if "error" not in ultimo[1]:
+                        break
+                if "error" not in ultimo[1]:
+                    break
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
+
+        if ultimo is None:
+            return {"error": f"Sin respuesta en {timeout}s",
+                    "nodo": nodo_config['descripcion']}
+        origen, resultado = ultimo
+        if cubierto_por:
+            resultado["cobertura"] = {"solicitada_a": cubierto_por,
+                                      "respondio": origen}
+        return resultado
+
+    # ─────────────────────────────────────────
+    # PING Y ESTADO DEL CLÚSTER
+    # ─────────────────────────────────────────
+
+    async def ping(self, nodo_id: str, nodo_config: dict,
+                   timeout: float = None):
+        """GET /ping; actualiza SALUD y retorna el JSON o None."""
+        salud = dian_nodos.SALUD
+        inicio = time.time()
+        try:
+            datos = await self._get_json(nodo_config, "/ping",
+                                         timeout or dian_nodos.TIMEOUT_SONDEO_S)
+        except (ConnectionRefusedError, ConnectionAbortedError):
+            # Conexión rechazada: el nodo está caído. Un timeout puede ser
+            # solo un nodo ocupado.
+            salud.registrar_fallo(nodo_id, abrir=True)
+            return None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            salud.registrar_fallo(nodo_id)
+            return None
+        salud.registrar_ping(nodo_id, datos, time.time() - inicio)
+        return datos
+
+    async def sondear_todos(self, nodos: list = None, timeout: float = None) -> dict:
+        """{nodo_id: JSON de /ping o None} de los nodos con circuito disponible."""
+        nodos = list(dian_nodos.NODOS.items() if nodos is None else nodos)
+        disponibles = [(nid, cfg) for nid, cfg in nodos if dian_nodos.SALUD.disponible(nid)]
+        respuestas = await asyncio.gather(*(self.ping(nid, cfg, timeout)
+                                            for nid, cfg in disponibles))
+        encontrados = {nid: r for (nid, _), r in zip(disponibles, respuestas)}
+        return {nid: encontrados.get(nid) for nid, _ in nodos}
+
+    async def estado_nodo(self, nodo_id: str, nodo_config: dict,
+                          timeout: float = None) -> dict:
+        """Fila de barrido_cluster: /ping y /estado de un nodo."""
+        fila = dian_nodos.fila_estado_vacia(nodo_id, nodo_config)
+        inicio = time.time()
+        datos = await self.ping(nodo_id, nodo_config, timeout)
+        if datos is not None:
+            fila["vivo"] = True
+            fila["latencia_ms"] = round(1000 * (time.time() - inicio), 1)
+            fila["modelo"] = datos.get("modelo")
+            try:
+                estado = await self._get_json(nodo_config, "/estado",
+                                              timeout or dian_nodos.TIMEOUT_SONDEO_S)
+                recursos = estado.get("recursos") or {}
+                fila["temperatura_c"] = recursos.get("temperatura_c")
+                fila["ram_pct"] = recursos.get("ram_pct")
+                fila["modelos_cargados"] = [m["nombre"] for m in estado.get("modelos_cargados") or []]
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                fila["error"] = str(e) or type(e).__name__
+        else:
+            fila["error"] = "no alcanzable"
+        fila["circuito"] = dian_nodos.SALUD.circuito(nodo_id)
+        return fila
+
+    async def barrido(self, nodos: list = None, timeout: float = None) -> list:
+        """
+        Estado de todos los nodos en paralelo dentro de una sola ventana de
+        `timeout`; los que no terminan se cancelan y figuran como "timeout".
+        """
+        nodos = list(dian_nodos.NODOS.items() if nodos is None else nodos)
+        timeout = timeout or dian_nodos.TIMEOUT_SONDEO_S
+        tareas = [asyncio.ensure_future(self.estado_nodo(nid, cfg, timeout)) for nid, cfg in nodos]
+        _, pendientes = await asyncio.wait(tareas, timeout=timeout)
+        for tarea in pendientes:
+            tarea.cancel()
+        filas = []
+        for (nid, cfg), tarea in zip(nodos, tareas):
+            if tarea in pendientes or tarea.cancelled():
+                fila = dian_nodos.fila_estado_vacia(nid, cfg)
+                fila.update(error="timeout", circuito=dian_nodos.SALUD.circuito(nid))
+                filas.append(fila)
+            else:
+                filas.append(tarea.result())
+        return filas
+
+    # ─────────────────────────────────────────
+    # CONSENSO Y LOTES
+    # ─────────────────────────────────────────
+
+    async def consenso(self, prompt: str, nodos: list, nodo_local_id: str = None,
+                       indice: 'dian_nodos.IndiceLSH' = None, cobertura: bool = False,
+                       nodos_reserva: list = None, plazo_s: float = None) -> dict:
+        """Equivalente asíncrono de dian_nodos.consenso_distribuido."""
+        with dian_trazas.tramo("consenso", nodos=len(nodos)) as traza:
+            resultado = await self._consenso(prompt, nodos, nodo_local_id, indice,
+                                             cobertura, nodos_reserva, plazo_s)
+        resultado["traza"] = {"id": traza["traza"],
+                              "duracion_s": traza["duracion_s"],
+                              "desglose": dian_trazas.desglose(traza["traza"])}
+        return resultado
+
+    async def _consenso(self, prompt, nodos, nodo_local_id, indice, cobertura,
+                        nodos_reserva, plazo_s) -> dict:
+        nodo_local_id = nodo_local_id or self.nodo_local_id
+        aporte_global = dian_nodos.iniciar_consenso(prompt, nodos, nodo_local_id)
+        # Reservas solo fuera del consenso: si no, un nodo respondería dos veces
+        consultados = {nodo_id for nodo_id, _ in nodos}
+        reservas = [(nid, cfg) for nid, cfg in
+                    (nodos_reserva if nodos_reserva is not None else dian_nodos.NODOS.items())
+                    if nid not in consultados]
+        cobertura = cobertura and bool(reservas)
+
+        async def consultar_nodo(nodo_id, nodo_config):
+            nodo_config['id'] = nodo_id
+            if dian_nodos.SALUD.rechaza(nodo_id):
+                print(f"\n[✗] Omitido {nodo_config['descripcion']} — circuito abierto")
+                resultado = {"error": "Nodo no disponible (circuito abierto)"}
+            else:
+                print(f"\n[→] Consultando {nodo_config['descripcion']}...")
+                if cobertura:
+                    resultado = await self.consultar_con_cobertura(
+                        prompt, nodo_id, nodo_config, reservas, nodo_local_id,
+                        prioridad="consenso", plazo_s=plazo_s)
+                else:
+                    resultado = await self.consultar_medido(
+                        prompt, nodo_id, nodo_config, nodo_local_id,
+                        prioridad="consenso", plazo_s=plazo_s)
+            return {"nodo": nodo_config['descripcion'], "nodo_id": nodo_id,
+                    "resultado": resultado}
+
+        resultados = await asyncio.gather(*(consultar_nodo(nid, cfg) for nid, cfg in nodos))
+        # Embeddings y LSH bloquean: fuera del bucle
+        with dian_trazas.tramo("consenso.analisis"):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, dian_nodos.analizar_consenso, nodos, aporte_global,
+                list(resultados), indice)
+
+    async def lote(self, prompts: list, nodos: list = None, nodo_local_id: str = None,
+                   **opciones) -> list:
+        """
+        Reparte `prompts` entre los nodos disponibles: `limite_por_nodo`
+        trabajadores por nodo toman prompts de una cola común, así los nodos
+        rápidos atienden más. Prioridad "lote" por defecto. Retorna
+        [{"indice", "nodo_id", "resultado"}] en el orden de `prompts`.
+        """
+        nodos = list(dian_nodos.NODOS.items() if nodos is None else nodos)
+        activos = [(nid, cfg) for nid, cfg in nodos if not dian_nodos.SALUD.rechaza(nid)] or nodos
+        opciones.setdefault("prioridad", "lote")
+        cola: asyncio.Queue = asyncio.Queue()
+        for i, prompt in enumerate(prompts):
+            cola.put_nowait((i, prompt))
+        resultados = [None] * len(prompts)
+
+        async def trabajador(nodo_id, nodo_config):
+            while not cola.empty():
+                i, prompt = cola.get_nowait()
+                resultado = await self.consultar_medido(prompt, nodo_id, nodo_config,
+                                                        nodo_local_id, **opciones)
+                if "error" in resultado and "codigo" not in resultado and len(activos) > 1:
+                    cola.put_nowait((i, prompt))  # nodo caído: que lo tome otro
+                    if dian_nodos.SALUD.rechaza(nodo_id):
+                        return
+                    continue
+                resultados[i] = {"indice": i, "nodo_id": nodo_id, "resultado": resultado}
+
+        await asyncio.gather(*(trabajador(nid, cfg)
+                               for nid, cfg in activos for _ in range(self.limite_por_nodo)))
+        for i, prompt in enumerate(prompts):
+            if resultados[i] is None:
+                resultados[i] = {"indice": i, "nodo_id": None,
+                                 "resultado": {"error": "Ningún nodo disponible"}}
+        return resultados
+
+
+# ─────────────────────────────────────────────
+# PUENTE SÍNCRONO
+# ─────────────────────────────────────────────
+
+_compartido = None
+_compartido_lock = threading.Lock()
+
+
+def _bucle_compartido() -> tuple:
+    """(bucle, cliente) en un hilo daemon, creados la primera vez."""
+    global _compartido
+    with _compartido_lock:
+        if _compartido is None:
+            bucle = asyncio.new_event_loop()
+            threading.Thread(target=bucle.run_forever, daemon=True,
+                             name="dian-cliente").start()
+            _compartido = (bucle, ClienteDIAN())
+        return _compartido
+
+
+def ejecutar(fabrica, timeout: float = None):
+    """
+    Ejecuta fabrica(cliente) — una corrutina del ClienteDIAN compartido —
+    y espera su resultado desde código síncrono. Si el llamador se
+    interrumpe (Ctrl+C, timeout) la corrutina se cancela.
+    """
+    if threading.current_thread().name == "dian-cliente":
+        raise RuntimeError("ejecutar() desde el bucle del cliente: usar await")
+    bucle, cliente = _bucle_compartido()
+    # La tarea corre en el hilo del bucle: llevarle la traza del llamador
+    traza = dian_trazas.actual()
+
+    async def con_traza():
+        if traza is None:
+            return await fabrica(cliente)
+        with dian_trazas.tramo("cliente.sync", remoto=traza):
+            return await fabrica(cliente)
+
+    futuro = asyncio.run_coroutine_threadsafe(con_traza(), bucle)
+    try:
+        return futuro.result(timeout)
+    except BaseException:
+        futuro.cancel()
+        raise
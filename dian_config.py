@@ -0,0 +1,346 @@
+"""
+DIAN — dian_config.py v0.1
+Configuración del clúster en un archivo JSON, validada y recargable en caliente.
+
+Implementa:
+  - cargar(): lee el archivo y lo valida contra el esquema (tipos, rangos,
+    claves desconocidas, orden de los umbrales térmicos); informa todos
+    los errores a la vez
+  - aplicar(): sustituye dian_nodos.NODOS, OLLAMA_URL, SERVIDOR_PUERTO y
+    dian_audit.LIMITES por objetos nuevos, una asignación por global:
+    una solicitud en curso termina con el dict que ya leyó y ninguna ve
+    uno a medio modificar. Las secciones ausentes vuelven al valor del
+    código
+  - vigilar(): recarga al cambiar el archivo (mtime, sondeo cada 2 s) o
+    con SIGHUP. Una configuración inválida se rechaza y se mantiene la
+    anterior; el servidor sigue atendiendo
+  - exportar(): escribe la configuración efectiva como plantilla
+
+Archivo (todas las secciones son opcionales):
+    {
+      "ollama_url": "http://localhost:11434",
+      "servidor_puerto": 8765,
+      "nodos": {
+        "nodo-1-mac-principal": {"ip": "172.16.33.136", "puerto": 8765,
+                                 "platform": "macos", "descripcion": "...",
+                                 "modelos": {"principal": "lfm2:latest"}}
+      },
+      "limites": {"temp_warn_c": 85.0, "temp_throttle_c": 92.0, "temp_emergency_c": 95.0}
+    }
+"nodos" reemplaza la lista completa; "limites" solo las claves indicadas.
+
+Uso:
+    python dian_config.py --exportar dian_config.json   # plantilla con los valores actuales
+    python dian_config.py --validar dian_config.json
+    python dian_nodos.py --modo servidor --config dian_config.json
+    kill -HUP <pid del servidor>                        # recargar sin esperar
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+ARCHIVO_DEFECTO = Path(__file__).with_name("dian_config.json")
+INTERVALO_VIGILANCIA_S = 2.0
+
+CLAVES = ("ollama_url", "servidor_puerto", "nodos", "limites")
+CAMPOS_NODO = {"ip": str, "puerto": int, "platform": str, "descripcion": str, "modelos": dict}
+UMBRALES_TERMICOS = ("temp_warn_c", "temp_throttle_c", "temp_emergency_c")
+
+_lock = threading.Lock()
+_defecto: dict = None      # valores del código, tomados antes de la primera aplicación
+_actual: dict = None
+
+
+class ErrorConfig(ValueError):
+    """Archivo de configuración ilegible o que no cumple el esquema."""
+
+
+def ruta_config(explicita: str = None):
+    """--config, si no DIAN_CONFIG, si no dian_config.json junto al código si existe."""
+    ruta = explicita or os.environ.get("DIAN_CONFIG")
+    if ruta:
+        return Path(ruta)
+    return ARCHIVO_DEFECTO if ARCHIVO_DEFECTO.exists() else None
+
+
+def _limites_codigo():
+    try:
+        import dian_audit
+        return dian_audit.LIMITES
+    except ImportError:
+        return None
+
+
+def efectiva() -> dict:
+    """Configuración vigente en los módulos, con el formato del archivo."""
+    import dian_nodos
+    config = {
+        "ollama_url": dian_nodos.OLLAMA_URL,
+        "servidor_puerto": dian_nodos.SERVIDOR_PUERTO,
+        "nodos": copy.deepcopy(dian_nodos.NODOS),
+    }
+    limites = _limites_codigo()
+    if limites is not None:
+        config["limites"] = dict(limites)
+    return config
+
+
+# ─────────────────────────────────────────────
+# VALIDACIÓN
+# ─────────────────────────────────────────────
+
+def _es_entero(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool)
+
+
+def _es_numero(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _validar_nodo(nodo_id: str, nodo, errores: list):
+    lugar = f"nodos.{nodo_id}"
+    if not isinstance(nodo, dict):
+        errores.append(f"{lugar}: se esperaba un objeto")
+        return
+    for campo in ("ip", "puerto"):
+        if campo not in nodo:
+            errores.append(f"{lugar}.{campo}: obligatorio")
+    for campo, valor in nodo.items():
+        tipo = CAMPOS_NODO.get(campo)
+        if tipo is None:
+            errores.append(f"{lugar}.{campo}: campo desconocido ({', '.join(CAMPOS_NODO)})")
+        elif tipo is int and not (_es_entero(valor) and 1 <= valor <= 65535):
+            errores.append(f"{lugar}.{campo}: se esperaba un puerto 1-65535")
+        elif tipo is not int and not isinstance(valor, tipo):
+            errores.append(f"{lugar}.{campo}: se esperaba {tipo.__name__}")
+        elif tipo is str and not valor.strip():
+            errores.append(f"{lugar}.{campo}: vacío")
+    modelos = nodo.get("modelos", {})
+    if isinstance(modelos, dict):
+        for rol, modelo in modelos.items():
+            if not isinstance(modelo, str) or not modelo:
+                errores.append(f"{lugar}.modelos.{rol}: se esperaba el nombre de un modelo")
+
+
+def validar(datos) -> dict:
+    """
+    Comprueba `datos` (JSON ya decodificado) y retorna la configuración
+    completa: valores del código con las secciones del archivo encima.
+    Lanza ErrorConfig con todos los errores encontrados.
+    """
+    if not isinstance(datos, dict):
+        raise ErrorConfig("la raíz debe ser un objeto JSON")
+    errores = [f"{clave}: clave desconocida ({', '.join(CLAVES)})"
+               for clave in datos if clave not in CLAVES]
+
+    url = datos.get("ollama_url")
+    if url is not None and not (isinstance(url, str) and url.startswith(("http://", "https://"))):
+        errores.append("ollama_url: se esperaba una URL http:// o https://")
+    puerto = datos.get("servidor_puerto")
+    if puerto is not None and not (_es_entero(puerto) and 1 <= puerto <= 65535):
+        errores.append("servidor_puerto: se esperaba un puerto 1-65535")
+
+    nodos = datos.get("nodos")
+    if nodos is not None:
+        if not isinstance(nodos, dict) or not nodos:
+            errores.append("nodos: se esperaba un objeto con al menos un nodo")
+        else:
+            for nodo_id, nodo in nodos.items():
+                _validar_nodo(nodo_id, nodo, errores)
+
+    base = _defecto or efectiva()
+    limites = dict(base.get("limites") or {})
+    if datos.get("limites") is not None:
+        if not isinstance(datos["limites"], dict):
+            errores.append("limites: se esperaba un objeto")
+        else:
+            for clave, valor in datos["limites"].items():
+                if limites and clave not in limites:
+                    errores.append(f"limites.{clave}: límite desconocido ({', '.join(limites)})")
+                elif not _es_numero(valor) or valor <= 0:
+                    errores.append(f"limites.{clave}: se esperaba un número positivo")
+                else:
+                    limites[clave] = valor
+    umbrales = [limites.get(c) for c in UMBRALES_TERMICOS]
+    if all(_es_numero(u) for u in umbrales) and not umbrales[0] < umbrales[1] < umbrales[2]:
+        errores.append("limites: se requiere temp_warn_c < temp_throttle_c < temp_emergency_c")
+
+    if errores:
+        raise ErrorConfig("; ".join(errores))
+    config = copy.deepcopy(base)
+    config.update({k: copy.deepcopy(v) for k, v in datos.items() if k != "limites"})
+    if "limites" in config:
+        config["limites"] = limites
+    for nodo_id, nodo in config["nodos"].items():
+        nodo.setdefault("platform", "desconocida")
+        nodo.setdefault("descripcion", nodo_id)
+        nodo.setdefault("modelos", {})
+    return config
+
+
+def cargar(ruta) -> dict:
+    """Lee y valida el archivo; ErrorConfig si no se puede usar."""
+    try:
+        datos = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    except OSError as e:
+        raise ErrorConfig(f"{ruta}: {e.strerror or e}") from e
+    except json.JSONDecodeError as e:
+        raise ErrorConfig(f"{ruta}: JSON inválido en línea {e.lineno}: {e.msg}") from e
+    return validar(datos)
+
+
+# ─────────────────────────────────────────────
+# APLICACIÓN
+# ─────────────────────────────────────────────
+
+def _cambios(antes: dict, despues: dict) -> list:
+    cambios = []
+    for clave in ("ollama_url", "servidor_puerto"):
+        if antes.get(clave) != despues.get(clave):
+            nota = " (al reiniciar el servidor)" if clave == "servidor_puerto" else ""
+            cambios.append(f"{clave}: {antes.get(clave)} → {despues.get(clave)}{nota}")
+    nodos_antes, nodos_despues = antes.get("nodos", {}), despues.get("nodos", {})
+    for nodo_id in nodos_despues.keys() - nodos_antes.keys():
+        cambios.append(f"nodos: +{nodo_id}")
+    for nodo_id in nodos_antes.keys() - nodos_despues.keys():
+        cambios.append(f"nodos: -{nodo_id}")
+    for nodo_id in nodos_antes.keys() & nodos_despues.keys():
+        if nodos_antes[nodo_id] != nodos_despues[nodo_id]:
+            cambios.append(f"nodos: ~{nodo_id}")
+    for clave, valor in (despues.get("limites") or {}).items():
+        if (antes.get("limites") or {}).get(clave) != valor:
+            cambios.append(f"limites.{clave}: {(antes.get('limites') or {}).get(clave)} → {valor}")
+    return sorted(cambios)
+
+
+def aplicar(config: dict, origen: str = "") -> list:
+    """
+    Instala `config` (ya validada) en dian_nodos y dian_audit. Retorna la
+    lista de cambios respecto a la configuración anterior.
+    """
+    global _defecto, _actual
+    import dian_nodos
+    with _lock:
+        if _defecto is None:
+            _defecto = efectiva()
+        antes = _actual or _defecto
+        # Una asignación por global: los lectores ven el objeto viejo o el nuevo
+        dian_nodos.NODOS = config["nodos"]
+        dian_nodos.OLLAMA_URL = config["ollama_url"]
+        dian_nodos.SERVIDOR_PUERTO = config["servidor_puerto"]
+        if "limites" in config:
+            import dian_audit
+            dian_audit.LIMITES = config["limites"]
+            if dian_nodos.RESIDENCIA is not None:
+                dian_nodos.RESIDENCIA.limite_gb = float(config["limites"]["ram_modelo_max_gb"])
+            # El estado térmico en caché se calculó con los umbrales anteriores
+            with dian_nodos._recursos_lock:
+                dian_nodos._recursos_cache["ts"] = 0.0
+        _actual = config
+        cambios = _cambios(antes, config)
+    if cambios and origen:
+        print(f"[DIAN] Configuración {origen}: " + ", ".join(cambios))
+        dian_nodos._auditar("modificar_config", f"{origen}: " + ", ".join(cambios)[:200], "APLICADO")
+    return cambios
+
+
+def recargar(ruta, origen: str = None) -> list:
+    """cargar() + aplicar(). ErrorConfig deja la configuración anterior intacta."""
+    return aplicar(cargar(ruta), origen or f"recargada de {ruta}")
+
+
+# ─────────────────────────────────────────────
+# RECARGA EN CALIENTE
+# ─────────────────────────────────────────────
+
+class VigilanteConfig:
+    """Recarga `ruta` cuando cambia su mtime/tamaño o al recibir SIGHUP."""
+
+    def __init__(self, ruta, intervalo_s: float = INTERVALO_VIGILANCIA_S):
+        self.ruta = Path(ruta)
+        self.intervalo_s = intervalo_s
+        self.recargas = 0
+        self.rechazos = 0
+        self._firma = self._leer_firma()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _leer_firma(self):
+        try:
+            st = self.ruta.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def recargar(self, origen: str):
+        try:
+            recargar(self.ruta, origen)
+            self.recargas += 1
+        except ErrorConfig as e:
+            self.rechazos += 1
+            print(f"[DIAN] Configuración rechazada, se mantiene la anterior: {e}")
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo_s):
+            firma = self._leer_firma()
+            if firma is not None and firma != self._firma:
+                self._firma = firma
+                self.recargar(f"recargada ({self.ruta.name} modificado)")
+
+    def iniciar(self) -> 'VigilanteConfig':
+        self._hilo = threading.Thread(target=self._bucle, daemon=True, name="dian-config")
+        self._hilo.start()
+        import signal
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            # La recarga lee disco: fuera del manejador de la señal
+            signal.signal(signal.SIGHUP, lambda *_: threading.Thread(
+                target=self.recargar, args=("recargada (SIGHUP)",), daemon=True).start())
+        return self
+
+    def detener(self):
+        self._detener.set()
+
+
+def vigilar(ruta, intervalo_s: float = INTERVALO_VIGILANCIA_S) -> VigilanteConfig:
+    return VigilanteConfig(ruta, intervalo_s).iniciar()
+
+
+def exportar(ruta) -> Path:
+    ruta = Path(ruta)
+    ruta.write_text(json.dumps(efectiva(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DIAN — Configuración del clúster')
+    parser.add_argument('--exportar', type=str, default='',
+                        help='Escribir la configuración actual del código como plantilla')
+    parser.add_argument('--validar', type=str, default='',
+                        help='Validar un archivo de configuración')
+    args = parser.parse_args()
+
+    if args.exportar:
+        print(f"Plantilla: {exportar(args.exportar)}")
+    elif args.validar:
+        try:
+            config = cargar(args.validar)
+        except ErrorConfig as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        print(f"OK: {len(config['nodos'])} nodos, Ollama {config['ollama_url']}, "
+              f"puerto {config['servidor_puerto']}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
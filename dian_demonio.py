@@ -0,0 +1,271 @@
+"""
+DIAN — dian_demonio.py v0.1
+Demonio cliente residente con socket UNIX local.
+
+Implementa:
+  - servir(): proceso residente que mantiene calientes las conexiones del
+    ClienteDIAN compartido, el registro de salud (sondeo /ping en segundo
+    plano), los histogramas de latencia de la cobertura, la caché de
+    embeddings y los índices LSH abiertos
+  - Protocolo: una línea JSON por solicitud y otra por respuesta sobre un
+    socket UNIX con permisos 0600 (solo el usuario dueño, sin puerto de red)
+  - solicitar(): lado cliente, solo socket + json. dian_nodos --modo
+    cliente / consenso / ping lo usa si el demonio está activo; si no,
+    ejecuta en su propio proceso como antes
+
+Cada consulta por el demonio se ahorra el arranque de asyncio y del
+cliente HTTP, el sondeo /ping previo y la conexión TCP a los nodos.
+
+Uso:
+    # Dejarlo corriendo (terminal aparte, launchd, termux-services...):
+    python dian_nodos.py --modo demonio
+
+    # Las consultas lo usan solas; --sin-demonio fuerza el modo anterior:
+    python dian_nodos.py --modo cliente --prompt "Tu pregunta aquí"
+    python dian_nodos.py --modo consenso --prompt "..." --sin-demonio
+
+    python dian_demonio.py --estado
+    python dian_demonio.py --detener
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+RUTA_SOCKET = os.environ.get("DIAN_SOCKET") or str(Path.home() / ".dian" / "cliente.sock")
+TIMEOUT_CONEXION_S = 0.5
+TIMEOUT_SOLICITUD_S = 900.0      # un consenso con nodos lentos tarda minutos
+INTERVALO_SALUD_S = 15.0
+
+
+class DemonioNoDisponible(ConnectionError):
+    """No hay demonio escuchando en el socket."""
+
+
+class ErrorDemonio(RuntimeError):
+    """El demonio recibió la solicitud pero no pudo completarla."""
+
+
+# ─────────────────────────────────────────────
+# CLIENTE (solo stdlib liviana: socket + json)
+# ─────────────────────────────────────────────
+
+def solicitar(op: str, ruta: str = None, timeout: float = TIMEOUT_SOLICITUD_S, **parametros):
+    """
+    Envía {"op", ...parametros} al demonio y retorna su "resultado".
+    DemonioNoDisponible si no hay demonio; ErrorDemonio si la operación falló.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise DemonioNoDisponible("Sin sockets UNIX en esta plataforma")
+    ruta = ruta or RUTA_SOCKET
+    conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conexion.settimeout(TIMEOUT_CONEXION_S)
+        try:
+            conexion.connect(ruta)
+        except OSError as e:
+            # FileNotFoundError / ConnectionRefusedError: socket viejo de un demonio caído
+            raise DemonioNoDisponible(f"{ruta}: {e}") from e
+        conexion.settimeout(timeout)
+        linea = json.dumps({"op": op, **parametros}, ensure_ascii=False) + "\n"
+        conexion.sendall(linea.encode("utf-8"))
+        with conexion.makefile("rb") as lector:
+            respuesta = lector.readline()
+    finally:
+        conexion.close()
+    if not respuesta:
+        raise ErrorDemonio("El demonio cerró la conexión sin responder")
+    datos = json.loads(respuesta)
+    if not datos.get("ok"):
+        raise ErrorDemonio(datos.get("error", "error desconocido"))
+    return datos.get("resultado")
+
+
+def activo(ruta: str = None) -> bool:
+    try:
+        solicitar("estado", ruta, timeout=TIMEOUT_CONEXION_S)
+        return True
+    except (DemonioNoDisponible, ErrorDemonio, OSError):
+        return False
+
+
+# ─────────────────────────────────────────────
+# DEMONIO
+# ─────────────────────────────────────────────
+
+class _Estado:
+    """Estado del proceso residente compartido por las conexiones."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.inicio = time.time()
+        self.solicitudes = 0
+        self.errores = 0
+        self.indices = {}          # ruta → IndiceLSH abierto
+        self.lock = threading.Lock()
+
+    def indice(self, ruta: str):
+        import dian_nodos
+        with self.lock:
+            if ruta not in self.indices:
+                try:
+                    self.indices[ruta] = dian_nodos.IndiceLSH.cargar(ruta)
+                except FileNotFoundError:
+                    self.indices[ruta] = dian_nodos.IndiceLSH()
+            return self.indices[ruta]
+
+    def guardar_indices(self):
+        with self.lock:
+            for ruta, indice in self.indices.items():
+                indice.guardar(ruta)
+
+
+def _op_cliente(estado: _Estado, p: dict):
+    import dian_nodos
+    import dian_trazas
+    config = dian_nodos.NODOS.get(p.get("nodo"))
+    if not config:
+        raise ValueError(f"Nodo '{p.get('nodo')}' no encontrado. "
+                         f"Nodos disponibles: {list(dian_nodos.NODOS)}")
+    # Sin sondeo previo: el registro de salud ya está al día
+    resultado = dian_nodos.consultar_nodo_medido(
+        p["prompt"], p["nodo"], config, rol=p.get("rol"),
+        prioridad="interactiva", plazo_s=p.get("plazo_s"))
+    if resultado.get("traza_id"):
+        resultado["desglose"] = dian_trazas.desglose(resultado["traza_id"])
+    return resultado
+
+
+def _op_consenso(estado: _Estado, p: dict):
+    import dian_nodos
+    indice = estado.indice(p["indice_lsh"]) if p.get("indice_lsh") else None
+    nodos, nodos_reserva = dian_nodos.nodos_consenso(p.get("reservas"))
+    resultado = dian_nodos.consenso_distribuido(
+        p["prompt"], nodos, indice=indice, cobertura=bool(p.get("cobertura")),
+        nodos_reserva=nodos_reserva, plazo_s=p.get("plazo_s"))
+    if indice is not None:
+        with estado.lock:
+            indice.guardar(p["indice_lsh"])
+    return resultado
+
+
+def _op_ping(estado: _Estado, p: dict):
+    import dian_nodos
+    return dian_nodos.barrido_cluster()
+
+
+def _op_estado(estado: _Estado, p: dict):
+    import dian_nodos
+    return {
+        "pid": os.getpid(),
+        "socket": estado.ruta,
+        "activo_s": round(time.time() - estado.inicio, 1),
+        "solicitudes": estado.solicitudes,
+        "errores": estado.errores,
+        "indices_lsh": sorted(estado.indices),
+        "salud": dian_nodos.SALUD.resumen(),
+    }
+
+
+OPERACIONES = {
+    "cliente": _op_cliente,
+    "consenso": _op_consenso,
+    "ping": _op_ping,
+    "estado": _op_estado,
+}
+
+
+def servir(ruta: str = None, intervalo_salud: float = INTERVALO_SALUD_S):
+    """Atiende el socket hasta Ctrl+C, SIGTERM o una solicitud "detener"."""
+    import signal
+    import socketserver
+    import dian_nodos
+
+    ruta = ruta or RUTA_SOCKET
+    if activo(ruta):
+        print(f"[DIAN] Ya hay un demonio en {ruta}")
+        return
+    Path(ruta).parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if os.path.exists(ruta):
+        os.unlink(ruta)            # socket de un demonio que no cerró limpio
+    estado = _Estado(ruta)
+
+    class Manejador(socketserver.StreamRequestHandler):
+        def handle(self):
+            for linea in self.rfile:
+                try:
+                    p = json.loads(linea)
+                    op = p.get("op")
+                    if op == "detener":
+                        self._responder({"ok": True, "resultado": "deteniendo"})
+                        threading.Thread(target=servidor.shutdown, daemon=True).start()
+                        return
+                    if op not in OPERACIONES:
+                        raise ValueError(f"Operación desconocida: {op}")
+                    resultado = OPERACIONES[op](estado, p)
+                    estado.solicitudes += 1
+                    self._responder({"ok": True, "resultado": resultado})
+                except Exception as e:
+                    estado.errores += 1
+                    self._responder({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+        def _responder(self, datos: dict):
+            self.wfile.write(json.dumps(datos, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    # El socket nace 0600: con chmod después del bind quedaría un instante
+    # abierto a otros usuarios (p.ej. si DIAN_SOCKET apunta a /tmp)
+    umask = os.umask(0o177)
+    try:
+        servidor = socketserver.ThreadingUnixStreamServer(ruta, Manejador)
+    finally:
+        os.umask(umask)
+    servidor.daemon_threads = True
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=servidor.shutdown, daemon=True).start())
+
+    dian_nodos.SALUD.iniciar(intervalo=intervalo_salud)
+    print(f"[DIAN] Demonio cliente en {ruta} (pid {os.getpid()})")
+    print(f"[DIAN] Salud de {len(dian_nodos.NODOS)} nodos cada {intervalo_salud:.0f}s — Ctrl+C para detener")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        dian_nodos.SALUD.detener()
+        estado.guardar_indices()
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+        print("\n[DIAN] Demonio detenido.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DIAN — Demonio cliente')
+    parser.add_argument('--socket', type=str, default=RUTA_SOCKET,
+                        help='Ruta del socket UNIX (también DIAN_SOCKET)')
+    parser.add_argument('--estado', action='store_true', help='Estado del demonio activo')
+    parser.add_argument('--detener', action='store_true', help='Detener el demonio activo')
+    args = parser.parse_args()
+
+    if not (args.estado or args.detener):
+        servir(args.socket)
+        return
+    try:
+        resultado = solicitar("detener" if args.detener else "estado", args.socket)
+    except DemonioNoDisponible:
+        print(f"[DIAN] No hay demonio en {args.socket}")
+        sys.exit(1)
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
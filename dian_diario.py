@@ -0,0 +1,287 @@
+"""
+DIAN — dian_diario.py v0.1
+Diario de solicitudes (write-ahead log) del nodo servidor.
+
+Implementa:
+  - aceptar(): la solicitud de inferencia se anota (y se sincroniza a
+    disco) ANTES de procesarla; completar() / fallar() la cierran con la
+    respuesta o el error
+  - abrir(): al reiniciar el nodo, relee el diario, descarta lo vencido,
+    lo compacta y retorna las solicitudes sin terminar para reanudarlas
+  - Resultados recientes en memoria, por aporte (hash_aporte + timestamp:
+    dos preguntas iguales son aportes distintos). dian_nodos los sirve en
+    GET /resultado/<hash_aporte> y responde a reintentos del mismo aporte
+    sin volver a consultar Ollama
+  - Una línea JSON por evento, escrita con un solo write() en modo append:
+    el proceso de relevo y el que drena pueden compartir el archivo
+
+Privacidad: el prompt solo se guarda mientras la solicitud está pendiente;
+al compactar, las terminadas conservan únicamente la respuesta. El archivo
+se crea con permisos 0600 y nunca sale del nodo.
+
+Uso:
+    from dian_diario import DiarioSolicitudes
+    diario = DiarioSolicitudes("~/.dian/diario-8765.jsonl")
+    for entrada in diario.abrir():
+        ...                                  # reanudar entrada["cuerpo"]
+    clave = clave_aporte(hash_aporte, timestamp_aporte)
+    entrada, nueva = diario.aceptar(clave, cuerpo)
+    diario.completar(clave, respuesta)
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+MAX_ENTRADAS = 512           # resultados terminados que se conservan
+RETENCION_S = 3600.0         # y durante cuánto tiempo
+MAX_INTENTOS = 3             # reanudaciones antes de abandonar una solicitud
+COMPACTAR_CADA = 4           # compactar cuando el archivo tenga 4× MAX_ENTRADAS líneas
+# Fallos del nodo, no de la solicitud (502: Ollama no respondió): un
+# reintento del mismo aporte la vuelve a procesar en vez de repetir el error
+CODIGOS_REINTENTABLES = (502,)
+
+ESTADOS = ("pendiente", "completada", "fallida")
+
+
+def clave_aporte(hash_aporte: str, timestamp_aporte: str) -> str:
+    """Clave de una solicitud en el diario: "<hash_aporte>@<timestamp_aporte>"."""
+    return f"{hash_aporte}@{timestamp_aporte}"
+
+
+class DiarioSolicitudes:
+    """
+    Diario de solicitudes de un nodo, indexado por clave_aporte().
+    sincronizar=True: fsync tras cada línea (una inferencia tarda segundos;
+    el fsync, milisegundos).
+    """
+
+    def __init__(self, ruta: str, max_entradas: int = MAX_ENTRADAS,
+                 retencion_s: float = RETENCION_S, sincronizar: bool = True):
+        self.ruta = Path(ruta).expanduser()
+        self.max_entradas = max_entradas
+        self.retencion_s = retencion_s
+        self.sincronizar = sincronizar
+        self.cargado = False
+        self._entradas: "OrderedDict[str, dict]" = OrderedDict()
+        self._lineas = 0
+        self._fd = None
+        self._lock = threading.Lock()
+        self._stats = {"aceptadas": 0, "completadas": 0, "fallidas": 0,
+                       "reanudadas": 0, "duplicadas": 0, "compactaciones": 0}
+
+    # ─────────────────────────────────────────
+    # ESCRITURA
+    # ─────────────────────────────────────────
+
+    def _abrir_fd(self):
+        self.ruta.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._fd = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _anotar(self, evento: dict):
+        """Llamar con self._lock tomado."""
+        if self._fd is None:
+            self._abrir_fd()
+        linea = json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+        os.write(self._fd, linea.encode("utf-8"))
+        if self.sincronizar:
+            os.fsync(self._fd)
+        self._lineas += 1
+
+    @staticmethod
+    def _nueva(clave: str, cuerpo: dict = None, ts: float = None) -> dict:
+        return {"clave": clave, "estado": "pendiente", "cuerpo": cuerpo,
+                "aceptada": ts or time.time(), "intentos": 0, "respuesta": None,
+                "error": None, "codigo": None, "terminada": None,
+                "evento": threading.Event()}
+
+    def aceptar(self, clave: str, cuerpo: dict) -> tuple:
+        """
+        (entrada, nueva). Si la clave ya está en el diario (reintento del
+        cliente o solicitud reanudada) no se anota de nuevo: nueva=False y
+        el llamador espera / reutiliza esa entrada. Una fallida con código
+        de CODIGOS_REINTENTABLES se acepta otra vez como nueva.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and not (entrada["estado"] == "fallida"
+                                            and entrada["codigo"] in CODIGOS_REINTENTABLES):
+                self._stats["duplicadas"] += 1
+                return entrada, False
+            entrada = self._nueva(clave, cuerpo)
+            self._anotar({"tipo": "aceptada", "clave": clave,
+                          "ts": entrada["aceptada"], "cuerpo": cuerpo})
+            self._entradas[clave] = entrada
+            self._stats["aceptadas"] += 1
+            return entrada, True
+
+    def reanudar(self, clave: str) -> dict:
+        """Anota un nuevo intento de una solicitud pendiente; retorna consultar()."""
+        with self._lock:
+            entrada = self._entradas[clave]
+            entrada["intentos"] += 1
+            self._anotar({"tipo": "reanudada", "clave": clave, "ts": time.time()})
+            self._stats["reanudadas"] += 1
+            return self._copia(entrada)
+
+    def _terminar(self, clave: str, estado: str, **campos):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada["estado"] != "pendiente":
+                return
+            entrada.update(campos, estado=estado, cuerpo=None, terminada=time.time())
+            self._anotar({"tipo": estado, "clave": clave, "ts": entrada["terminada"],
+                          **campos})
+            self._stats[estado + "s"] += 1
+            self._entradas.move_to_end(clave)
+            self._podar()
+            # Antes de abrir() el archivo puede ser aún del proceso relevado
+            if self.cargado and self._lineas > COMPACTAR_CADA * self.max_entradas:
+                self._compactar()
+        entrada["evento"].set()
+
+    def completar(self, clave: str, respuesta: dict):
+        self._terminar(clave, "completada", respuesta=respuesta)
+
+    def fallar(self, clave: str, error: str, codigo: int = 500):
+        self._terminar(clave, "fallida", error=error, codigo=codigo)
+
+    # ─────────────────────────────────────────
+    # LECTURA
+    # ─────────────────────────────────────────
+
+    @staticmethod
+    def _copia(entrada: dict) -> dict:
+        return {k: v for k, v in entrada.items() if k != "evento"}
+
+    def consultar(self, clave: str) -> dict:
+        """Copia de la entrada (sin el evento) o None."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            return self._copia(entrada) if entrada else None
+
+    def ultima(self, hash_aporte: str) -> str:
+        """Clave de la solicitud más reciente de ese hash_aporte, o None."""
+        prefijo = hash_aporte + "@"
+        with self._lock:
+            return next((c for c in reversed(self._entradas) if c.startswith(prefijo)), None)
+
+    def esperar(self, clave: str, timeout: float = None) -> dict:
+        """Espera hasta `timeout` s a que la entrada termine; retorna consultar()."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+        if entrada is not None:
+            entrada["evento"].wait(timeout)
+        return self.consultar(clave)
+
+    def pendientes(self) -> list:
+        with self._lock:
+            return [self._copia(e) for e in self._entradas.values() if e["estado"] == "pendiente"]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            estados = {e: 0 for e in ESTADOS}
+            for entrada in self._entradas.values():
+                estados[entrada["estado"]] += 1
+            return {"ruta": str(self.ruta), "cargado": self.cargado,
+                    "lineas": self._lineas, **estados, **self._stats}
+
+    # ─────────────────────────────────────────
+    # REINICIO Y COMPACTACIÓN
+    # ─────────────────────────────────────────
+
+    def abrir(self) -> list:
+        """
+        Relee el diario (una línea truncada por un corte se ignora), lo
+        compacta y retorna las solicitudes que otro proceso dejó pendientes.
+        Las entradas ya presentes en memoria (aceptadas por este proceso,
+        p.ej. durante un relevo) tienen prioridad y no se retornan.
+        """
+        leidas: "OrderedDict[str, dict]" = OrderedDict()
+        with self._lock:
+            try:
+                with open(self.ruta, encoding="utf-8") as f:
+                    for linea in f:
+                        try:
+                            evento = json.loads(linea)
+                            self._aplicar(leidas, evento)
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except FileNotFoundError:
+                pass
+            heredadas = []
+            for clave, entrada in leidas.items():
+                if clave in self._entradas:
+                    continue
+                self._entradas[clave] = entrada
+                if entrada["estado"] == "pendiente":
+                    heredadas.append(clave)
+                else:
+                    entrada["evento"].set()
+            self._podar()
+            self._compactar()
+            self.cargado = True
+            return [self._copia(self._entradas[h]) for h in heredadas]
+
+    def _aplicar(self, entradas: OrderedDict, evento: dict):
+        clave, tipo = evento["clave"], evento["tipo"]
+        if tipo == "aceptada":
+            entrada = entradas[clave] = self._nueva(clave, evento.get("cuerpo"),
+                                                          evento["ts"])
+            entrada["intentos"] = evento.get("intentos", 0)
+        elif tipo == "reanudada":
+            entradas[clave]["intentos"] += 1
+        elif tipo in ("completada", "fallida"):
+            entrada = entradas.setdefault(clave, self._nueva(clave, ts=evento["ts"]))
+            entrada.update(estado=tipo, cuerpo=None, terminada=evento["ts"],
+                           respuesta=evento.get("respuesta"), error=evento.get("error"),
+                           codigo=evento.get("codigo"))
+            entradas.move_to_end(clave)
+
+    def _podar(self):
+        """Descarta terminadas vencidas y las más antiguas por encima de max_entradas."""
+        limite = time.time() - self.retencion_s
+        terminadas = [h for h, e in self._entradas.items() if e["estado"] != "pendiente"]
+        sobran = len(terminadas) - self.max_entradas
+        for i, clave in enumerate(terminadas):
+            if i < sobran or self._entradas[clave]["terminada"] < limite:
+                del self._entradas[clave]
+
+    def _compactar(self):
+        """Reescribe el diario con el estado actual (atómico: temporal + os.replace)."""
+        temporal = self.ruta.with_name(self.ruta.name + ".tmp")
+        self.ruta.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        lineas = 0
+        with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+            for e in self._entradas.values():
+                if e["estado"] == "pendiente":
+                    evento = {"tipo": "aceptada", "clave": e["clave"], "ts": e["aceptada"],
+                              "cuerpo": e["cuerpo"], "intentos": e["intentos"]}
+                else:
+                    evento = {"tipo": e["estado"], "clave": e["clave"], "ts": e["terminada"]}
+                    evento.update({"respuesta": e["respuesta"]} if e["estado"] == "completada"
+                                  else {"error": e["error"], "codigo": e["codigo"]})
+                f.write(json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n")
+                lineas += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._abrir_fd()
+        self._lineas = lineas
+        self._stats["compactaciones"] += 1
+
+    def cerrar(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,226 @@
+"""
+DIAN — dian_metricas.py v0.1
+Métricas de proceso en formato de texto Prometheus (solo stdlib).
+
+Implementa:
+  - Contadores e histogramas sin locks en el camino caliente: cada hilo
+    escribe solo en su propio fragmento (threading.local) y la lectura
+    suma los fragmentos; el lock solo se toma al registrar un hilo nuevo
+    y al exportar
+  - Medidores calculados en el momento de exportar (colas, temperatura...)
+  - exponer(): formato de exposición de texto 0.0.4 (# HELP / # TYPE,
+    _bucket{le=...} / _sum / _count) legible por Prometheus y compatibles
+
+Uso:
+    from dian_metricas import REGISTRO
+    solicitudes = REGISTRO.contador("dian_solicitudes_total", "Solicitudes HTTP")
+    solicitudes.inc(ruta="/inferencia", codigo="200")
+    print(REGISTRO.exponer())
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import bisect
+import math
+import threading
+import weakref
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+                    10, 30, 60, 120, 300)
+# Cada cuántos fragmentos nuevos se suman y descartan los de hilos terminados
+RETIRAR_CADA = 64
+
+
+def _etiquetas(etiquetas: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formato_etiquetas(etiquetas: tuple, extra: tuple = ()) -> str:
+    pares = etiquetas + extra
+    if not pares:
+        return ""
+    escapar = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    if math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    def __init__(self, registro: 'Registro', nombre: str, ayuda: str):
+        self.registro = registro
+        self.nombre = nombre
+        self.ayuda = ayuda
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas):
+        datos = self.registro._fragmento()
+        clave = (self.nombre, _etiquetas(etiquetas))
+        datos[clave] = datos.get(clave, 0) + valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, registro: 'Registro', nombre: str, ayuda: str,
+                 buckets: tuple = BUCKETS_SEGUNDOS):
+        super().__init__(registro, nombre, ayuda)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas):
+        datos = self.registro._fragmento()
+        clave = (self.nombre, _etiquetas(etiquetas))
+        serie = datos.get(clave)
+        if serie is None:
+            # [conteos por bucket (+Inf al final), suma, total]
+            serie = datos[clave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        serie[0][bisect.bisect_left(self.buckets, valor)] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+
+class Medidor(_Metrica):
+    """
+    Valor calculado al exportar: funcion() → número o [(etiquetas, valor)].
+    tipo="counter" para totales que ya lleva otro objeto (p.ej. cargas de
+    GestorResidencia) y que solo se leen al exportar.
+    """
+
+    def __init__(self, registro: 'Registro', nombre: str, ayuda: str, funcion,
+                 tipo: str = "gauge"):
+        super().__init__(registro, nombre, ayuda)
+        self.funcion = funcion
+        self.tipo = tipo
+
+    def series(self) -> list:
+        try:
+            valor = self.funcion()
+        except Exception:
+            return []
+        if valor is None:
+            return []
+        if isinstance(valor, (int, float)):
+            return [((), float(valor))]
+        return [(_etiquetas(e), float(v)) for e, v in valor if v is not None]
+
+
+class Registro:
+    """Conjunto de métricas del proceso (ver REGISTRO)."""
+
+    def __init__(self):
+        self.metricas: dict = {}
+        self._local = threading.local()
+        self._fragmentos: list = []   # [(weakref al hilo, dict)]
+        self._retirados: dict = {}    # fragmentos de hilos terminados, ya sumados
+        self._nuevos = 0
+        self._lock = threading.Lock()
+
+    def _fragmento(self) -> dict:
+        datos = getattr(self._local, "datos", None)
+        if datos is None:
+            datos = self._local.datos = {}
+            with self._lock:
+                self._fragmentos.append((weakref.ref(threading.current_thread()), datos))
+                # ThreadingHTTPServer crea un hilo por solicitud: sin nadie que
+                # lea /metrics, los fragmentos muertos se acumularían
+                self._nuevos += 1
+                if self._nuevos >= RETIRAR_CADA:
+                    self._retirar_muertos()
+        return datos
+
+    def _retirar_muertos(self):
+        """Suma a _retirados los fragmentos de hilos terminados. Llamar con self._lock tomado."""
+        vivos = []
+        for hilo, datos in self._fragmentos:
+            if hilo() is None or not hilo().is_alive():
+                # Nadie más escribirá en él: se acumula y se descarta
+                self._sumar(self._retirados, datos)
+            else:
+                vivos.append((hilo, datos))
+        self._fragmentos = vivos
+        self._nuevos = 0
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self.metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self.metricas[metrica.nombre] = metrica
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str) -> Contador:
+        return self._registrar(Contador(self, nombre, ayuda))
+
+    def histograma(self, nombre: str, ayuda: str,
+                   buckets: tuple = BUCKETS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma(self, nombre, ayuda, buckets))
+
+    def medidor(self, nombre: str, ayuda: str, funcion,
+                tipo: str = "gauge") -> Medidor:
+        return self._registrar(Medidor(self, nombre, ayuda, funcion, tipo))
+
+    @staticmethod
+    def _sumar(destino: dict, origen: dict):
+        for clave, valor in origen.items():
+            if isinstance(valor, list):
+                serie = destino.get(clave)
+                if serie is None:
+                    destino[clave] = [list(valor[0]), valor[1], valor[2]]
+                else:
+                    serie[0] = [a + b for a, b in zip(serie[0], valor[0])]
+                    serie[1] += valor[1]
+                    serie[2] += valor[2]
+            else:
+                destino[clave] = destino.get(clave, 0) + valor
+
+    def valores(self) -> dict:
+        """{(nombre, etiquetas): valor} sumando todos los fragmentos."""
+        with self._lock:
+            self._retirar_muertos()
+            total: dict = {}
+            self._sumar(total, self._retirados)
+            for _, datos in self._fragmentos:
+                # dict.copy() es atómico bajo el GIL frente al hilo dueño;
+                # _sumar copia las listas de los histogramas, no las comparte
+                self._sumar(total, datos.copy())
+            return total
+
+    def exponer(self) -> str:
+        """Formato de texto de Prometheus."""
+        valores = self.valores()
+        por_metrica: dict = {}
+        for (nombre, etiquetas), valor in valores.items():
+            por_metrica.setdefault(nombre, []).append((etiquetas, valor))
+
+        lineas = []
+        for nombre, metrica in sorted(self.metricas.items()):
+            series = metrica.series() if isinstance(metrica, Medidor) \
+                else sorted(por_metrica.get(nombre, []))
+            if not series:
+                continue
+            lineas.append(f"# HELP {nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {nombre} {metrica.tipo}")
+            for etiquetas, valor in series:
+                if isinstance(metrica, Histograma):
+                    conteos, suma, total = valor
+                    acumulado = 0
+                    for limite, conteo in zip(metrica.buckets + (math.inf,), conteos):
+                        acumulado += conteo
+                        le = (("le", _numero(limite)),)
+                        lineas.append(f"{nombre}_bucket{_formato_etiquetas(etiquetas, le)} {acumulado}")
+                    lineas.append(f"{nombre}_sum{_formato_etiquetas(etiquetas)} {_numero(suma)}")
+                    lineas.append(f"{nombre}_count{_formato_etiquetas(etiquetas)} {total}")
+                else:
+                    lineas.append(f"{nombre}{_formato_etiquetas(etiquetas)} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = Registro()
@@ -25,18 +25,70 @@ Uso:
     
     # Consenso entre nodos:
     python dian_nodos.py --modo consenso --prompt "Tu pregunta aquí"
+
+    # Demonio cliente residente: las consultas siguientes lo usan por un
+    # socket UNIX local (conexiones y salud de nodos ya calientes)
+    python dian_nodos.py --modo demonio
+
+    # Cliente asíncrono (cientos de consultas concurrentes): ver
+    # dian_cliente_async.py — las funciones cliente de este módulo son
+    # envoltorios síncronos sobre él
+
+    # Estado del clúster (una vez, o refrescando cada 5 s):
+    python dian_nodos.py --modo ping
+    python dian_nodos.py --modo ping --vigilar 5
+
+    # Reinicio sin cortar solicitudes: el proceso nuevo comparte el puerto
+    # y el anterior drena (Ctrl+C o SIGTERM también drenan):
+    python dian_nodos.py --modo servidor --relevar
+
+    # Nodos, Ollama, puerto y límites desde un archivo (recarga en caliente,
+    # ver dian_config.py):
+    python dian_nodos.py --modo servidor --config dian_config.json
+
+    # Métricas Prometheus de un nodo servidor:
+    curl http://172.16.33.136:8765/metrics
+
+    # Diario de solicitudes (~/.dian/diario-<puerto>.jsonl, ver dian_diario.py):
+    # tras un reinicio el nodo reanuda lo que quedó a medias y el cliente
+    # recoge el resultado por hash_aporte (--sin-diario lo desactiva):
+    curl "http://172.16.33.136:8765/resultado/<hash_aporte>?espera=10"
+
+    # Depuración (servidor con --depuracion, solo desde el propio nodo):
+    curl "http://127.0.0.1:8765/debug/profile?seconds=10"
+    curl "http://127.0.0.1:8765/debug/profile?seconds=10&formato=colapsado" > perfil.txt
+    curl http://127.0.0.1:8765/debug/tasks
 """
 
 import hashlib
+import heapq
 import json
+import os
+import struct
 import time
 import argparse
+import contextvars
 from datetime import datetime, timezone
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib import request, error
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlsplit, parse_qs
+from collections import OrderedDict, Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturoTimeout
+import re
+import sys
 import threading
 
+import dian_trazas
+from dian_metricas import REGISTRO as METRICAS
+
+# Arranque: http.server, urllib.request (http.client, email, ssl), gzip y
+# el perfilador se importan dentro de las funciones que los usan. Los modos
+# cliente y ping (también en el Redmi) no pagan el servidor HTTP ni el
+# cliente HTTP bloqueante; ver `python dian_bench.py --bench arranque`.
+
+# Ejecutado como script: que `import dian_nodos` (dian_cliente_async)
+# obtenga este mismo módulo y no una copia con otro SALUD / NODOS
+sys.modules.setdefault("dian_nodos", sys.modules[__name__])
+
 # ============= CONFIGURACIÓN DE RED =============
 
 NODOS = {
@@ -79,6 +131,11 @@ NODOS = {
 
 OLLAMA_URL = "http://localhost:11434"
 SERVIDOR_PUERTO = 8765
+MODELO_EMBED = "nomic-embed-text"
+# Solicitudes simultáneas que Ollama atiende por modelo en este nodo
+PARALELISMO_OLLAMA = int(os.environ.get("OLLAMA_NUM_PARALLEL") or 2)
+# Si dian_audit no está disponible: mismo valor que LIMITES["ram_modelo_max_gb"]
+RAM_MODELOS_GB_DEFECTO = 12.0
 
 
 # ============= PROTOCOLO DE ATRIBUCIÓN =============
@@ -101,9 +158,13 @@ def crear_aporte(prompt: str, nodo_id: str) -> dict:
     }
 
 def crear_respuesta(output: str, aporte: dict, modelo: str, nodo_id: str) -> dict:
-    """Registra respuesta con vínculo al aporte humano."""
+    """
+    Registra respuesta con vínculo al aporte humano.
+    Incluye firma MinHash del output para detección de casi-duplicados.
+    """
     return {
         "hash_output": hash_sha256(output),
+        "minhash": firma_minhash(output),
         "hash_aporte_vinculado": aporte["hash_aporte"],
         "timestamp_respuesta": timestamp_utc(),
         "nodo_respuesta": nodo_id,
@@ -113,8 +174,181 @@ def crear_respuesta(output: str, aporte: dict, modelo: str, nodo_id: str) -> dic
     }
 
 
+# ============= FORMATO DE TRANSPORTE =============
+
+# Respuestas más cortas no compensan el coste de comprimir
+UMBRAL_COMPRESION = 512
+TIPO_JSON = "application/json"
+TIPO_SOBRE = "application/x-dian-sobre"
+_MAGIC_SOBRE = b"DS"
+_VERSION_SOBRE = 1
+_CAMPOS_HASH = ("hash_output", "hash_aporte_vinculado")
+_HEX64 = re.compile(r"[0-9a-f]{64}")
+_FLAG_HASH_OUTPUT, _FLAG_HASH_APORTE, _FLAG_MINHASH, _FLAG_OUTPUT = 1, 2, 4, 8
+
+
+def _zstd():
+    """Módulo zstd (compression.zstd en 3.14+, o zstandard), o None."""
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+
+def codificaciones_soportadas() -> tuple:
+    """Content-Encoding aceptados, del preferido al menos preferido."""
+    return ("zstd", "gzip") if _zstd() is not None else ("gzip",)
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    if codificacion == "gzip":
+        import gzip
+        return gzip.compress(cuerpo, compresslevel=6)
+    if codificacion == "zstd":
+        zstd = _zstd()
+        if hasattr(zstd, "ZstdCompressor"):
+            return zstd.ZstdCompressor(level=3).compress(cuerpo)
+        return zstd.compress(cuerpo)
+    return cuerpo
+
+
+def descomprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    codificacion = (codificacion or "identity").strip().lower()
+    if codificacion == "gzip":
+        import gzip
+        return gzip.decompress(cuerpo)
+    if codificacion == "zstd":
+        zstd = _zstd()
+        if zstd is None:
+            raise ValueError("Cuerpo zstd sin módulo zstd disponible")
+        if hasattr(zstd, "ZstdDecompressor"):
+            return zstd.ZstdDecompressor().decompress(cuerpo)
+        return zstd.decompress(cuerpo)
+    if codificacion != "identity":
+        raise ValueError(f"Content-Encoding no soportado: {codificacion}")
+    return cuerpo
+
+
+def elegir_codificacion(accept_encoding: str):
+    """Codificación soportada con mayor q en Accept-Encoding (empate: la preferida), o None."""
+    aceptadas = {}
+    for parte in (accept_encoding or "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                q = float(parametros.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            aceptadas[nombre.lower()] = q
+    candidatas = [(aceptadas.get(c, aceptadas.get("*", 0.0)), -i, c)
+                  for i, c in enumerate(codificaciones_soportadas())]
+    q, _, codificacion = max(candidatas)
+    return codificacion if q > 0 else None
+
+
+def codificar_sobre(datos: dict) -> bytes:
+    """
+    Sobre binario compacto para respuestas con atribución:
+
+        "DS" | versión u8 | flags u8
+        [hash_output 32B] [hash_aporte_vinculado 32B]
+        [minhash: n u8 + n × u64] [output: u32 + UTF-8]
+        resto: u32 + JSON compacto del resto de campos
+
+    Los hashes viajan como bytes (32 en vez de 64 caracteres) y la firma
+    MinHash como enteros de 8 bytes en vez de ~19 dígitos decimales.
+    Los campos que no tienen la forma esperada van en el JSON del resto.
+    """
+    resto = dict(datos)
+    flags = 0
+    partes = []
+    for campo, flag in zip(_CAMPOS_HASH, (_FLAG_HASH_OUTPUT, _FLAG_HASH_APORTE)):
+        valor = resto.get(campo)
+        if isinstance(valor, str) and _HEX64.fullmatch(valor):
+            partes.append(bytes.fromhex(resto.pop(campo)))
+            flags |= flag
+    firma = resto.get("minhash")
+    if isinstance(firma, list) and len(firma) < 256 and \
+            all(isinstance(v, int) and 0 <= v < 1 << 64 for v in firma):
+        resto.pop("minhash")
+        partes.append(struct.pack(f"<B{len(firma)}Q", len(firma), *firma))
+        flags |= _FLAG_MINHASH
+    if isinstance(resto.get("output"), str):
+        texto = resto.pop("output").encode('utf-8')
+        partes.append(struct.pack("<I", len(texto)) + texto)
+        flags |= _FLAG_OUTPUT
+    json_resto = json.dumps(resto, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+    partes.append(struct.pack("<I", len(json_resto)) + json_resto)
+    return _MAGIC_SOBRE + struct.pack("<BB", _VERSION_SOBRE, flags) + b"".join(partes)
+
+
+def decodificar_sobre(cuerpo: bytes) -> dict:
+    if cuerpo[:2] != _MAGIC_SOBRE:
+        raise ValueError("No es un sobre DIAN")
+    version, flags = struct.unpack_from("<BB", cuerpo, 2)
+    if version != _VERSION_SOBRE:
+        raise ValueError(f"Versión de sobre no soportada: {version}")
+    pos = 4
+    campos = {}
+    for campo, flag in zip(_CAMPOS_HASH, (_FLAG_HASH_OUTPUT, _FLAG_HASH_APORTE)):
+        if flags & flag:
+            campos[campo] = cuerpo[pos:pos + 32].hex()
+            pos += 32
+    if flags & _FLAG_MINHASH:
+        n = cuerpo[pos]
+        campos["minhash"] = list(struct.unpack_from(f"<{n}Q", cuerpo, pos + 1))
+        pos += 1 + 8 * n
+    if flags & _FLAG_OUTPUT:
+        (largo,) = struct.unpack_from("<I", cuerpo, pos)
+        campos["output"] = cuerpo[pos + 4:pos + 4 + largo].decode('utf-8')
+        pos += 4 + largo
+    (largo,) = struct.unpack_from("<I", cuerpo, pos)
+    datos = json.loads(cuerpo[pos + 4:pos + 4 + largo].decode('utf-8'))
+    datos.update(campos)
+    return datos
+
+
+def leer_cuerpo(cuerpo: bytes, content_type: str = None, content_encoding: str = None) -> dict:
+    """Cuerpo HTTP → dict, según Content-Encoding y Content-Type (JSON o sobre)."""
+    cuerpo = descomprimir(cuerpo, content_encoding)
+    if (content_type or "").split(";")[0].strip() == TIPO_SOBRE:
+        return decodificar_sobre(cuerpo)
+    return json.loads(cuerpo.decode('utf-8'))
+
+
+# ============= MÉTRICAS =============
+# Contadores por hilo (dian_metricas): baratos, siempre activos.
+# Los medidores de cola, residencia y recursos se registran junto al servidor.
+
+SOLICITUDES_HTTP = METRICAS.contador(
+    "dian_solicitudes_total", "Solicitudes HTTP atendidas por ruta y código")
+LATENCIA_HTTP = METRICAS.histograma(
+    "dian_solicitud_segundos", "Latencia de respuesta HTTP por ruta y modelo")
+LATENCIA_INFERENCIA = METRICAS.histograma(
+    "dian_inferencia_segundos", "Cola + Ollama por inferencia atendida")
+LATENCIA_OLLAMA = METRICAS.histograma(
+    "dian_ollama_segundos", "Llamada HTTP a Ollama /api/chat (pared)")
+TIEMPO_MODELO_OLLAMA = METRICAS.histograma(
+    "dian_ollama_modelo_segundos", "total_duration informado por Ollama (sin red ni JSON)")
+ESPERA_COLA = METRICAS.histograma(
+    "dian_cola_espera_segundos", "Espera en el LoteadorOllama por clase de prioridad")
+CACHE_EMBEDDINGS = METRICAS.contador(
+    "dian_cache_embeddings_total", "Consultas a la caché de embeddings (acierto/fallo)")
+
+
 # ============= CLIENTE OLLAMA LOCAL =============
 
+# Un fallo de Ollama se retorna como texto con este prefijo (HTTP 200)
+PREFIJO_ERROR_OLLAMA = "ERROR_OLLAMA: "
+
 def consultar_ollama_local(prompt: str, modelo: str = "mistral:7b") -> str:
     """
     Consulta LLaMA local via Ollama API.
@@ -126,6 +360,7 @@ def consultar_ollama_local(prompt: str, modelo: str = "mistral:7b") -> str:
         "stream": False
     }).encode('utf-8')
 
+    from urllib import request
     req = request.Request(
         f"{OLLAMA_URL}/api/chat",
         data=payload,
@@ -133,103 +368,985 @@ def consultar_ollama_local(prompt: str, modelo: str = "mistral:7b") -> str:
         method="POST"
     )
 
+    inicio = time.monotonic()
+    with dian_trazas.tramo("ollama", modelo=modelo) as traza:
+        try:
+            with request.urlopen(req, timeout=300) as response:
+                data = json.loads(response.read().decode('utf-8'))
+                LATENCIA_OLLAMA.observar(time.monotonic() - inicio, modelo=modelo)
+                if data.get("total_duration"):
+                    TIEMPO_MODELO_OLLAMA.observar(data["total_duration"] / 1e9, modelo=modelo)
+                traza["atributos"].update(tiempos_ollama(data))
+                return data["message"]["content"]
+        except Exception as e:
+            traza["error"] = str(e)
+            return f"{PREFIJO_ERROR_OLLAMA}{str(e)}"
+
+
+def es_error_ollama(output) -> bool:
+    """True si `output` es el texto de error de consultar_ollama_local()."""
+    return isinstance(output, str) and output.startswith(PREFIJO_ERROR_OLLAMA)
+
+
+def tiempos_ollama(data: dict) -> dict:
+    """Duraciones (ns) y conteos de tokens de una respuesta de Ollama, en segundos."""
+    tiempos = {}
+    for campo, nombre in (("load_duration", "carga_s"), ("prompt_eval_duration", "prompt_s"),
+                          ("eval_duration", "generacion_s"), ("total_duration", "total_s")):
+        if data.get(campo) is not None:
+            tiempos[nombre] = round(data[campo] / 1e9, 6)
+    for campo, nombre in (("prompt_eval_count", "tokens_prompt"),
+                          ("eval_count", "tokens_generados")):
+        if data.get(campo) is not None:
+            tiempos[nombre] = data[campo]
+    return tiempos
+
+
+def _ollama_post(ruta: str, datos: dict, timeout: float = 300):
+    from urllib import request
+    req = request.Request(
+        f"{OLLAMA_URL}{ruta}",
+        data=json.dumps(datos).encode('utf-8'),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        with request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except Exception:
+        return None
+
+
+def tamanos_modelos_ollama(timeout: float = 2.0) -> dict:
+    """{modelo: GB} de los modelos instalados (/api/tags), o {} si no hay Ollama."""
+    from urllib import request
     try:
-        with request.urlopen(req, timeout=300) as response:
+        with request.urlopen(f"{OLLAMA_URL}/api/tags", timeout=timeout) as response:
             data = json.loads(response.read().decode('utf-8'))
-            return data["message"]["content"]
-    except Exception as e:
-        return f"ERROR_OLLAMA: {str(e)}"
+    except Exception:
+        return {}
+    return {m["name"]: m.get("size", 0) / 1024 ** 3 for m in data.get("models", [])}
+
+
+def _limite_ram_modelos() -> float:
+    try:
+        import dian_audit
+        return float(dian_audit.LIMITES["ram_modelo_max_gb"])
+    except Exception:
+        return RAM_MODELOS_GB_DEFECTO
+
+
+class GestorResidencia:
+    """
+    Qué modelos tiene Ollama en memoria y cuáles conviene tener.
+
+    - preparar(modelo) antes de cada lote: si el modelo no está residente,
+      descarga (keep_alive=0) los menos usados recientemente hasta que
+      quepa en limite_gb (dian_audit.LIMITES["ram_modelo_max_gb"]); un
+      modelo que por sí solo supera el límite se rechaza con ValueError
+    - cuenta las transiciones entre modelos consecutivos y, con el nodo
+      ocioso, precalienta el siguiente más probable si cabe sin desalojar
+    - el estado local se corrige con /api/ps cada `refresco_s` segundos
+
+    Con 16 GB y ocho modelos en NODOS, cada cambio de rol evitado ahorra
+    decenas de segundos de carga de pesos.
+    """
+
+    def __init__(self, limite_gb: float = None, refresco_s: float = 30.0,
+                 precalentar: bool = True):
+        self.limite_gb = _limite_ram_modelos() if limite_gb is None else limite_gb
+        self.refresco_s = refresco_s
+        self.precalentar_activo = precalentar
+        self.residentes: "OrderedDict[str, float]" = OrderedDict()  # LRU → MRU
+        self._tamanos: dict = {}
+        self._transiciones: dict = {}
+        self._ultimo = None
+        self._refrescado = 0.0
+        self._precalentando = False
+        self._lock = threading.RLock()
+        self.cargas = 0
+        self.descargas = 0
+        self.precalentados = 0
+
+    def refrescar(self, forzar: bool = False):
+        with self._lock:
+            if not forzar and time.time() - self._refrescado < self.refresco_s:
+                return
+            self._refrescado = time.time()
+        cargados = modelos_cargados_ollama()
+        if cargados is None:
+            return
+        with self._lock:
+            actuales = {m["nombre"]: m["tamano_gb"] for m in cargados}
+            for modelo in list(self.residentes):
+                if modelo not in actuales:
+                    del self.residentes[modelo]
+            for modelo, gb in actuales.items():
+                self.residentes[modelo] = gb
+                self._tamanos[modelo] = gb
+
+    def tamano(self, modelo: str) -> float:
+        """GB estimados del modelo (0 si Ollama no lo informa)."""
+        with self._lock:
+            if modelo not in self._tamanos:
+                self._tamanos.update(tamanos_modelos_ollama())
+                self._tamanos.setdefault(modelo, 0.0)  # no volver a preguntar
+            return self._tamanos[modelo]
+
+    def uso_gb(self) -> float:
+        with self._lock:
+            return sum(self.residentes.values())
+
+    def preparar(self, modelo: str):
+        self.refrescar()
+        gb = self.tamano(modelo)
+        if gb > self.limite_gb:
+            raise ValueError(f"{modelo} ocupa {gb:.1f}GB (límite {self.limite_gb}GB)")
+        with self._lock:
+            if self._ultimo is not None and self._ultimo != modelo:
+                self._transiciones.setdefault(self._ultimo, Counter())[modelo] += 1
+            self._ultimo = modelo
+            if modelo in self.residentes:
+                self.residentes.move_to_end(modelo)
+                return
+            desalojar = []
+            uso = sum(self.residentes.values())
+            for residente, rgb in self.residentes.items():
+                if uso + gb <= self.limite_gb:
+                    break
+                desalojar.append(residente)
+                uso -= rgb
+            for residente in desalojar:
+                del self.residentes[residente]
+            self.residentes[modelo] = gb
+            self.cargas += 1
+        for residente in desalojar:
+            _ollama_post("/api/generate", {"model": residente, "keep_alive": 0}, timeout=30)
+            self.descargas += 1
+
+    def siguiente_probable(self, modelo: str = None):
+        with self._lock:
+            modelo = self._ultimo if modelo is None else modelo
+            transiciones = self._transiciones.get(modelo)
+            return transiciones.most_common(1)[0][0] if transiciones else None
+
+    def precalentar(self):
+        """Carga el siguiente modelo probable si cabe sin desalojar a nadie."""
+        if not self.precalentar_activo:
+            return
+        siguiente = self.siguiente_probable()
+        if siguiente is None:
+            return
+        gb = self.tamano(siguiente)
+        with self._lock:
+            if self._precalentando or siguiente in self.residentes or \
+                    self.uso_gb() + gb > self.limite_gb:
+                return
+            self._precalentando = True
+        try:
+            # Prompt vacío: Ollama solo carga los pesos
+            if _ollama_post("/api/generate", {"model": siguiente, "prompt": ""}) is not None:
+                with self._lock:
+                    self.residentes[siguiente] = gb
+                    self.residentes.move_to_end(siguiente, last=False)
+                self.precalentados += 1
+        finally:
+            with self._lock:
+                self._precalentando = False
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "residentes": list(self.residentes),
+                "uso_gb": round(sum(self.residentes.values()), 2),
+                "limite_gb": self.limite_gb,
+                "cargas": self.cargas,
+                "descargas": self.descargas,
+                "precalentados": self.precalentados,
+                "siguiente_probable": self.siguiente_probable(),
+            }
+
+
+class PlazoVencido(TimeoutError):
+    """La solicitud venció su plazo antes de llegar a Ollama."""
+
+
+# Clases de prioridad de /inferencia: menor número, antes se atiende
+PRIORIDADES = {"interactiva": 0, "consenso": 1, "lote": 2}
+PRIORIDAD_DEFECTO = "consenso"
+
+
+class LoteadorOllama:
+    """
+    Micro-lotes por modelo delante de consultar_ollama_local.
+
+    Los prompts que llegan dentro de `ventana_s` para el mismo modelo se
+    agrupan y se despachan juntos, con a lo sumo `paralelismo` solicitudes
+    en vuelo (la capacidad del nodo: OLLAMA_NUM_PARALLEL). Mientras haya
+    prompts del modelo que se está sirviendo se le da prioridad, para no
+    forzar a Ollama a descargar y recargar pesos entre lotes; ningún modelo
+    espera más de `espera_max_s` por esa preferencia. Cada solicitud
+    recibe su resultado por un Future.
+
+    Prioridad y plazo: cada cola de modelo es un heap ordenado por
+    (clase de PRIORIDADES, plazo, llegada). Se despacha primero el modelo
+    cuya cabeza tiene la mejor clase; las interactivas no esperan la
+    ventana. Las solicitudes con el plazo vencido se descartan al
+    despachar (PlazoVencido) sin llegar a Ollama.
+
+    Con un GestorResidencia, entre modelos listos se prefieren los ya
+    residentes, cada lote pasa por residencia.preparar() y al quedar
+    ocioso se precalienta el siguiente modelo probable.
+    """
+
+    def __init__(self, paralelismo: int = PARALELISMO_OLLAMA, ventana_s: float = 0.02,
+                 max_lote: int = 8, espera_max_s: float = 2.0, consultar=None,
+                 residencia: GestorResidencia = None):
+        self.paralelismo = max(1, paralelismo)
+        self.ventana_s = ventana_s
+        self.max_lote = max_lote
+        self.espera_max_s = espera_max_s
+        self.consultar = consultar or consultar_ollama_local
+        self.residencia = residencia
+        self._pendientes: "OrderedDict[str, list]" = OrderedDict()  # modelo → heap
+        self._secuencia = 0
+        self._en_vuelo = 0
+        self._modelo_actual = None
+        self._cerrado = False
+        self._cond = threading.Condition()
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.paralelismo,
+                                            thread_name_prefix="dian-ollama")
+        self.lotes = 0
+        self.solicitudes = 0
+        self.clases = {
+            clase: {"encoladas": 0, "despachadas": 0, "vencidas": 0,
+                    "espera_total_s": 0.0, "espera_max_s": 0.0}
+            for clase in PRIORIDADES
+        }
+        self._hilo = threading.Thread(target=self._despachar, daemon=True,
+                                      name="dian-loteador")
+        self._hilo.start()
+
+    def enviar(self, prompt: str, modelo: str, timeout: float = None,
+               prioridad: str = PRIORIDAD_DEFECTO, plazo_s: float = None) -> str:
+        """
+        Encola el prompt y bloquea hasta su respuesta.
+        plazo_s: segundos que el cliente está dispuesto a esperar; pasado
+        ese tiempo se lanza PlazoVencido y el prompt no llega a Ollama.
+        """
+        if prioridad not in PRIORIDADES:
+            raise ValueError(f"Prioridad desconocida: {prioridad}")
+        ahora = time.monotonic()
+        futuro = Future()
+        with self._cond:
+            if self._cerrado:
+                raise RuntimeError("Loteador cerrado")
+            self.clases[prioridad]["encoladas"] += 1
+            if plazo_s is not None and plazo_s <= 0:
+                self.clases[prioridad]["vencidas"] += 1
+                raise PlazoVencido("Plazo vencido al llegar")
+            limite = ahora + plazo_s if plazo_s is not None else float("inf")
+            self._secuencia += 1
+            # El contexto lleva la traza de la solicitud a los hilos del ejecutor
+            heapq.heappush(self._pendientes.setdefault(modelo, []),
+                           (PRIORIDADES[prioridad], limite, ahora, self._secuencia,
+                            prioridad, prompt, futuro, contextvars.copy_context()))
+            self.solicitudes += 1
+            self._cond.notify_all()
+        if plazo_s is not None:
+            timeout = plazo_s if timeout is None else min(timeout, plazo_s)
+        try:
+            return futuro.result(timeout)
+        except FuturoTimeout:
+            if futuro.cancel():  # aún en cola: _despachar lo descartará
+                raise PlazoVencido(f"Plazo de {plazo_s}s vencido en cola") from None
+            raise
+
+    def _llegada_mas_antigua(self, cola: list) -> float:
+        return min(item[2] for item in cola)
+
+    def _listo(self, cola: list, ahora: float) -> bool:
+        return (len(cola) >= self.max_lote or cola[0][0] == PRIORIDADES["interactiva"]
+                or self._llegada_mas_antigua(cola) + self.ventana_s <= ahora)
+
+    def _elegir(self, ahora: float):
+        listos = [m for m, cola in self._pendientes.items() if self._listo(cola, ahora)]
+        if not listos:
+            return None
+        mejor_clase = min(self._pendientes[m][0][0] for m in listos)
+        listos = [m for m in listos if self._pendientes[m][0][0] == mejor_clase]
+        antiguedad = {m: self._llegada_mas_antigua(self._pendientes[m]) for m in listos}
+        mas_antiguo = min(listos, key=antiguedad.get)
+        if ahora - antiguedad[mas_antiguo] >= self.espera_max_s:
+            return mas_antiguo
+        if self._modelo_actual in listos:
+            return self._modelo_actual
+        if self.residencia is not None:
+            residentes = [m for m in listos if m in self.residencia.residentes]
+            if residentes:
+                return min(residentes, key=antiguedad.get)
+        return mas_antiguo
+
+    def _sacar_lote(self, modelo: str, ahora: float) -> list:
+        """Hasta max_lote solicitudes vigentes; descarta vencidas y canceladas."""
+        cola = self._pendientes[modelo]
+        lote = []
+        while cola and len(lote) < min(self.max_lote, self.paralelismo - self._en_vuelo):
+            _, limite, llegada, _, clase, prompt, futuro, contexto = heapq.heappop(cola)
+            if not futuro.set_running_or_notify_cancel():
+                self.clases[clase]["vencidas"] += 1
+                continue
+            if limite <= ahora:
+                self.clases[clase]["vencidas"] += 1
+                futuro.set_exception(PlazoVencido("Plazo vencido en cola"))
+                continue
+            metricas = self.clases[clase]
+            metricas["despachadas"] += 1
+            metricas["espera_total_s"] += ahora - llegada
+            metricas["espera_max_s"] = max(metricas["espera_max_s"], ahora - llegada)
+            ESPERA_COLA.observar(ahora - llegada, clase=clase)
+            contexto.run(dian_trazas.registrar_tramo, "cola", time.time() - (ahora - llegada),
+                         ahora - llegada, clase=clase, modelo=modelo)
+            lote.append((prompt, futuro, contexto))
+        if cola:
+            self._pendientes.move_to_end(modelo, last=False)
+        else:
+            del self._pendientes[modelo]
+        return lote
+
+    def _despachar(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._cerrado and not self._pendientes:
+                        return
+                    ahora = time.monotonic()
+                    modelo = self._elegir(ahora) if self._en_vuelo < self.paralelismo else None
+                    if modelo is not None:
+                        lote = self._sacar_lote(modelo, ahora)
+                        if lote:
+                            break
+                        continue
+                    vencimientos = [self._llegada_mas_antigua(c) + self.ventana_s
+                                    for c in self._pendientes.values()]
+                    espera = None
+                    if vencimientos and self._en_vuelo < self.paralelismo:
+                        espera = max(0.0, min(vencimientos) - ahora)
+                    self._cond.wait(espera)
+                n = len(lote)
+                self._en_vuelo += n
+                self._modelo_actual = modelo
+                self.lotes += 1
+            if self.residencia is not None:
+                try:
+                    self.residencia.preparar(modelo)
+                except ValueError as e:
+                    for _, futuro, _ in lote:
+                        futuro.set_exception(e)
+                    with self._cond:
+                        self._en_vuelo -= n
+                        self._cond.notify_all()
+                    continue
+            for prompt, futuro, contexto in lote:
+                self._ejecutor.submit(self._resolver, prompt, modelo, futuro, contexto)
+
+    def _resolver(self, prompt: str, modelo: str, futuro: Future,
+                  contexto: contextvars.Context):
+        try:
+            futuro.set_result(contexto.run(self.consultar, prompt, modelo))
+        except Exception as e:
+            futuro.set_exception(e)
+        finally:
+            with self._cond:
+                self._en_vuelo -= 1
+                ocioso = self._en_vuelo == 0 and not self._pendientes
+                self._cond.notify_all()
+            if ocioso and self.residencia is not None:
+                threading.Thread(target=self.residencia.precalentar, daemon=True).start()
+
+    def estadisticas(self) -> dict:
+        with self._cond:
+            en_cola = Counter(item[4] for cola in self._pendientes.values() for item in cola)
+            clases = {}
+            for clase, m in self.clases.items():
+                clases[clase] = {
+                    **m,
+                    "en_cola": en_cola.get(clase, 0),
+                    "espera_media_s": round(m["espera_total_s"] / m["despachadas"], 4)
+                    if m["despachadas"] else 0.0,
+                    "espera_total_s": round(m["espera_total_s"], 4),
+                    "espera_max_s": round(m["espera_max_s"], 4),
+                }
+            return {
+                "solicitudes": self.solicitudes,
+                "lotes": self.lotes,
+                "tamano_medio_lote": round(self.solicitudes / self.lotes, 2) if self.lotes else 0.0,
+                "en_vuelo": self._en_vuelo,
+                "pendientes": {m: len(c) for m, c in self._pendientes.items()},
+                "paralelismo": self.paralelismo,
+                "clases": clases,
+            }
+
+    def cerrar(self):
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+        self._hilo.join()
+        self._ejecutor.shutdown(wait=True)
+
+
+LOTEADOR: LoteadorOllama = None
+RESIDENCIA: GestorResidencia = None
+# DiarioSolicitudes (dian_diario) del servidor; None: sin diario
+DIARIO = None
+
+
+def _inferir(prompt: str, modelo: str, prioridad: str, plazo_s: float = None,
+             llegada: float = None) -> str:
+    """Inferencia local por el LoteadorOllama (o directa si no hay lotes)."""
+    if LOTEADOR is not None:
+        return LOTEADOR.enviar(prompt, modelo, prioridad=prioridad, plazo_s=plazo_s)
+    if RESIDENCIA is not None:
+        with dian_trazas.tramo("residencia", modelo=modelo):
+            RESIDENCIA.preparar(modelo)
+    if plazo_s is not None and time.monotonic() - (llegada or time.monotonic()) >= plazo_s:
+        raise PlazoVencido("Plazo vencido antes de consultar Ollama")
+    return consultar_ollama_local(prompt, modelo)
+
+
+def _respuesta_inferencia(output: str, hash_aporte: str, timestamp_aporte: str,
+                          modelo: str, nodo_id: str, duracion: float) -> dict:
+    aporte_reconstruido = {
+        "hash_aporte": hash_aporte,
+        "timestamp": timestamp_aporte or timestamp_utc()
+    }
+    respuesta = crear_respuesta(output, aporte_reconstruido, modelo, nodo_id)
+    respuesta["duracion_segundos"] = round(duracion, 2)
+    return respuesta
+
+
+def modelos_cargados_ollama(timeout: float = 2.0):
+    """Modelos residentes en memoria según Ollama (/api/ps), o None."""
+    from urllib import request
+    try:
+        with request.urlopen(f"{OLLAMA_URL}/api/ps", timeout=timeout) as response:
+            data = json.loads(response.read().decode('utf-8'))
+    except Exception:
+        return None
+    return [
+        {"nombre": m.get("name", m.get("model", "?")),
+         "tamano_gb": round(m.get("size", 0) / 1024 ** 3, 2)}
+        for m in data.get("models", [])
+    ]
 
 
 # ============= SERVIDOR DIAN =============
 
-class DIANHandler(BaseHTTPRequestHandler):
+_RECURSOS_TTL_S = 5.0
+_recursos_cache = {"ts": 0.0, "datos": None}
+_recursos_lock = threading.Lock()
+
+
+ESTADOS_TERMICOS = ("normal", "alerta", "reducir", "emergencia")
+
+
+def _estado_termico(temperatura: float, limites: dict) -> str:
+    """Umbrales temp_* de dian_audit.LIMITES → nombre del estado."""
+    if temperatura == -1.0:
+        return "desconocido"
+    if temperatura >= limites["temp_emergency_c"]:
+        return "emergencia"
+    if temperatura >= limites["temp_throttle_c"]:
+        return "reducir"
+    if temperatura >= limites["temp_warn_c"]:
+        return "alerta"
+    return "normal"
+
+
+def estado_recursos_local() -> dict:
+    """
+    Temperatura y RAM del nodo (dian_audit), con caché de _RECURSOS_TTL_S:
+    smctemp lanza un subproceso y /estado se consulta en modo vigilancia.
+    """
+    with _recursos_lock:
+        if _recursos_cache["datos"] and time.time() - _recursos_cache["ts"] < _RECURSOS_TTL_S:
+            return _recursos_cache["datos"]
+    try:
+        import dian_audit
+        ram_pct, ram_libre_gb = dian_audit.obtener_ram()
+        temperatura = dian_audit.obtener_temperatura()
+        datos = {
+            "temperatura_c": temperatura,
+            "ram_pct": round(ram_pct, 1),
+            "ram_libre_gb": round(ram_libre_gb, 2),
+            "estado_termico": _estado_termico(temperatura, dian_audit.LIMITES),
+        }
+    except Exception:
+        datos = {"temperatura_c": -1.0, "ram_pct": -1.0, "ram_libre_gb": -1.0,
+                 "estado_termico": "desconocido"}
+    with _recursos_lock:
+        _recursos_cache.update(ts=time.time(), datos=datos)
+    return datos
+
+
+def _cola_por_clase():
+    if LOTEADOR is None:
+        return None
+    stats = LOTEADOR.estadisticas()
+    return [({"clase": c}, m["en_cola"]) for c, m in stats["clases"].items()]
+
+
+def _residencia(campo: str):
+    if RESIDENCIA is None:
+        return None
+    return RESIDENCIA.estadisticas()[campo]
+
+
+def _recurso(campo: str):
+    valor = estado_recursos_local()[campo]
+    return None if valor == -1.0 else valor
+
+
+METRICAS.medidor("dian_cola_profundidad", "Solicitudes esperando en el LoteadorOllama",
+                 _cola_por_clase)
+METRICAS.medidor("dian_ollama_en_vuelo", "Solicitudes en curso contra Ollama",
+                 lambda: LOTEADOR.estadisticas()["en_vuelo"] if LOTEADOR is not None else None)
+METRICAS.medidor("dian_cola_vencidas_total", "Solicitudes descartadas por plazo vencido",
+                 lambda: [({"clase": c}, m["vencidas"])
+                          for c, m in LOTEADOR.estadisticas()["clases"].items()]
+                 if LOTEADOR is not None else None, tipo="counter")
+METRICAS.medidor("dian_modelos_cargas_total", "Modelos cargados por GestorResidencia",
+                 lambda: _residencia("cargas"), tipo="counter")
+METRICAS.medidor("dian_modelos_descargas_total", "Modelos descargados por GestorResidencia",
+                 lambda: _residencia("descargas"), tipo="counter")
+METRICAS.medidor("dian_modelos_ram_gb", "RAM ocupada por modelos residentes",
+                 lambda: _residencia("uso_gb"))
+METRICAS.medidor("dian_diario_pendientes", "Solicitudes sin terminar en el diario del nodo",
+                 lambda: DIARIO.estadisticas()["pendiente"] if DIARIO is not None else None)
+METRICAS.medidor("dian_diario_reanudadas_total", "Solicitudes reanudadas desde el diario",
+                 lambda: DIARIO.estadisticas()["reanudadas"] if DIARIO is not None else None,
+                 tipo="counter")
+METRICAS.medidor("dian_temperatura_celsius", "Temperatura del nodo (smctemp)",
+                 lambda: _recurso("temperatura_c"))
+METRICAS.medidor("dian_ram_pct", "RAM usada del nodo (%)", lambda: _recurso("ram_pct"))
+METRICAS.medidor("dian_estado_termico", "1 en el estado térmico actual según LIMITES",
+                 lambda: [({"estado": e}, int(e == estado_recursos_local()["estado_termico"]))
+                          for e in ESTADOS_TERMICOS + ("desconocido",)])
+
+RUTAS_HTTP = ("/inferencia", "/ping", "/estado", "/metrics", "/resultado",
+              "/debug/profile", "/debug/tasks")
+# GET /resultado/<hash>?espera=s: espera larga máxima por un resultado del diario
+ESPERA_RESULTADO_MAX_S = 20.0
+CODIGO_OLLAMA_CAIDO = 502                     # reintentable (dian_diario.CODIGOS_REINTENTABLES)
+REANUDAR_PAUSAS_OLLAMA_S = (2, 5, 10, 20, 30)  # esperas entre intentos de una reanudada
+_HASH_HEX = re.compile(r"[0-9a-f]{64}")
+
+# Solicitudes en curso (para /debug/tasks y el drenaje): id del hilo → datos
+_SOLICITUDES_EN_CURSO: dict = {}
+_solicitudes_lock = threading.Lock()
+# Activado por drenar(): las solicitudes nuevas reciben 503 y se reintentan
+_DRENANDO = threading.Event()
+PLAZO_DRENAJE_S = 30.0
+
+
+def _es_local(direccion: str) -> bool:
+    import ipaddress
+    try:
+        ip = ipaddress.ip_address(direccion)
+    except ValueError:
+        return False
+    mapeada = getattr(ip, "ipv4_mapped", None)
+    return (mapeada or ip).is_loopback
+
+
+def _auditar(accion: str, detalle: str, resultado: str):
+    """Registro en dian_audit si está disponible (el nodo funciona sin él)."""
+    try:
+        import dian_audit
+        zona = dian_audit.clasificar_accion(accion)
+        dian_audit.registrar(zona, accion, detalle, resultado)
+    except Exception:
+        pass
+
+
+def solicitudes_en_curso() -> list:
+    """Solicitudes HTTP que el servidor está atendiendo, la más antigua primero."""
+    ahora = time.monotonic()
+    with _solicitudes_lock:
+        filas = [dict(d) for d in _SOLICITUDES_EN_CURSO.values()]
+    for fila in filas:
+        fila["edad_s"] = round(ahora - fila.pop("inicio"), 3)
+    return sorted(filas, key=lambda f: -f["edad_s"])
+
+
+class _ManejadorDIAN:
     """
     Servidor HTTP simple para comunicación entre nodos.
     Recibe prompts, consulta LLaMA local, retorna respuesta con atribución.
+    HTTP/1.1: las conexiones se mantienen abiertas (modo ping --vigilar).
+    Rutas y lógica; la clase de http.server es DIANHandler (ver
+    _clase_manejador).
     """
 
+    protocol_version = "HTTP/1.1"
+
     nodo_id = "nodo-1-mac-principal"
     modelo = "mistral:7b"
+    # /debug/*: desactivadas salvo --depuracion, y solo desde localhost
+    depuracion = False
 
     def do_POST(self):
-        if self.path == "/inferencia":
-            self._manejar_inferencia()
-        elif self.path == "/ping":
-            self._responder_ping()
-        else:
-            self._error(404, "Ruta no encontrada")
+        if not self._iniciar_solicitud():
+            return
+        try:
+            if self._ruta == "/inferencia":
+                self._manejar_inferencia()
+            elif self._ruta == "/ping":
+                self._responder_ping()
+            else:
+                self._error(404, "Ruta no encontrada")
+        finally:
+            self._terminar_solicitud()
 
     def do_GET(self):
-        if self.path == "/ping":
-            self._responder_ping()
-        elif self.path == "/estado":
-            self._responder_estado()
-        else:
-            self._error(404, "Ruta no encontrada")
+        if not self._iniciar_solicitud():
+            return
+        try:
+            if self._ruta == "/ping":
+                self._responder_ping()
+            elif self._ruta == "/estado":
+                self._responder_estado()
+            elif self._ruta == "/metrics":
+                self._responder_metricas()
+            elif self._ruta.startswith("/resultado/"):
+                self._responder_resultado()
+            elif self._ruta == "/debug/profile":
+                self._responder_perfil()
+            elif self._ruta == "/debug/tasks":
+                self._responder_tareas()
+            else:
+                self._error(404, "Ruta no encontrada")
+        finally:
+            self._terminar_solicitud()
+
+    def _iniciar_solicitud(self) -> bool:
+        """Registra la solicitud en curso; False si el nodo está drenando (ya respondió 503)."""
+        self._inicio, self._modelo_metricas = time.monotonic(), ""
+        self._ruta = urlsplit(self.path).path
+        if _DRENANDO.is_set():
+            # Llegó por una conexión keep-alive abierta antes del drenaje: el
+            # cliente reintenta con una conexión nueva (el proceso de relevo)
+            self._responder_json(503, {"error": "Nodo reiniciándose", "drenando": True},
+                                 cerrar=True, cabeceras={"X-DIAN-Drenando": "1",
+                                                         "Retry-After": "0"})
+            return False
+        with _solicitudes_lock:
+            _SOLICITUDES_EN_CURSO[threading.get_ident()] = {
+                "metodo": self.command, "ruta": self._ruta,
+                "cliente": self.client_address[0], "inicio": self._inicio,
+                "hilo": threading.current_thread().name,
+            }
+        return True
+
+    def _terminar_solicitud(self):
+        with _solicitudes_lock:
+            _SOLICITUDES_EN_CURSO.pop(threading.get_ident(), None)
+
+    def _anotar_solicitud(self, **datos):
+        with _solicitudes_lock:
+            if threading.get_ident() in _SOLICITUDES_EN_CURSO:
+                _SOLICITUDES_EN_CURSO[threading.get_ident()].update(datos)
 
     def _manejar_inferencia(self):
-        """Procesa solicitud de inferencia de otro nodo."""
+        """
+        Procesa solicitud de inferencia de otro nodo. Con DIARIO, se anota
+        antes de consultar Ollama y se cierra con la respuesta: un reinicio
+        del nodo la reanuda y un reintento del mismo aporte no la repite.
+        """
+        from dian_diario import clave_aporte
+        clave = entrada = None
         try:
             longitud = int(self.headers.get('Content-Length', 0))
-            cuerpo = json.loads(self.rfile.read(longitud).decode('utf-8'))
+            cuerpo = leer_cuerpo(self.rfile.read(longitud),
+                                 self.headers.get('Content-Type'),
+                                 self.headers.get('Content-Encoding'))
 
             prompt = cuerpo.get("prompt", "")
             nodo_solicitante = cuerpo.get("nodo_id", "desconocido")
             hash_aporte = cuerpo.get("hash_aporte", "")
-
-            print(f"\n[DIAN] Solicitud de {nodo_solicitante}")
+            modelo = self._resolver_modelo(cuerpo)
+            self._modelo_metricas = modelo
+            # Plazo relativo (s): los relojes de los nodos no están sincronizados
+            prioridad = cuerpo.get("prioridad") or PRIORIDAD_DEFECTO
+            plazo_s = cuerpo.get("plazo_s")
+            llegada = time.monotonic()
+            self._anotar_solicitud(modelo=modelo, prioridad=prioridad,
+                                   solicitante=nodo_solicitante,
+                                   traza=(cuerpo.get("traza") or {}).get("id"))
+
+            print(f"\n[DIAN] Solicitud de {nodo_solicitante} ({prioridad})")
             print(f"[DIAN] Hash aporte: {hash_aporte[:16]}...")
-            print(f"[DIAN] Consultando {self.modelo}...")
+
+            if DIARIO is not None and _HASH_HEX.fullmatch(hash_aporte) \
+                    and cuerpo.get("timestamp_aporte"):
+                clave = clave_aporte(hash_aporte, cuerpo["timestamp_aporte"])
+                entrada, nueva = DIARIO.aceptar(clave, {
+                    "prompt": prompt, "modelo": modelo, "prioridad": prioridad,
+                    "plazo_s": plazo_s, "nodo_id": nodo_solicitante,
+                    "timestamp_aporte": cuerpo.get("timestamp_aporte")})
+                if not nueva:
+                    # Reintento del mismo aporte (o ya reanudado tras un
+                    # reinicio): se responde con el mismo resultado
+                    print(f"[DIAN] Ya en el diario ({entrada['estado']})")
+                    entrada = None
+                    self._responder_diario(DIARIO.esperar(clave, plazo_s or 300),
+                                           pendiente=504)
+                    return
+
+            print(f"[DIAN] Consultando {modelo}...")
 
             # Inferencia local — datos nunca salen del nodo
             inicio = time.time()
-            output = consultar_ollama_local(prompt, self.modelo)
+            with dian_trazas.tramo("servidor.inferencia", remoto=cuerpo.get("traza"),
+                                   modelo=modelo, prioridad=prioridad,
+                                   solicitante=nodo_solicitante) as traza:
+                output = _inferir(prompt, modelo, prioridad, plazo_s, llegada)
             duracion = time.time() - inicio
+            LATENCIA_INFERENCIA.observar(duracion, modelo=modelo)
 
             # Crear registro con atribución
-            aporte_reconstruido = {
-                "hash_aporte": hash_aporte,
-                "timestamp": cuerpo.get("timestamp_aporte", timestamp_utc())
-            }
-            respuesta = crear_respuesta(output, aporte_reconstruido, self.modelo, self.nodo_id)
-            respuesta["duracion_segundos"] = round(duracion, 2)
+            respuesta = _respuesta_inferencia(output, hash_aporte, cuerpo.get("timestamp_aporte"),
+                                              modelo, self.nodo_id, duracion)
+            if entrada is not None:
+                if es_error_ollama(output):
+                    # El error se responde como siempre, pero no se guarda
+                    # como resultado: un reintento del aporte lo repite
+                    DIARIO.fallar(clave, output, CODIGO_OLLAMA_CAIDO)
+                else:
+                    DIARIO.completar(clave, respuesta)
+            if cuerpo.get("traza"):
+                # El cliente arma el desglose completo con los tramos del nodo
+                respuesta["tramos"] = dian_trazas.TRAZADOR.tramos(traza["traza"])
 
             print(f"[DIAN] Respuesta generada en {duracion:.1f}s")
             print(f"[DIAN] Hash output: {respuesta['hash_output'][:16]}...")
 
             self._responder_json(200, respuesta)
 
+        except PlazoVencido as e:
+            print(f"[DIAN] Descartada: {e}")
+            if entrada is not None:
+                DIARIO.fallar(clave, str(e), 504)
+            self._error(504, str(e))
+        except ValueError as e:
+            if entrada is not None:
+                DIARIO.fallar(clave, str(e), 400)
+            self._error(400, str(e))
         except Exception as e:
+            if entrada is not None:
+                DIARIO.fallar(clave, str(e), 500)
             self._error(500, str(e))
 
+    def _responder_resultado(self):
+        """
+        GET /resultado/<hash_aporte>[?timestamp=...&espera=s]: resultado de una
+        inferencia del diario, para el cliente que perdió la conexión (p.ej.
+        el nodo se reinició y la reanudó). timestamp: el timestamp_aporte
+        enviado (sin él, la solicitud más reciente con ese hash). 202
+        mientras siga pendiente; con espera > 0 la solicitud aguarda hasta
+        ESPERA_RESULTADO_MAX_S a que termine.
+        """
+        from dian_diario import clave_aporte
+        if DIARIO is None:
+            self._error(404, "Diario de solicitudes desactivado en este nodo")
+            return
+        hash_aporte = self._ruta.rsplit("/", 1)[-1]
+        if not _HASH_HEX.fullmatch(hash_aporte):
+            self._error(400, "hash_aporte inválido")
+            return
+        parametros = parse_qs(urlsplit(self.path).query)
+        try:
+            espera = float(parametros.get("espera", ["0"])[0])
+        except ValueError:
+            self._error(400, "espera debe ser un número")
+            return
+        espera = max(0.0, min(espera, ESPERA_RESULTADO_MAX_S))
+        self._anotar_solicitud(hash_aporte=hash_aporte[:16], espera=espera)
+        if "timestamp" in parametros:
+            clave = clave_aporte(hash_aporte, parametros["timestamp"][0])
+        else:
+            clave = DIARIO.ultima(hash_aporte)
+        entrada = None
+        if clave is not None:
+            entrada = DIARIO.esperar(clave, espera) if espera else DIARIO.consultar(clave)
+        if entrada is None and not DIARIO.cargado:
+            # Relevo en curso: el diario del proceso anterior aún no se leyó
+            self._responder_json(503, {"error": "Diario cargándose"}, cerrar=True,
+                                 cabeceras={"Retry-After": "1"})
+            return
+        self._responder_diario(entrada)
+
+    def _responder_diario(self, entrada: dict, pendiente: int = 202):
+        """Responde con el estado de una entrada del diario (ver DiarioSolicitudes)."""
+        if entrada is None:
+            self._error(404, "Solicitud desconocida para este nodo")
+        elif entrada["estado"] == "completada":
+            self._responder_json(200, entrada["respuesta"])
+        elif entrada["estado"] == "fallida":
+            self._error(entrada["codigo"] or 500, entrada["error"])
+        elif pendiente == 202:
+            hash_aporte, timestamp = entrada["clave"].split("@", 1)
+            self._responder_json(202, {"estado": "pendiente", "hash_aporte": hash_aporte,
+                                       "timestamp_aporte": timestamp,
+                                       "intentos": entrada["intentos"]})
+        else:
+            self._error(pendiente, "Solicitud aún en curso: GET /resultado/"
+                                   + entrada["clave"].split("@", 1)[0])
+
+    def _resolver_modelo(self, cuerpo: dict) -> str:
+        """Modelo pedido: "modelo" explícito, "rol" de NODOS[nodo_id]["modelos"] o el del servidor."""
+        if cuerpo.get("modelo"):
+            return cuerpo["modelo"]
+        roles = NODOS.get(self.nodo_id, {}).get("modelos", {})
+        return roles.get(cuerpo.get("rol"), self.modelo)
+
     def _responder_ping(self):
-        self._responder_json(200, {
+        datos = {
             "estado": "activo",
             "nodo_id": self.nodo_id,
             "modelo": self.modelo,
             "timestamp": timestamp_utc(),
             "protocolo": "DIAN-v0.1"
-        })
+        }
+        if _es_local(self.client_address[0]):
+            # Para _pid_servidor: confirma que el archivo pid es de este proceso
+            datos["pid"] = os.getpid()
+        self._responder_json(200, datos)
 
     def _responder_estado(self):
         self._responder_json(200, {
             "nodo_id": self.nodo_id,
             "modelo": self.modelo,
             "ollama_url": OLLAMA_URL,
+            "recursos": estado_recursos_local(),
+            "modelos_cargados": modelos_cargados_ollama(),
+            "lotes": LOTEADOR.estadisticas() if LOTEADOR is not None else None,
+            "residencia": RESIDENCIA.estadisticas() if RESIDENCIA is not None else None,
+            "diario": DIARIO.estadisticas() if DIARIO is not None else None,
             "timestamp": timestamp_utc()
         })
 
-    def _responder_json(self, codigo: int, datos: dict):
-        cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+    def _responder_metricas(self):
+        cuerpo = METRICAS.exponer().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', len(cuerpo))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+        self._medir(200)
+
+    def _permitir_depuracion(self, accion: str) -> bool:
+        """
+        /debug/* solo con --depuracion y desde el propio nodo (Zona Verde de
+        agent_boundaries: leer el estado local). Los intentos remotos se
+        rechazan y quedan en el log de auditoría.
+        """
+        if not self.depuracion:
+            self._error(404, "Ruta no encontrada")
+            return False
+        cliente = self.client_address[0]
+        if not _es_local(cliente):
+            _auditar(accion, f"{self._ruta} desde {cliente}", "BLOQUEADO: no es localhost")
+            self._error(403, "Depuración solo disponible desde localhost")
+            return False
+        _auditar(accion, self.path, "OK")
+        return True
+
+    def _responder_perfil(self):
+        if not self._permitir_depuracion("perfilar_proceso"):
+            return
+        parametros = parse_qs(urlsplit(self.path).query)
+        try:
+            segundos = float(parametros.get("seconds", ["5"])[0])
+            intervalo_ms = float(parametros.get("intervalo_ms", ["10"])[0])
+        except ValueError:
+            self._error(400, "seconds e intervalo_ms deben ser números")
+            return
+        self._anotar_solicitud(segundos=segundos)
+        import dian_perfil
+        try:
+            perfil = dian_perfil.muestrear(segundos, max(1.0, intervalo_ms) / 1000)
+        except dian_perfil.PerfilEnCurso as e:
+            self._error(409, str(e))
+            return
+        if parametros.get("formato", [""])[0] == "colapsado":
+            cuerpo = dian_perfil.colapsado(perfil).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', len(cuerpo))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+            self._medir(200)
+            return
+        perfil["nodo_id"] = self.nodo_id
+        self._responder_json(200, perfil)
+
+    def _responder_tareas(self):
+        if not self._permitir_depuracion("listar_tareas"):
+            return
+        self._responder_json(200, {
+            "nodo_id": self.nodo_id,
+            "solicitudes": solicitudes_en_curso(),
+            "lotes": LOTEADOR.estadisticas() if LOTEADOR is not None else None,
+            "hilos": threading.active_count(),
+            "timestamp": timestamp_utc(),
+        })
+
+    def _medir(self, codigo: int):
+        ruta = getattr(self, "_ruta", self.path)
+        if ruta.startswith("/resultado/"):
+            ruta = "/resultado"
+        ruta = ruta if ruta in RUTAS_HTTP else "otra"
+        SOLICITUDES_HTTP.inc(ruta=ruta, codigo=codigo)
+        LATENCIA_HTTP.observar(time.monotonic() - getattr(self, "_inicio", time.monotonic()),
+                               ruta=ruta, modelo=getattr(self, "_modelo_metricas", ""))
+
+    def _responder_json(self, codigo: int, datos: dict, cerrar: bool = False,
+                        cabeceras: dict = None):
+        """
+        JSON por defecto. Si el cliente lo pide (Accept), las respuestas 200
+        van en sobre binario; con Accept-Encoding se comprimen (zstd/gzip).
+        Durante el drenaje toda respuesta cierra la conexión.
+        """
+        if codigo == 200 and TIPO_SOBRE in (self.headers.get('Accept') or ""):
+            cuerpo, tipo = codificar_sobre(datos), TIPO_SOBRE
+        else:
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            tipo = 'application/json; charset=utf-8'
+        codificacion = None
+        if len(cuerpo) >= UMBRAL_COMPRESION:
+            codificacion = elegir_codificacion(self.headers.get('Accept-Encoding'))
+            if codificacion:
+                cuerpo = comprimir(cuerpo, codificacion)
         self.send_response(codigo)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Type', tipo)
+        if codificacion:
+            self.send_header('Content-Encoding', codificacion)
+        self.send_header('Vary', 'Accept, Accept-Encoding')
         self.send_header('Content-Length', len(cuerpo))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        if cerrar or _DRENANDO.is_set():
+            self.send_header('Connection', 'close')
+            self.close_connection = True
         self.end_headers()
         self.wfile.write(cuerpo)
+        self._medir(codigo)
 
     def _error(self, codigo: int, mensaje: str):
-        self._responder_json(codigo, {"error": mensaje})
+        # Tras un error el cuerpo de la solicitud puede quedar sin leer:
+        # cerrar la conexión en lugar de reutilizarla
+        self._responder_json(codigo, {"error": mensaje}, cerrar=True)
 
     def log_message(self, format, *args):
         pass  # Silenciar logs HTTP por defecto
@@ -237,12 +1354,76 @@ class DIANHandler(BaseHTTPRequestHandler):
 
 def iniciar_servidor(nodo_id: str = "nodo-1-mac-principal",
                      modelo: str = "mistral:7b",
-                     puerto: int = SERVIDOR_PUERTO):
-    """Inicia el servidor DIAN en este nodo."""
-    DIANHandler.nodo_id = nodo_id
-    DIANHandler.modelo = modelo
-
-    servidor = HTTPServer(('0.0.0.0', puerto), DIANHandler)
+                     puerto: int = None,
+                     lotes: bool = True,
+                     paralelismo: int = PARALELISMO_OLLAMA,
+                     depuracion: bool = False,
+                     relevar: bool = False,
+                     plazo_drenaje: float = PLAZO_DRENAJE_S,
+                     diario: bool = True):
+    """
+    Inicia el servidor DIAN en este nodo.
+    lotes=True: las inferencias pasan por un LoteadorOllama con
+    `paralelismo` solicitudes simultáneas a Ollama.
+    depuracion=True: habilita /debug/profile y /debug/tasks (solo localhost).
+    puerto=None: SERVIDOR_PUERTO (o el de dian_config).
+    relevar=True: si otro servidor DIAN escucha en el puerto, se comparte
+    el socket (SO_REUSEPORT) y, ya atendiendo, se le pide que drene.
+    Ctrl+C / SIGTERM: drenar() con `plazo_drenaje` segundos.
+    diario=True: las inferencias se anotan en ~/.dian/diario-<puerto>.jsonl;
+    al arrancar se reanudan las que el proceso anterior dejó sin terminar.
+    """
+    import signal
+
+    puerto = SERVIDOR_PUERTO if puerto is None else puerto
+    anterior = _pid_servidor(puerto)
+    if anterior and not relevar:
+        print(f"ERROR: ya hay un servidor DIAN en el puerto {puerto} (pid {anterior}); "
+              f"--relevar para reemplazarlo sin cortar solicitudes")
+        return
+
+    global LOTEADOR, RESIDENCIA, DIARIO
+    manejador = _clase_manejador()
+    manejador.nodo_id = nodo_id
+    manejador.modelo = modelo
+    manejador.depuracion = depuracion
+    dian_trazas.TRAZADOR.nodo = nodo_id
+    if RESIDENCIA is None:
+        RESIDENCIA = GestorResidencia()
+    if lotes and LOTEADOR is None:
+        LOTEADOR = LoteadorOllama(paralelismo=paralelismo, residencia=RESIDENCIA)
+    if diario:
+        from dian_diario import DiarioSolicitudes
+        DIARIO = DiarioSolicitudes(_archivo_diario(puerto))
+        if not anterior:
+            abrir_diario(nodo_id)
+
+    if anterior:
+        servidor = _relevar_puerto(('0.0.0.0', puerto), manejador, anterior)
+        if servidor is None:
+            print(f"ERROR: el servidor anterior (pid {anterior}) no compartió el puerto {puerto}")
+            return
+    else:
+        servidor = _servidor_http(('0.0.0.0', puerto), manejador)
+    _DRENANDO.clear()
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True, name="dian-http")
+    hilo.start()
+    detener = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: detener.set())
+        if hasattr(signal, "SIGUSR1"):
+            # Primer paso de un relevo: el proceso nuevo pide compartir el puerto
+            signal.signal(signal.SIGUSR1, lambda *_: _compartir_puerto(servidor))
+    if anterior:
+        print(f"[DIAN] Relevando al servidor anterior (pid {anterior})...")
+        os.kill(anterior, signal.SIGTERM)
+        if DIARIO is not None:
+            # El anterior termina lo que tiene en curso: su diario se lee al salir
+            threading.Thread(target=abrir_diario, args=(nodo_id, anterior, plazo_drenaje + 5),
+                             daemon=True, name="dian-diario").start()
+    archivo_pid = _archivo_pid(puerto)
+    archivo_pid.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    archivo_pid.write_text(str(os.getpid()))
 
     print(f"\n{'='*50}")
     print(f"  DIAN Nodo Servidor v0.1")
@@ -252,81 +1433,758 @@ def iniciar_servidor(nodo_id: str = "nodo-1-mac-principal",
     print(f"  Puerto:   {puerto}")
     print(f"  URL:      http://0.0.0.0:{puerto}")
     print(f"  Ollama:   {OLLAMA_URL}")
+    print(f"  Lotes:    {'sí, paralelismo ' + str(paralelismo) if lotes else 'no'}")
+    print(f"  RAM modelos: {RESIDENCIA.limite_gb}GB")
+    print(f"  Diario:   {DIARIO.ruta if DIARIO is not None else 'no'}")
+    if depuracion:
+        print(f"  Depuración: /debug/profile, /debug/tasks (solo localhost)")
     print(f"{'='*50}")
     print(f"  Esperando solicitudes de otros nodos...")
     print(f"  Ctrl+C para detener\n")
 
     try:
-        servidor.serve_forever()
+        while not detener.wait(0.5):
+            pass
     except KeyboardInterrupt:
-        print("\n[DIAN] Servidor detenido.")
-        servidor.shutdown()
+        pass
+    try:
+        drenar(servidor, plazo_drenaje)
+    finally:
+        if _leer_pid(puerto) == os.getpid():
+            archivo_pid.unlink()
+    print("[DIAN] Servidor detenido.")
+
+
+def _servidor_http(direccion: tuple, manejador: type, compartir: bool = False):
+    """
+    compartir=True solo durante un relevo: SO_REUSEPORT deja al proceso
+    nuevo escuchar junto al anterior. Fuera de un relevo un segundo
+    arranque debe fallar con EADDRINUSE, no repartirse las conexiones.
+    """
+    from http.server import ThreadingHTTPServer
+    import socket
+
+    class ServidorDIAN(ThreadingHTTPServer):
+        def server_bind(self):
+            # Dos procesos en el mismo puerto durante un relevo (Linux, macOS, Android)
+            if compartir and hasattr(socket, "SO_REUSEPORT"):
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            super().server_bind()
+
+    return ServidorDIAN(direccion, manejador)
+
+
+def _compartir_puerto(servidor):
+    import socket
+    if hasattr(socket, "SO_REUSEPORT"):
+        servidor.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+
+def _relevar_puerto(direccion: tuple, manejador: type, anterior: int,
+                    espera_s: float = 5.0):
+    """
+    Servidor que escucha junto al anterior: le pide (SIGUSR1) que active
+    SO_REUSEPORT en su socket y reintenta el bind hasta `espera_s`.
+    None si el puerto sigue ocupado.
+    """
+    import errno
+    import signal
+    if hasattr(signal, "SIGUSR1"):
+        os.kill(anterior, signal.SIGUSR1)
+    limite = time.monotonic() + espera_s
+    while True:
+        try:
+            return _servidor_http(direccion, manejador, compartir=True)
+        except OSError as e:
+            if e.errno != errno.EADDRINUSE:
+                raise
+            if time.monotonic() >= limite:
+                return None
+            time.sleep(0.1)
+
+
+def _archivo_pid(puerto: int):
+    from pathlib import Path
+    return Path.home() / ".dian" / f"servidor-{puerto}.pid"
+
+
+def _archivo_diario(puerto: int):
+    from pathlib import Path
+    return Path.home() / ".dian" / f"diario-{puerto}.jsonl"
+
+
+def _leer_pid(puerto: int):
+    """PID anotado en el archivo del servidor de `puerto`, o None (sin verificar)."""
+    try:
+        return int(_archivo_pid(puerto).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_servidor(puerto: int):
+    """
+    PID del servidor DIAN vivo en `puerto`, o None. El archivo sobrevive a
+    un SIGKILL o un corte y tras reiniciar el equipo ese pid puede ser de
+    otro proceso: solo cuenta si /ping en localhost responde con el mismo pid.
+    """
+    pid = _leer_pid(puerto)
+    if pid is None:
+        return None
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return None
+    from urllib import request
+    try:
+        with request.urlopen(f"http://127.0.0.1:{puerto}/ping",
+                             timeout=TIMEOUT_SONDEO_S) as respuesta:
+            data = json.loads(respuesta.read().decode("utf-8"))
+    except Exception:
+        return None
+    return pid if data.get("pid") == pid else None
+
+
+def drenar(servidor, plazo_s: float = PLAZO_DRENAJE_S) -> int:
+    """
+    Apagado ordenado: deja de aceptar conexiones y libera el puerto, responde
+    503 (reintentable) a solicitudes nuevas en conexiones ya abiertas, espera
+    hasta `plazo_s` a las que están en curso y cierra el LoteadorOllama.
+    Retorna cuántas solicitudes quedaron sin terminar.
+    """
+    _DRENANDO.set()
+    servidor.shutdown()        # detiene serve_forever (corre en otro hilo)
+    # Conexiones que el kernel ya encoló en este socket: atenderlas (503
+    # reintentable) en vez de que se reseteen al cerrarlo
+    servidor.socket.setblocking(False)
+    while True:
+        try:
+            conexion, direccion = servidor.socket.accept()
+        except OSError:
+            break
+        conexion.setblocking(True)
+        servidor.process_request(conexion, direccion)
+    servidor.server_close()    # el proceso de relevo recibe las conexiones nuevas
+    with _solicitudes_lock:
+        pendientes = len(_SOLICITUDES_EN_CURSO)
+    print(f"\n[DIAN] Drenando: {pendientes} solicitudes en curso (plazo {plazo_s:g}s)...")
+    limite = time.monotonic() + plazo_s
+    while pendientes and time.monotonic() < limite:
+        time.sleep(0.1)
+        with _solicitudes_lock:
+            pendientes = len(_SOLICITUDES_EN_CURSO)
+    if LOTEADOR is not None and not pendientes:
+        LOTEADOR.cerrar()
+    if DIARIO is not None:
+        # Las abandonadas quedan pendientes en el diario: el próximo proceso las reanuda
+        DIARIO.cerrar()
+    # Auditoría y trazas escriben cada entrada con open/append: no hay búfer
+    # que vaciar; queda constancia del apagado
+    _auditar("detener_servicio", f"drenaje de {servidor.server_address[1]}: "
+             f"{pendientes} sin terminar", "OK" if not pendientes else "PLAZO VENCIDO")
+    if pendientes:
+        print(f"[DIAN] Plazo de drenaje vencido: {pendientes} solicitudes abandonadas")
+    return pendientes
+
+
+def abrir_diario(nodo_id: str, anterior: int = None, espera_max_s: float = None) -> int:
+    """
+    Lee DIARIO y reanuda en segundo plano las inferencias que quedaron sin
+    terminar. anterior: pid del servidor relevado, que aún escribe en el
+    mismo archivo; se espera a que salga (hasta `espera_max_s`).
+    Retorna cuántas solicitudes se reanudan.
+    """
+    limite = time.monotonic() + (espera_max_s or 0)
+    while anterior and time.monotonic() < limite:
+        try:
+            os.kill(anterior, 0)
+        except OSError:
+            break
+        time.sleep(0.2)
+    pendientes = DIARIO.abrir()
+    if pendientes:
+        print(f"[DIAN] Reanudando {len(pendientes)} solicitudes del diario")
+    for entrada in pendientes:
+        threading.Thread(target=_reanudar, args=(entrada["clave"], nodo_id),
+                         daemon=True, name="dian-reanudar").start()
+    return len(pendientes)
+
+
+def _reanudar(clave: str, nodo_id: str):
+    """Repite una inferencia del diario; el resultado queda en /resultado/<hash>."""
+    from dian_diario import MAX_INTENTOS
+    hash_aporte = clave.split("@", 1)[0]
+    entrada = DIARIO.reanudar(clave)
+    cuerpo = entrada["cuerpo"] or {}
+    if entrada["intentos"] > MAX_INTENTOS:
+        DIARIO.fallar(clave, f"Abandonada tras {MAX_INTENTOS} reinicios del nodo")
+        return
+    # El plazo corre desde que se aceptó, también durante el reinicio
+    plazo_s = cuerpo.get("plazo_s")
+    if plazo_s is not None:
+        plazo_s -= time.time() - entrada["aceptada"]
+        if plazo_s <= 0:
+            DIARIO.fallar(clave, "Plazo vencido durante el reinicio del nodo", 504)
+            return
+    modelo = cuerpo.get("modelo") or _clase_manejador().modelo
+    limite = time.monotonic() + plazo_s if plazo_s is not None else None
+    try:
+        inicio = time.time()
+        with dian_trazas.tramo("servidor.reanudada", modelo=modelo,
+                               solicitante=cuerpo.get("nodo_id"), intento=entrada["intentos"]):
+            # Tras un reinicio del equipo Ollama puede arrancar después que
+            # DIAN: se reintenta con pausas crecientes antes de darla por fallida
+            for pausa in REANUDAR_PAUSAS_OLLAMA_S + (None,):
+                restante = None if limite is None else limite - time.monotonic()
+                output = _inferir(cuerpo["prompt"], modelo,
+                                  cuerpo.get("prioridad") or PRIORIDAD_DEFECTO,
+                                  restante, time.monotonic())
+                if not es_error_ollama(output) or pausa is None:
+                    break
+                if limite is not None and time.monotonic() + pausa >= limite:
+                    raise PlazoVencido("Plazo vencido esperando a Ollama")
+                time.sleep(pausa)
+        duracion = time.time() - inicio
+        if es_error_ollama(output):
+            DIARIO.fallar(clave, output, CODIGO_OLLAMA_CAIDO)
+            print(f"[DIAN] Reanudada {hash_aporte[:16]}... sin Ollama: {output}")
+            return
+        LATENCIA_INFERENCIA.observar(duracion, modelo=modelo)
+        DIARIO.completar(clave, _respuesta_inferencia(
+            output, hash_aporte, cuerpo.get("timestamp_aporte"), modelo, nodo_id, duracion))
+        print(f"[DIAN] Reanudada {hash_aporte[:16]}... en {duracion:.1f}s")
+    except PlazoVencido as e:
+        DIARIO.fallar(clave, str(e), 504)
+    except Exception as e:
+        DIARIO.fallar(clave, str(e), 500)
+
+
+_DIANHandler = None
+
+
+def _clase_manejador() -> type:
+    """
+    DIANHandler = _ManejadorDIAN + BaseHTTPRequestHandler, creada al primer
+    uso para que importar dian_nodos no cargue http.server.
+    """
+    global _DIANHandler
+    if _DIANHandler is None:
+        from http.server import BaseHTTPRequestHandler
+        _DIANHandler = type("DIANHandler", (_ManejadorDIAN, BaseHTTPRequestHandler),
+                            {"__doc__": _ManejadorDIAN.__doc__})
+    return _DIANHandler
+
+
+def __getattr__(nombre: str):
+    # dian_nodos.DIANHandler sigue disponible para quien lo use (dian_bench)
+    if nombre == "DIANHandler":
+        return _clase_manejador()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
 
 # ============= CLIENTE DIAN =============
 
-def consultar_nodo_remoto(prompt: str, nodo_config: dict,
-                           nodo_local_id: str = "cliente") -> dict:
+def preparar_inferencia(prompt: str, nodo_local_id: str,
+                        rol: str = None, modelo: str = None,
+                        prioridad: str = None, plazo_s: float = None,
+                        codificaciones: tuple = None, sobre: bool = False) -> tuple:
     """
-    Consulta un nodo DIAN remoto con protocolo de atribución.
+    (aporte, cuerpo, cabeceras) de una solicitud a /inferencia.
+    El aporte humano se registra ANTES de enviar.
     """
-    # Registrar aporte humano ANTES de enviar
     aporte = crear_aporte(prompt, nodo_local_id)
 
-    payload = json.dumps({
+    datos = {
         "prompt": prompt,
         "nodo_id": nodo_local_id,
         "hash_aporte": aporte["hash_aporte"],
         "timestamp_aporte": aporte["timestamp"]
-    }).encode('utf-8')
+    }
+    if rol:
+        datos["rol"] = rol
+    if modelo:
+        datos["modelo"] = modelo
+    if prioridad:
+        datos["prioridad"] = prioridad
+    if plazo_s is not None:
+        datos["plazo_s"] = plazo_s
+    traza = dian_trazas.actual()
+    if traza:
+        datos["traza"] = traza
+
+    codificaciones = codificaciones_soportadas() if codificaciones is None else codificaciones
+    cabeceras = {"Content-Type": TIPO_JSON,
+                 "Accept": f"{TIPO_SOBRE}, {TIPO_JSON};q=0.9" if sobre else TIPO_JSON}
+    if codificaciones:
+        cabeceras["Accept-Encoding"] = ", ".join(codificaciones)
+    return aporte, json.dumps(datos).encode('utf-8'), cabeceras
+
+
+def resultado_error(mensaje: str, nodo_config: dict, aporte: dict,
+                    codigo: int = None) -> dict:
+    """Resultado de una consulta fallida. "codigo": el nodo respondió con error HTTP."""
+    resultado = {"error": mensaje, "nodo": nodo_config['descripcion'], "aporte_local": aporte}
+    if codigo is not None:
+        resultado["codigo"] = codigo
+    return resultado
 
-    url = f"http://{nodo_config['ip']}:{nodo_config['puerto']}/inferencia"
 
-    req = request.Request(
-        url,
-        data=payload,
-        headers={"Content-Type": "application/json"},
-        method="POST"
-    )
+def consultar_nodo_remoto(prompt: str, nodo_config: dict,
+                           nodo_local_id: str = "cliente",
+                           rol: str = None, modelo: str = None,
+                           prioridad: str = None, plazo_s: float = None,
+                           codificaciones: tuple = None, sobre: bool = False) -> dict:
+    """
+    Consulta un nodo DIAN remoto con protocolo de atribución.
+    rol / modelo: modelo a usar en el nodo (por defecto, el del servidor).
+    prioridad: clase de PRIORIDADES (interactiva, consenso, lote).
+    plazo_s: el nodo descarta la solicitud si no la atiende en ese tiempo.
+    codificaciones: Accept-Encoding ofrecido (None: todas las soportadas,
+    (): sin compresión). sobre=True pide la respuesta en sobre binario.
+
+    Envoltorio síncrono de ClienteDIAN.consultar (dian_cliente_async).
+    """
+    from dian_cliente_async import ejecutar
+    return ejecutar(lambda cliente: cliente.consultar(
+        prompt, nodo_config, nodo_local_id, rol=rol, modelo=modelo,
+        prioridad=prioridad, plazo_s=plazo_s, codificaciones=codificaciones, sobre=sobre))
+
+
+def ping_nodo(nodo_config: dict, nodo_id: str = None) -> bool:
+    """Verifica si un nodo está activo (sondeo a través de SALUD)."""
+    nodo_id = nodo_id or nodo_config.get('id') or nodo_config['descripcion']
+    data = SALUD.sondear(nodo_id, nodo_config)
+    if data is not None:
+        print(f"  ✅ {data['nodo_id']} — {data['modelo']} — {data['timestamp']}")
+        return True
+    print(f"  ❌ {nodo_config['descripcion']} — No alcanzable")
+    return False
+
+
+# ============= SALUD DE NODOS =============
+
+FALLOS_PARA_ABRIR = 3        # fallos consecutivos que abren el circuito
+ESPERA_CIRCUITO_S = 10.0     # primera espera antes de un sondeo semiabierto
+ESPERA_CIRCUITO_MAX_S = 300.0
+ALFA_EWMA = 0.3
+TIMEOUT_SONDEO_S = 2.0
+
+
+class RegistroSalud:
+    """
+    Estado de salud por nodo con circuit breaker.
+
+    cerrado     → se envían solicitudes normalmente
+    abierto     → FALLOS_PARA_ABRIR fallos seguidos: se rechaza al instante
+                  hasta que vence la espera (que se duplica en cada reapertura)
+    semiabierto → vencida la espera, una sola solicitud de prueba; si
+                  responde se cierra, si falla se vuelve a abrir
+
+    Además mantiene latencia EWMA, tasa de error EWMA y el último /ping.
+    iniciar() lanza un hilo que sondea /ping periódicamente.
+    """
+
+    def __init__(self):
+        self.nodos: dict = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _estado(self, nodo_id: str) -> dict:
+        if nodo_id not in self.nodos:
+            self.nodos[nodo_id] = {
+                "circuito": "cerrado",
+                "vivo": None,
+                "latencia_ewma": None,
+                "tasa_error": 0.0,
+                "fallos_consecutivos": 0,
+                "espera": ESPERA_CIRCUITO_S,
+                "reintento_en": 0.0,
+                "prueba_en_curso": False,
+                "ultimo_ping": None,
+            }
+        return self.nodos[nodo_id]
+
+    def registrar_exito(self, nodo_id: str, latencia: float = None):
+        with self._lock:
+            e = self._estado(nodo_id)
+            e["vivo"] = True
+            e["fallos_consecutivos"] = 0
+            e["tasa_error"] *= 1 - ALFA_EWMA
+            if latencia is not None:
+                e["latencia_ewma"] = latencia if e["latencia_ewma"] is None else \
+                    ALFA_EWMA * latencia + (1 - ALFA_EWMA) * e["latencia_ewma"]
+            e["circuito"] = "cerrado"
+            e["espera"] = ESPERA_CIRCUITO_S
+            e["prueba_en_curso"] = False
+
+    def registrar_fallo(self, nodo_id: str, abrir: bool = False):
+        """abrir=True: fallo inequívoco (conexión rechazada), abre el circuito ya."""
+        with self._lock:
+            e = self._estado(nodo_id)
+            e["vivo"] = False
+            e["fallos_consecutivos"] += FALLOS_PARA_ABRIR if abrir else 1
+            e["tasa_error"] = ALFA_EWMA + (1 - ALFA_EWMA) * e["tasa_error"]
+            if e["circuito"] == "semiabierto":
+                e["espera"] = min(e["espera"] * 2, ESPERA_CIRCUITO_MAX_S)
+            if e["circuito"] == "semiabierto" or e["fallos_consecutivos"] >= FALLOS_PARA_ABRIR:
+                if e["circuito"] == "cerrado":
+                    print(f"  [⚡] Circuito abierto: {nodo_id}")
+                e["circuito"] = "abierto"
+                e["reintento_en"] = time.time() + e["espera"]
+            e["prueba_en_curso"] = False
+
+    def disponible(self, nodo_id: str) -> bool:
+        """
+        True si se puede enviar una solicitud. Con el circuito abierto y la
+        espera vencida pasa a semiabierto y autoriza solo una prueba.
+        """
+        with self._lock:
+            e = self._estado(nodo_id)
+            if e["circuito"] == "cerrado":
+                return True
+            if e["circuito"] == "abierto" and time.time() >= e["reintento_en"]:
+                e["circuito"] = "semiabierto"
+            if e["circuito"] == "semiabierto" and not e["prueba_en_curso"]:
+                e["prueba_en_curso"] = True
+                return True
+            return False
+
+    def rechaza(self, nodo_id: str) -> bool:
+        """True si disponible() rechazaría ahora (sin consumir la prueba semiabierta)."""
+        with self._lock:
+            e = self._estado(nodo_id)
+            if e["circuito"] == "abierto":
+                return time.time() < e["reintento_en"]
+            return e["circuito"] == "semiabierto" and e["prueba_en_curso"]
+
+    def circuito(self, nodo_id: str) -> str:
+        with self._lock:
+            return self._estado(nodo_id)["circuito"]
+
+    def liberar_prueba(self, nodo_id: str):
+        """Una prueba semiabierta cancelada no cuenta: otra solicitud puede probar."""
+        with self._lock:
+            self._estado(nodo_id)["prueba_en_curso"] = False
+
+    def registrar_ping(self, nodo_id: str, datos: dict, latencia: float):
+        self.registrar_exito(nodo_id, latencia)
+        with self._lock:
+            self._estado(nodo_id)["ultimo_ping"] = datos
+
+    def sondear(self, nodo_id: str, nodo_config: dict,
+                timeout: float = TIMEOUT_SONDEO_S):
+        """GET /ping con timeout corto; actualiza el estado y retorna el JSON o None."""
+        from dian_cliente_async import ejecutar
+        return ejecutar(lambda cliente: cliente.ping(nodo_id, nodo_config, timeout))
+
+    def sondear_todos(self, nodos: list, timeout: float = TIMEOUT_SONDEO_S) -> dict:
+        """Sondea en paralelo [(nodo_id, config)]; retorna {nodo_id: JSON o None}."""
+        from dian_cliente_async import ejecutar
+        return ejecutar(lambda cliente: cliente.sondear_todos(nodos, timeout))
+
+    def iniciar(self, nodos: dict = None, intervalo: float = 15.0):
+        """Sondeo de /ping en segundo plano cada `intervalo` segundos."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def bucle():
+            while not self._detener.is_set():
+                self.sondear_todos(list((NODOS if nodos is None else nodos).items()))
+                self._detener.wait(intervalo)
+
+        self._hilo = threading.Thread(target=bucle, daemon=True, name="dian-salud")
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                nid: {
+                    "circuito": e["circuito"],
+                    "vivo": e["vivo"],
+                    "latencia_ewma": round(e["latencia_ewma"], 3)
+                    if e["latencia_ewma"] is not None else None,
+                    "tasa_error": round(e["tasa_error"], 3),
+                    "fallos_consecutivos": e["fallos_consecutivos"],
+                }
+                for nid, e in self.nodos.items()
+            }
+
+
+SALUD = RegistroSalud()
+
+# ============= ESTADO DEL CLÚSTER =============
+
+def fila_estado_vacia(nodo_id: str, nodo_config: dict) -> dict:
+    return {
+        "nodo_id": nodo_id,
+        "descripcion": nodo_config.get('descripcion', ''),
+        "vivo": False,
+        "latencia_ms": None,
+        "modelo": None,
+        "temperatura_c": None,
+        "ram_pct": None,
+        "modelos_cargados": None,
+        "error": None,
+    }
+
+
+def barrido_cluster(nodos: list = None, timeout: float = TIMEOUT_SONDEO_S) -> list:
+    """
+    /ping y /estado de todos los nodos en paralelo, dentro de una sola
+    ventana de timeout (ClienteDIAN.barrido). Actualiza SALUD.
+    """
+    from dian_cliente_async import ejecutar
+    return ejecutar(lambda cliente: cliente.barrido(nodos, timeout))
+
+
+def imprimir_tabla_cluster(filas: list):
+    def celda(valor, sufijo=""):
+        return "—" if valor in (None, -1.0) else f"{valor}{sufijo}"
 
+    print(f"  {'NODO':<24} {'ESTADO':<7} {'LAT':>8} {'TEMP':>7} {'RAM':>6}  "
+          f"{'CIRCUITO':<11} MODELOS")
+    for f in filas:
+        estado = "✅" if f["vivo"] else "❌"
+        modelos = ", ".join(f.get("modelos_cargados") or []) or (f.get("modelo") or "")
+        if f.get("error") and not f["vivo"]:
+            modelos = f["error"][:40]
+        print(f"  {f['nodo_id']:<24} {estado:<7} {celda(f.get('latencia_ms'), 'ms'):>8} "
+              f"{celda(f.get('temperatura_c'), '°C'):>7} {celda(f.get('ram_pct'), '%'):>6}  "
+              f"{f.get('circuito', '?'):<11} {modelos}")
+
+
+def vigilar_cluster(intervalo: float = 5.0, nodos: list = None,
+                    timeout: float = TIMEOUT_SONDEO_S):
+    """
+    Refresca la tabla cada `intervalo` s. Las conexiones HTTP/1.1 del
+    cliente compartido quedan abiertas entre barridos. Ctrl+C para salir.
+    """
     try:
-        with request.urlopen(req, timeout=180) as response:
-            resultado = json.loads(response.read().decode('utf-8'))
-            resultado["aporte_local"] = aporte
-            return resultado
-    except error.URLError as e:
+        while True:
+            inicio = time.time()
+            filas = barrido_cluster(nodos, timeout)
+            print("\033[2J\033[H", end="")
+            print(f"[DIAN] Estado del clúster — {timestamp_utc()} (cada {intervalo}s)\n")
+            imprimir_tabla_cluster(filas)
+            time.sleep(max(0.0, intervalo - (time.time() - inicio)))
+    except KeyboardInterrupt:
+        print("\n[DIAN] Vigilancia detenida.")
+
+
+# ============= COBERTURA DE LATENCIA (hedging) =============
+
+# Límites superiores (s) de los buckets de latencia por nodo
+BUCKETS_LATENCIA = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 90, 120, 180)
+MUESTRAS_MINIMAS_COBERTURA = 10
+
+
+class HistogramaLatencias:
+    """
+    Histograma acumulativo de latencias de un nodo (buckets fijos).
+    percentil() interpola linealmente dentro del bucket.
+    """
+
+    def __init__(self, limites: tuple = BUCKETS_LATENCIA):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)  # último: > limites[-1]
+        self.total = 0
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float):
+        i = 0
+        while i < len(self.limites) and segundos > self.limites[i]:
+            i += 1
+        with self._lock:
+            self.conteos[i] += 1
+            self.total += 1
+            self.suma += segundos
+
+    def percentil(self, p: float):
+        """Latencia estimada del percentil p (0–1), o None sin muestras."""
+        with self._lock:
+            if not self.total:
+                return None
+            objetivo = p * self.total
+            acumulado = 0
+            for i, conteo in enumerate(self.conteos):
+                if conteo and acumulado + conteo >= objetivo:
+                    inferior = self.limites[i - 1] if i > 0 else 0.0
+                    superior = self.limites[i] if i < len(self.limites) else self.limites[-1] * 2
+                    return inferior + (superior - inferior) * (objetivo - acumulado) / conteo
+                acumulado += conteo
+            return self.limites[-1] * 2
+
+    def resumen(self) -> dict:
         return {
-            "error": f"Nodo no alcanzable: {str(e)}",
-            "nodo": nodo_config['descripcion'],
-            "aporte_local": aporte
+            "muestras": self.total,
+            "media": round(self.suma / self.total, 3) if self.total else None,
+            "p50": self.percentil(0.5),
+            "p90": self.percentil(0.9),
         }
 
 
-def ping_nodo(nodo_config: dict) -> bool:
-    """Verifica si un nodo está activo."""
-    url = f"http://{nodo_config['ip']}:{nodo_config['puerto']}/ping"
-    try:
-        with request.urlopen(url, timeout=5) as response:
-            data = json.loads(response.read())
-            print(f"  ✅ {data['nodo_id']} — {data['modelo']} — {data['timestamp']}")
+class PresupuestoCobertura:
+    """
+    Cubeta de créditos para solicitudes duplicadas: cada solicitud primaria
+    aporta `fraccion` créditos (hasta `maximo`) y cada duplicado consume uno.
+    Con fraccion=0.2 el trabajo extra queda acotado a ~20% a largo plazo,
+    lo que limita la carga térmica adicional sobre los nodos.
+    """
+
+    def __init__(self, fraccion: float = 0.2, maximo: float = 2.0):
+        self.fraccion = fraccion
+        self.maximo = maximo
+        self.creditos = 1.0
+        self.primarias = 0
+        self.duplicadas = 0
+        self._lock = threading.Lock()
+
+    def registrar_primaria(self):
+        with self._lock:
+            self.primarias += 1
+            self.creditos = min(self.maximo, self.creditos + self.fraccion)
+
+    def consumir(self) -> bool:
+        with self._lock:
+            if self.creditos < 1.0:
+                return False
+            self.creditos -= 1.0
+            self.duplicadas += 1
             return True
-    except:
-        print(f"  ❌ {nodo_config['descripcion']} — No alcanzable")
-        return False
+
+
+LATENCIAS: dict = {}
+PRESUPUESTO_COBERTURA = PresupuestoCobertura()
+_EN_CURSO: Counter = Counter()
+_latencias_lock = threading.Lock()
+
+
+def histograma_nodo(nodo_id: str) -> HistogramaLatencias:
+    with _latencias_lock:
+        if nodo_id not in LATENCIAS:
+            LATENCIAS[nodo_id] = HistogramaLatencias()
+        return LATENCIAS[nodo_id]
+
+
+def registrar_en_curso(nodo_id: str, delta: int):
+    with _latencias_lock:
+        _EN_CURSO[nodo_id] += delta
+
+
+def registrar_resultado_nodo(nodo_id: str, resultado: dict, duracion: float):
+    """Alimenta histograma y SALUD con el resultado de una consulta."""
+    # Solo respuestas válidas: los errores rápidos subestimarían el p90
+    if "error" not in resultado:
+        histograma_nodo(nodo_id).observar(duracion)
+        SALUD.registrar_exito(nodo_id, duracion)
+    elif "codigo" in resultado:
+        SALUD.registrar_exito(nodo_id)  # respondió con error HTTP: el nodo está vivo
+    else:
+        SALUD.registrar_fallo(nodo_id)
+
+
+def consultar_nodo_medido(prompt: str, nodo_id: str, nodo_config: dict,
+                          nodo_local_id: str = "cliente", **opciones) -> dict:
+    """
+    consultar_nodo_remoto registrando latencia, solicitudes en curso y
+    salud del nodo. Con el circuito abierto retorna error sin conectar.
+    Envoltorio síncrono de ClienteDIAN.consultar_medido.
+    """
+    from dian_cliente_async import ejecutar
+    return ejecutar(lambda cliente: cliente.consultar_medido(
+        prompt, nodo_id, nodo_config, nodo_local_id, **opciones))
+
+
+def _elegir_reserva(excluido: str, reservas: list):
+    """Nodo de reserva libre (sin solicitudes en curso, circuito cerrado) con menor p50."""
+    libres = []
+    for nodo_id, config in reservas:
+        with _latencias_lock:
+            ocupado = _EN_CURSO[nodo_id] > 0
+        if nodo_id == excluido or ocupado or SALUD.circuito(nodo_id) != "cerrado":
+            continue
+        p50 = histograma_nodo(nodo_id).percentil(0.5)
+        libres.append((p50 if p50 is not None else float("inf"), nodo_id, config))
+    return min(libres, key=lambda r: (r[0], r[1]))[1:] if libres else None
+
+
+def consultar_con_cobertura(prompt: str, nodo_id: str, nodo_config: dict,
+                            reservas: list, nodo_local_id: str = "cliente",
+                            presupuesto: PresupuestoCobertura = None,
+                            timeout: float = 180, **opciones) -> dict:
+    """
+    Solicitud con cobertura (hedged request): si el nodo supera su p90
+    histórico sin responder, se envía la misma solicitud a un nodo de
+    reserva libre y se usa la primera respuesta válida; la otra se
+    cancela. El resultado indica si respondió la reserva.
+    Envoltorio síncrono de ClienteDIAN.consultar_con_cobertura.
+    """
+    from dian_cliente_async import ejecutar
+    return ejecutar(lambda cliente: cliente.consultar_con_cobertura(
+        prompt, nodo_id, nodo_config, reservas, nodo_local_id,
+        presupuesto=presupuesto, timeout=timeout, **opciones))
 
 
 # ============= CONSENSO DISTRIBUIDO =============
 
 def consenso_distribuido(prompt: str, nodos: list,
-                          nodo_local_id: str = "orquestador") -> dict:
+                          nodo_local_id: str = "orquestador",
+                          indice: 'IndiceLSH' = None,
+                          cobertura: bool = False,
+                          nodos_reserva: list = None,
+                          plazo_s: float = None) -> dict:
     """
     Consulta múltiples nodos y genera consenso básico.
     
     Protocolo DIAN Pilar 4:
     - Cada nodo responde independientemente
-    - Se comparan respuestas via hash
-    - Consenso = K/N nodos con respuestas coherentes
+    - Se comparan respuestas via hash y similitud semántica (puntuar_consenso)
+    - Consenso = mayoría (>N/2, mínimo 2) de nodos en el mismo clúster
+    - Cada respuesta se busca en el índice LSH (INDICE_RESPUESTAS por
+      defecto) para marcar respuestas ya vistas en rondas anteriores
+    - Los nodos con circuito abierto en SALUD se omiten sin esperar
+    - cobertura=True: un nodo que supera su p90 se duplica en un nodo de
+      reserva libre dentro del PRESUPUESTO_COBERTURA
+      (consultar_con_cobertura). Las reservas (nodos_reserva, por defecto
+      NODOS) nunca son nodos del propio consenso: un nodo rápido no debe
+      responder por uno lento y contar dos veces. Sin reservas, no hay
+      cobertura. La respuesta cubierta se atribuye a quien respondió
+    - Las solicitudes van con prioridad "consenso" y, si se indica,
+      plazo_s: un nodo que no puede responder a tiempo las descarta
+    - "traza": id de la traza y desglose por nodo (red, cola, carga,
+      prompt, generación) según dian_trazas
+    - No imprime el informe: imprimir_consenso(resultado), igual para el
+      resultado que llega del demonio cliente
+
+    Envoltorio síncrono de ClienteDIAN.consenso (dian_cliente_async).
     """
+    from dian_cliente_async import ejecutar
+    return ejecutar(lambda cliente: cliente.consenso(
+        prompt, nodos, nodo_local_id, indice=indice, cobertura=cobertura,
+        nodos_reserva=nodos_reserva, plazo_s=plazo_s))
+
+
+def nodos_consenso(reservas: list = None) -> tuple:
+    """
+    (nodos, nodos_reserva) de NODOS: los ids en `reservas` solo cubren a
+    nodos lentos y no votan en el consenso.
+    """
+    reservas = list(reservas or ())
+    desconocidos = [r for r in reservas if r not in NODOS]
+    if desconocidos:
+        raise ValueError(f"Nodos de reserva no encontrados: {desconocidos}. "
+                         f"Nodos disponibles: {list(NODOS)}")
+    return ([(i, c) for i, c in NODOS.items() if i not in reservas],
+            [(i, NODOS[i]) for i in reservas])
+
+
+def iniciar_consenso(prompt: str, nodos: list, nodo_local_id: str) -> dict:
+    """Cabecera de una ronda de consenso; retorna el aporte global."""
     print(f"\n{'='*50}")
     print(f"  DIAN Consenso Distribuido")
     print(f"{'='*50}")
@@ -336,83 +2194,126 @@ def consenso_distribuido(prompt: str, nodos: list,
 
     aporte_global = crear_aporte(prompt, nodo_local_id)
     print(f"Hash de atribución global: {aporte_global['hash_aporte'][:16]}...")
+    return aporte_global
 
-    resultados = []
-    hilos = []
-
-    def consultar_en_hilo(nodo_config, lista_resultados):
-        print(f"\n[→] Consultando {nodo_config['descripcion']}...")
-        resultado = consultar_nodo_remoto(prompt, nodo_config, nodo_local_id)
-        lista_resultados.append({
-            "nodo": nodo_config['descripcion'],
-            "nodo_id": nodo_config.get('id', 'desconocido'),
-            "resultado": resultado
-        })
 
-    # Consultas paralelas a todos los nodos
-    for nodo_id, nodo_config in nodos:
-        nodo_config['id'] = nodo_id
-        hilo = threading.Thread(
-            target=consultar_en_hilo,
-            args=(nodo_config, resultados)
-        )
-        hilos.append(hilo)
-        hilo.start()
-
-    # Esperar todos los nodos
-    for hilo in hilos:
-        hilo.join(timeout=180)
+def analizar_consenso(nodos: list, aporte_global: dict, resultados: list,
+                      indice: 'IndiceLSH' = None) -> dict:
+    """
+    Compara las respuestas recogidas y arma el resultado del consenso
+    (sin imprimir: ver imprimir_consenso).
+    """
+    indice = INDICE_RESPUESTAS if indice is None else indice
 
     # Análisis de consenso
-    respuestas_validas = [
-        r for r in resultados
-        if "error" not in r["resultado"]
-    ]
-
-    print(f"\n{'='*50}")
-    print(f"  RESULTADOS DEL CONSENSO")
-    print(f"{'='*50}")
-    print(f"  Nodos respondidos: {len(respuestas_validas)}/{len(nodos)}")
-
-    for r in respuestas_validas:
+    # Una respuesta cubierta es del nodo que respondió (cobertura.respondio);
+    # si un mismo nodo respondió por dos, su modelo cuenta una sola vez
+    # Un fallo de Ollama llega como output "ERROR_OLLAMA: ..." y no es una
+    # respuesta: ni él ni una salida vacía cuentan para el consenso
+    respuestas_validas = []
+    respondieron = set()
+    for r in resultados:
         output = r["resultado"].get("output", "")
-        hash_out = r["resultado"].get("hash_output", "")[:16]
-        duracion = r["resultado"].get("duracion_segundos", "?")
-        print(f"\n  [{r['nodo']}]")
-        print(f"  Hash: {hash_out}...")
-        print(f"  Tiempo: {duracion}s")
-        print(f"  Respuesta: {output[:200]}...")
+        if "error" in r["resultado"] or not output.strip() or es_error_ollama(output):
+            continue
+        r["respondio"] = (r["resultado"].get("cobertura") or {}).get("respondio") or r["nodo_id"]
+        if r["respondio"] in respondieron:
+            r["duplicada"] = True
+            continue
+        respondieron.add(r["respondio"])
+        respuestas_validas.append(r)
+
+    # Primero se consulta el índice y luego se agregan: "vista antes" es de
+    # rondas anteriores, no de otro nodo de esta misma ronda
+    firmas = [r["resultado"].get("minhash") or firma_minhash(r["resultado"].get("output", ""))
+              for r in respuestas_validas]
+    for r, firma in zip(respuestas_validas, firmas):
+        r["vista_antes"] = indice.visto_antes(firma)
+    for r, firma in zip(respuestas_validas, firmas):
+        indice.agregar(r["resultado"].get("hash_output")
+                       or hash_sha256(r["resultado"].get("output", "")), firma)
 
     # Verificar coherencia entre respuestas
+    mayoria = None
+    palabras_comunes = set()
     if len(respuestas_validas) >= 2:
         outputs = [r["resultado"].get("output", "") for r in respuestas_validas]
-        # Coherencia básica: longitud similar y palabras clave compartidas
+        puntaje = puntuar_consenso([r["resultado"] for r in respuestas_validas])
+        coherencia = puntaje["coherencia"]
+        cluster = puntaje["cluster"]
+        medoide = respuestas_validas[puntaje["medoide"]]
+        mayoria = {
+            "nodos": [respuestas_validas[i]["respondio"] for i in cluster],
+            "tamano": len(cluster),
+            "nodo_representante": medoide["respondio"],
+            "hash_output": medoide["resultado"].get("hash_output", ""),
+            "output": medoide["resultado"].get("output", ""),
+        }
         palabras_comunes = _palabras_en_comun(outputs)
-        coherencia = len(palabras_comunes) / max(
-            len(outputs[0].split()), 1
-        )
-        print(f"\n  Coherencia semántica básica: {coherencia:.2%}")
-        print(f"  Conceptos compartidos: {', '.join(list(palabras_comunes)[:5])}")
-        consenso_alcanzado = len(respuestas_validas) >= 2
+        consenso_alcanzado = len(cluster) >= 2 and len(cluster) * 2 > len(respuestas_validas)
     else:
         coherencia = 0.0
         consenso_alcanzado = False
+        puntaje = None
 
-    resultado_final = {
+    return {
         "prompt_hash": aporte_global["hash_aporte"],
         "timestamp": aporte_global["timestamp"],
         "nodos_consultados": len(nodos),
         "nodos_respondidos": len(respuestas_validas),
         "consenso_alcanzado": consenso_alcanzado,
         "coherencia": round(coherencia, 4),
+        "metodo_similitud": puntaje["metodo"] if puntaje else None,
+        "matriz_similitud": puntaje["matriz"] if puntaje else None,
+        "mayoria": mayoria,
+        "conceptos_compartidos": sorted(palabras_comunes)[:5],
+        "respuestas_vistas_antes": sum(1 for r in respuestas_validas if r["vista_antes"]),
+        "respuestas_cubiertas": sum(1 for r in respuestas_validas
+                                    if r["resultado"].get("cobertura")),
         "resultados": resultados,
         "protocolo": "DIAN-consenso-v0.1"
     }
 
-    print(f"\n  Consenso alcanzado: {'✅ SÍ' if consenso_alcanzado else '❌ NO'}")
-    print(f"{'='*50}\n")
 
-    return resultado_final
+def imprimir_consenso(resultado: dict):
+    """
+    Informe de un resultado de analizar_consenso: respuesta de cada nodo,
+    coherencia y mayoría. Sirve igual para el resultado que retorna el
+    demonio (dian_demonio), que no imprime nada en la terminal del usuario.
+    """
+    validas = [r for r in resultado["resultados"]
+               if r.get("respondio") and not r.get("duplicada")]
+    print(f"\n{'='*50}")
+    print(f"  RESULTADOS DEL CONSENSO")
+    print(f"{'='*50}")
+    print(f"  Nodos respondidos: {resultado['nodos_respondidos']}/{resultado['nodos_consultados']}")
+
+    for r in validas:
+        output = r["resultado"].get("output", "")
+        hash_out = r["resultado"].get("hash_output", "")[:16]
+        duracion = r["resultado"].get("duracion_segundos", "?")
+        print(f"\n  [{r['nodo']}]")
+        print(f"  Hash: {hash_out}...")
+        print(f"  Tiempo: {duracion}s")
+        if r["resultado"].get("cobertura"):
+            print(f"  Respondió la reserva: {r['resultado']['cobertura']['respondio']}")
+        if r.get("vista_antes"):
+            print(f"  Casi idéntica a respuesta previa {r['vista_antes'][:16]}...")
+        print(f"  Respuesta: {output[:200]}...")
+
+    mayoria = resultado["mayoria"]
+    if mayoria:
+        representante = next((r["nodo"] for r in validas
+                              if r["respondio"] == mayoria["nodo_representante"]),
+                             mayoria["nodo_representante"])
+        print(f"\n  Coherencia semántica ({resultado['metodo_similitud']}): "
+              f"{resultado['coherencia']:.2%}")
+        print(f"  Clúster mayoritario: {mayoria['tamano']}/{len(validas)} "
+              f"— representante {representante}")
+        print(f"  Conceptos compartidos: {', '.join(resultado['conceptos_compartidos'])}")
+
+    print(f"\n  Consenso alcanzado: {'✅ SÍ' if resultado['consenso_alcanzado'] else '❌ NO'}")
+    print(f"{'='*50}\n")
 
 
 def _palabras_en_comun(textos: list) -> set:
@@ -440,28 +2341,389 @@ def _palabras_en_comun(textos: list) -> set:
     return comunes
 
 
+# ============= CONSENSO SEMÁNTICO =============
+
+UMBRAL_COSENO = 0.85      # embeddings: misma respuesta con otras palabras
+UMBRAL_MINHASH = 0.30     # fallback: Jaccard estimado de palabras clave
+MINHASH_PERMUTACIONES = 64
+_MINHASH_PRIMO = (1 << 61) - 1
+_MINHASH_COEFICIENTES = [
+    (int.from_bytes(hashlib.sha256(f"a{i}".encode()).digest()[:8], "big") % _MINHASH_PRIMO | 1,
+     int.from_bytes(hashlib.sha256(f"b{i}".encode()).digest()[:8], "big") % _MINHASH_PRIMO)
+    for i in range(MINHASH_PERMUTACIONES)
+]
+_PALABRA = re.compile(r"\w+")
+
+_CACHE_EMBEDDINGS: "OrderedDict[str, list]" = OrderedDict()
+_CACHE_EMBEDDINGS_MAX = 4096
+_cache_lock = threading.Lock()
+
+
+def obtener_embeddings(outputs: list, claves: list,
+                       modelo: str = MODELO_EMBED) -> list:
+    """
+    Embeddings de varias respuestas en una sola llamada a Ollama (/api/embed).
+    claves: hash_output de cada respuesta — caché entre rondas de consenso.
+    Retorna None si el modelo de embeddings no está disponible.
+    """
+    with _cache_lock:
+        faltantes = [i for i, c in enumerate(claves) if c not in _CACHE_EMBEDDINGS]
+    CACHE_EMBEDDINGS.inc(len(claves) - len(faltantes), resultado="acierto")
+    CACHE_EMBEDDINGS.inc(len(faltantes), resultado="fallo")
+
+    if faltantes:
+        payload = json.dumps({
+            "model": modelo,
+            "input": [outputs[i] for i in faltantes]
+        }).encode('utf-8')
+        from urllib import request
+        req = request.Request(
+            f"{OLLAMA_URL}/api/embed",
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with request.urlopen(req, timeout=60) as response:
+                vectores = json.loads(response.read().decode('utf-8'))["embeddings"]
+        except Exception:
+            return None
+        with _cache_lock:
+            for i, vector in zip(faltantes, vectores):
+                _CACHE_EMBEDDINGS[claves[i]] = vector
+            while len(_CACHE_EMBEDDINGS) > _CACHE_EMBEDDINGS_MAX:
+                _CACHE_EMBEDDINGS.popitem(last=False)
+
+    with _cache_lock:
+        return [_CACHE_EMBEDDINGS.get(c) for c in claves]
+
+
+def _shingles(texto: str, n: int) -> set:
+    palabras = _PALABRA.findall(texto.lower())
+    if n == 1:
+        # Respuestas muy cortas ("Sí.", "No."): sin palabras clave, todas
+        return {p for p in palabras if len(p) > 4} or set(palabras)
+    return {" ".join(palabras[i:i + n]) for i in range(len(palabras) - n + 1)}
+
+
+def firma_minhash(texto: str, n: int = 3) -> list:
+    """
+    Firma MinHash de los shingles de n palabras (n=1: palabras clave).
+    Sin shingles (texto de menos de n palabras) la firma es [].
+    """
+    valores = [
+        int.from_bytes(hashlib.blake2b(sh.encode('utf-8'), digest_size=8).digest(), "big")
+        for sh in _shingles(texto, n)
+    ]
+    if not valores:
+        return []
+    return [
+        min((a * v + b) % _MINHASH_PRIMO for v in valores)
+        for a, b in _MINHASH_COEFICIENTES
+    ]
+
+
+def similitud_minhash(firma_a: list, firma_b: list) -> float:
+    """
+    Jaccard estimado: fracción de permutaciones con el mismo mínimo.
+    Una firma vacía no se parece a nada (ni a otra vacía).
+    """
+    if not firma_a or not firma_b:
+        return 0.0
+    iguales = sum(1 for x, y in zip(firma_a, firma_b) if x == y)
+    return iguales / max(len(firma_a), 1)
+
+
+MAX_FIRMAS_LSH = 20000     # ~50 MB: el demonio cliente mantiene el índice abierto
+
+
+class IndiceLSH:
+    """
+    Índice LSH sobre firmas MinHash: `bandas` bandas de r filas.
+
+    Dos firmas con Jaccard s comparten algún bucket con probabilidad
+    1 - (1 - s^r)^bandas (16×4 → umbral ≈ 0.5). Una búsqueda solo compara
+    las firmas de sus buckets, no todo el índice.
+
+    max_firmas: al superarlo se descarta la firma usada hace más tiempo
+    (LRU) junto con sus entradas en los buckets; None: sin límite.
+    Las firmas vacías (textos sin shingles) no se indexan ni se buscan.
+    """
+
+    def __init__(self, bandas: int = 16, max_firmas: int = MAX_FIRMAS_LSH):
+        self.bandas = bandas
+        self.filas = MINHASH_PERMUTACIONES // bandas
+        self.max_firmas = max_firmas
+        self.firmas: "OrderedDict[str, list]" = OrderedDict()
+        self._buckets = [dict() for _ in range(bandas)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.firmas)
+
+    def _bandas(self, firma: list) -> list:
+        r = self.filas
+        return [tuple(firma[i * r:(i + 1) * r]) for i in range(self.bandas)]
+
+    def agregar(self, clave: str, firma: list):
+        if not firma:
+            return
+        with self._lock:
+            if clave in self.firmas:
+                self.firmas.move_to_end(clave)
+                return
+            self.firmas[clave] = firma
+            for buckets, banda in zip(self._buckets, self._bandas(firma)):
+                buckets.setdefault(banda, []).append(clave)
+            while self.max_firmas is not None and len(self.firmas) > self.max_firmas:
+                self._descartar(next(iter(self.firmas)))
+
+    def _descartar(self, clave: str):
+        """Llamar con self._lock tomado."""
+        firma = self.firmas.pop(clave)
+        for buckets, banda in zip(self._buckets, self._bandas(firma)):
+            claves = buckets.get(banda)
+            if claves is not None:
+                claves.remove(clave)
+                if not claves:
+                    del buckets[banda]
+
+    def candidatos(self, firma: list) -> set:
+        if not firma:
+            return set()
+        with self._lock:
+            encontrados = set()
+            for buckets, banda in zip(self._buckets, self._bandas(firma)):
+                encontrados.update(buckets.get(banda, ()))
+            return encontrados
+
+    def buscar(self, firma: list, umbral: float = 0.5) -> list:
+        """[(clave, similitud)] de candidatos con similitud ≥ umbral, de mayor a menor."""
+        candidatos = self.candidatos(firma)
+        with self._lock:
+            similares = [(clave, similitud_minhash(firma, self.firmas[clave]))
+                         for clave in candidatos if clave in self.firmas]
+        return sorted([c for c in similares if c[1] >= umbral],
+                      key=lambda c: c[1], reverse=True)
+
+    def visto_antes(self, firma: list, umbral: float = 0.8):
+        """Clave de una respuesta casi idéntica ya indexada, o None."""
+        similares = self.buscar(firma, umbral)
+        if not similares:
+            return None
+        with self._lock:
+            if similares[0][0] in self.firmas:
+                self.firmas.move_to_end(similares[0][0])
+        return similares[0][0]
+
+    def guardar(self, ruta: str):
+        """Copia tomada bajo el lock (otros hilos pueden seguir agregando), escritura atómica."""
+        with self._lock:
+            datos = {"bandas": self.bandas, "firmas": dict(self.firmas)}
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(temporal, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> 'IndiceLSH':
+        with open(ruta, encoding='utf-8') as f:
+            datos = json.load(f)
+        indice = cls(datos["bandas"])
+        for clave, firma in datos["firmas"].items():
+            indice.agregar(clave, firma)
+        return indice
+
+
+INDICE_RESPUESTAS = IndiceLSH()
+
+
+def agrupar_respuestas(firmas: list, umbral: float = 0.5) -> list:
+    """
+    Agrupa respuestas casi-duplicadas (p. ej. consenso por lotes con miles
+    de prompts). Solo compara pares que comparten bucket LSH; los grupos
+    son componentes conexas (union-find). Retorna listas de índices.
+    """
+    padre = list(range(len(firmas)))
+
+    def raiz(i):
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    indice = IndiceLSH(max_firmas=None)
+    for i, firma in enumerate(firmas):
+        for clave, _ in indice.buscar(firma, umbral):
+            padre[raiz(int(clave))] = raiz(i)
+        indice.agregar(str(i), firma)
+
+    grupos: dict = {}
+    for i in range(len(firmas)):
+        grupos.setdefault(raiz(i), []).append(i)
+    return list(grupos.values())
+
+
+def _matriz_coseno(vectores: list) -> list:
+    import numpy as np
+    matriz = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    matriz = matriz / np.where(normas == 0, 1.0, normas)
+    return (matriz @ matriz.T).tolist()
+
+
+def puntuar_consenso(respuestas: list) -> dict:
+    """
+    Coherencia entre respuestas independiente del orden.
+
+    respuestas: dicts con "output" y "hash_output" (crear_respuesta); las
+    salidas vacías o de error (es_error_ollama) tienen similitud 0.
+    Similitud por pares: coseno de embeddings (un embedding por respuesta,
+    en lote y en caché); si no hay modelo de embeddings o numpy, MinHash
+    de palabras clave. El clúster mayoritario se forma alrededor de la
+    respuesta con más vecinas sobre el umbral (medoide).
+    """
+    outputs = [r.get("output", "") for r in respuestas]
+    claves = [r.get("hash_output") or hash_sha256(o) for r, o in zip(respuestas, outputs)]
+    n = len(outputs)
+
+    matriz, metodo, umbral = None, "embeddings", UMBRAL_COSENO
+    vectores = obtener_embeddings(outputs, claves) if n >= 2 else None
+    if vectores and all(vectores):
+        try:
+            matriz = _matriz_coseno(vectores)
+        except ImportError:
+            matriz = None
+    if matriz is None:
+        metodo, umbral = "minhash", UMBRAL_MINHASH
+        firmas = [firma_minhash(o, n=1) for o in outputs]
+        normalizados = [" ".join(_PALABRA.findall(o.lower())) for o in outputs]
+        matriz = [[1.0 if normalizados[i] == normalizados[j]
+                   else similitud_minhash(firmas[i], firmas[j]) for j in range(n)]
+                  for i in range(n)]
+    # Salidas vacías o de error no se parecen a nada (ni entre sí)
+    validas = [bool(o.strip()) and not es_error_ollama(o) for o in outputs]
+    matriz = [[v if i == j or (validas[i] and validas[j]) else 0.0
+               for j, v in enumerate(fila)] for i, fila in enumerate(matriz)]
+
+    vecinos = [[j for j in range(n) if matriz[i][j] >= umbral or i == j]
+               for i in range(n)]
+    centro = max(range(n), key=lambda i: (len(vecinos[i]), sum(matriz[i]), claves[i])) \
+        if n else None
+    pares = [matriz[i][j] for i in range(n) for j in range(i + 1, n)]
+
+    return {
+        "metodo": metodo,
+        "umbral": umbral,
+        "matriz": [[round(v, 4) for v in fila] for fila in matriz],
+        "coherencia": sum(pares) / len(pares) if pares else 0.0,
+        "cluster": vecinos[centro] if centro is not None else [],
+        "medoide": centro,
+    }
+
+
 # ============= PUNTO DE ENTRADA =============
 
+def _via_demonio(args, op: str, **parametros):
+    """
+    Resultado de `op` en el demonio cliente local (dian_demonio), o None si
+    no hay demonio o se pidió --sin-demonio: el llamador ejecuta en proceso.
+    """
+    if args.sin_demonio:
+        return None
+    import dian_demonio
+    try:
+        return dian_demonio.solicitar(op, args.socket or None, **parametros)
+    except dian_demonio.DemonioNoDisponible:
+        return None
+    except dian_demonio.ErrorDemonio as e:
+        print(f"ERROR (demonio): {e}")
+        sys.exit(1)
+
+
 def main():
     parser = argparse.ArgumentParser(description='DIAN — Comunicación Entre Nodos v0.1')
-    parser.add_argument('--modo', choices=['servidor', 'cliente', 'consenso', 'ping'],
+    parser.add_argument('--modo', choices=['servidor', 'cliente', 'consenso', 'ping', 'demonio'],
                         default='ping', help='Modo de operación')
     parser.add_argument('--prompt', type=str, default='',
                         help='Prompt para inferencia o consenso')
     parser.add_argument('--nodo', type=str, default='nodo-1-mac-principal',
                         help='Nodo destino para modo cliente')
-    parser.add_argument('--puerto', type=int, default=SERVIDOR_PUERTO,
-                        help='Puerto del servidor')
+    parser.add_argument('--puerto', type=int, default=None,
+                        help=f'Puerto del servidor (por defecto {SERVIDOR_PUERTO} o el de --config)')
+    parser.add_argument('--config', type=str, default='',
+                        help='Archivo JSON de configuración (también DIAN_CONFIG); '
+                             'servidor y demonio lo recargan al cambiar o con SIGHUP')
+    parser.add_argument('--indice-lsh', type=str, default='',
+                        help='Archivo del índice LSH de respuestas (modo consenso)')
+    parser.add_argument('--sin-lotes', action='store_true',
+                        help='Servidor: enviar cada prompt a Ollama sin micro-lotes')
+    parser.add_argument('--paralelismo', type=int, default=PARALELISMO_OLLAMA,
+                        help='Servidor: solicitudes simultáneas a Ollama')
+    parser.add_argument('--rol', type=str, default='',
+                        help='Modo cliente: rol del modelo en el nodo (principal, consenso, rag...)')
+    parser.add_argument('--plazo', type=float, default=None,
+                        help='Cliente/consenso: segundos máximos de espera en el nodo')
+    parser.add_argument('--vigilar', type=float, default=0,
+                        help='Modo ping: refrescar el estado del clúster cada N segundos')
+    parser.add_argument('--json', action='store_true',
+                        help='Modo ping: imprimir el barrido como JSON')
+    parser.add_argument('--cobertura', action='store_true',
+                        help='Duplicar en un nodo de reserva los nodos que superan su p90')
+    parser.add_argument('--reservas', type=str, default='',
+                        help='Consenso: ids de NODOS (separados por comas) que solo cubren '
+                             'con --cobertura y no votan')
+    parser.add_argument('--relevar', action='store_true',
+                        help='Servidor: reemplazar al servidor activo en el puerto sin cortar solicitudes')
+    parser.add_argument('--plazo-drenaje', type=float, default=PLAZO_DRENAJE_S,
+                        help='Servidor: segundos para terminar las solicitudes en curso al detenerse')
+    parser.add_argument('--depuracion', action='store_true',
+                        help='Servidor: habilitar /debug/profile y /debug/tasks (solo localhost)')
+    parser.add_argument('--sin-diario', action='store_true',
+                        help='Servidor: no anotar las inferencias en ~/.dian/diario-<puerto>.jsonl')
+    parser.add_argument('--sin-demonio', action='store_true',
+                        help='Cliente/consenso/ping: no usar el demonio local aunque esté activo')
+    parser.add_argument('--socket', type=str, default='',
+                        help='Socket UNIX del demonio cliente (también DIAN_SOCKET)')
+    parser.add_argument('--trazas', type=str, default='',
+                        help='Archivo JSONL donde añadir los tramos de traza (también DIAN_TRAZAS)')
 
     args = parser.parse_args()
+    if args.trazas:
+        dian_trazas.TRAZADOR.archivo = args.trazas
+    import dian_config
+    ruta_config = dian_config.ruta_config(args.config or None)
+    if ruta_config is not None:
+        try:
+            dian_config.aplicar(dian_config.cargar(ruta_config))
+        except dian_config.ErrorConfig as e:
+            print(f"ERROR: configuración inválida: {e}")
+            sys.exit(1)
+        if args.modo in ('servidor', 'demonio'):
+            dian_config.vigilar(ruta_config)
 
     if args.modo == 'servidor':
-        iniciar_servidor(puerto=args.puerto)
+        iniciar_servidor(puerto=args.puerto, lotes=not args.sin_lotes,
+                         paralelismo=args.paralelismo, depuracion=args.depuracion,
+                         relevar=args.relevar, plazo_drenaje=args.plazo_drenaje,
+                         diario=not args.sin_diario)
+
+    elif args.modo == 'demonio':
+        import dian_demonio
+        dian_demonio.servir(args.socket or None)
 
     elif args.modo == 'ping':
-        print(f"\n[DIAN] Verificando nodos activos...\n")
-        for nodo_id, config in NODOS.items():
-            ping_nodo(config)
+        if args.vigilar:
+            vigilar_cluster(args.vigilar)
+            return
+        filas = _via_demonio(args, "ping")
+        if filas is None:
+            filas = barrido_cluster()
+        if args.json:
+            print(json.dumps(filas, ensure_ascii=False, indent=2))
+        else:
+            print(f"\n[DIAN] Verificando nodos activos...\n")
+            imprimir_tabla_cluster(filas)
 
     elif args.modo == 'cliente':
         if not args.prompt:
@@ -475,7 +2737,13 @@ def main():
             return
 
         print(f"\n[DIAN] Consultando {nodo_config['descripcion']}...")
-        resultado = consultar_nodo_remoto(args.prompt, nodo_config)
+        resultado = _via_demonio(args, "cliente", prompt=args.prompt, nodo=args.nodo,
+                                 rol=args.rol or None, plazo_s=args.plazo)
+        if resultado is None:
+            SALUD.sondear(args.nodo, nodo_config)
+            resultado = consultar_nodo_medido(args.prompt, args.nodo, nodo_config,
+                                              rol=args.rol or None, prioridad="interactiva",
+                                              plazo_s=args.plazo)
 
         if "error" in resultado:
             print(f"ERROR: {resultado['error']}")
@@ -485,14 +2753,44 @@ def main():
             print(f"Hash output: {resultado.get('hash_output', '')[:16]}...")
             print(f"Tiempo: {resultado.get('duracion_segundos', '?')}s")
             print(f"\n{resultado.get('output', '')}")
+        if resultado.get("traza_id"):
+            print(f"\nTraza {resultado['traza_id']}:")
+            dian_trazas.imprimir_desglose(resultado.get("desglose")
+                                          or dian_trazas.desglose(resultado["traza_id"]))
 
     elif args.modo == 'consenso':
         if not args.prompt:
             print("ERROR: --prompt requerido para modo consenso")
             return
+        reservas = [r.strip() for r in (args.reservas or "").split(",") if r.strip()]
+        try:
+            nodos_consenso(reservas)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            return
 
-        nodos_activos = list(NODOS.items())
-        resultado = consenso_distribuido(args.prompt, nodos_activos)
+        resultado = _via_demonio(args, "consenso", prompt=args.prompt,
+                                 indice_lsh=os.path.abspath(args.indice_lsh) if args.indice_lsh else None,
+                                 cobertura=args.cobertura, plazo_s=args.plazo,
+                                 reservas=reservas)
+        if resultado is None:
+            nodos_activos, nodos_reserva = nodos_consenso(reservas)
+            # Un sondeo paralelo previo abre el circuito de los nodos caídos
+            SALUD.sondear_todos(nodos_activos)
+            indice = None
+            if args.indice_lsh:
+                try:
+                    indice = IndiceLSH.cargar(args.indice_lsh)
+                except FileNotFoundError:
+                    indice = IndiceLSH()
+            resultado = consenso_distribuido(args.prompt, nodos_activos, indice=indice,
+                                             cobertura=args.cobertura, nodos_reserva=nodos_reserva,
+                                             plazo_s=args.plazo)
+            if args.indice_lsh:
+                indice.guardar(args.indice_lsh)
+        imprimir_consenso(resultado)
+        print(f"Traza {resultado['traza']['id']} ({resultado['traza']['duracion_s']:.1f}s):")
+        dian_trazas.imprimir_desglose(resultado["traza"]["desglose"])
 
         # Guardar resultado
         filename = f"consenso_{resultado['prompt_hash'][:8]}_{int(time.time())}.json"
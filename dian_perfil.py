@@ -0,0 +1,122 @@
+"""
+DIAN — dian_perfil.py v0.1
+Perfilador por muestreo del proceso (solo stdlib, sin herramientas externas).
+
+Implementa:
+  - muestrear(): cada `intervalo_s` toma la pila de todos los hilos con
+    sys._current_frames() durante `segundos` y agrega las muestras
+  - Funciones con más tiempo propio (cima de la pila) y acumulado
+  - Pilas colapsadas "hilo;f1;f2;... n" (formato de flamegraph.pl y
+    speedscope)
+
+El coste es el de recorrer las pilas en cada muestra: a 100 Hz y con
+unas decenas de hilos, pocos puntos de CPU mientras dura el muestreo;
+cero fuera de él. Lo usa /debug/profile de dian_nodos (solo localhost).
+
+Uso:
+    import dian_perfil
+    perfil = dian_perfil.muestrear(5)
+    print(perfil["propio"][:10])
+    open("perfil.txt", "w").write(dian_perfil.colapsado(perfil))
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+INTERVALO_S = 0.01
+SEGUNDOS_MAX = 60.0
+TOP = 30
+
+_en_curso = threading.Lock()
+
+
+class PerfilEnCurso(RuntimeError):
+    """Ya hay un muestreo en marcha en este proceso."""
+
+
+def _nombre_hilo(nombre: str) -> str:
+    # "Thread-12 (process_request_thread)" y "dian-ollama_3" se agrupan
+    return re.sub(r"[-_]\d+", "", nombre)
+
+
+def _marco(codigo) -> str:
+    nombre = getattr(codigo, "co_qualname", codigo.co_name)
+    return f"{nombre} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+def _pila(frame) -> tuple:
+    marcos = []
+    while frame is not None:
+        marcos.append(_marco(frame.f_code))
+        frame = frame.f_back
+    return tuple(reversed(marcos))
+
+
+def muestrear(segundos: float, intervalo_s: float = INTERVALO_S) -> dict:
+    """
+    Muestrea todos los hilos (salvo el que llama) durante `segundos`
+    (máximo SEGUNDOS_MAX). Lanza PerfilEnCurso si ya hay otro muestreo.
+    """
+    segundos = max(0.1, min(float(segundos), SEGUNDOS_MAX))
+    if not _en_curso.acquire(blocking=False):
+        raise PerfilEnCurso("Ya hay un perfil en curso")
+    try:
+        propio = threading.get_ident()
+        pilas: Counter = Counter()
+        nombres = {}
+        muestras = 0
+        inicio = time.perf_counter()
+        limite = inicio + segundos
+        while time.perf_counter() < limite:
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                if ident not in nombres:
+                    nombres.update((h.ident, _nombre_hilo(h.name)) for h in threading.enumerate())
+                pilas[(nombres.get(ident, "?"), _pila(frame))] += 1
+            muestras += 1
+            time.sleep(intervalo_s)
+        duracion = time.perf_counter() - inicio
+    finally:
+        _en_curso.release()
+
+    total = sum(pilas.values()) or 1
+    cima: Counter = Counter()
+    acumulado: Counter = Counter()
+    hilos: Counter = Counter()
+    for (hilo, pila), n in pilas.items():
+        hilos[hilo] += n
+        if pila:
+            cima[pila[-1]] += n
+        for marco in set(pila):
+            acumulado[marco] += n
+
+    def tabla(contador):
+        return [{"funcion": f, "muestras": n, "pct": round(100 * n / total, 2)}
+                for f, n in contador.most_common(TOP)]
+
+    return {
+        "segundos": round(duracion, 3),
+        "intervalo_ms": round(intervalo_s * 1000, 2),
+        "muestras": muestras,
+        "muestras_hilo": total,
+        "hilos": dict(hilos.most_common()),
+        "propio": tabla(cima),
+        "acumulado": tabla(acumulado),
+        "pilas": [{"hilo": hilo, "pila": list(pila), "muestras": n}
+                  for (hilo, pila), n in pilas.most_common()],
+    }
+
+
+def colapsado(perfil: dict) -> str:
+    """Pilas colapsadas, una por línea: "hilo;marco;marco;... muestras"."""
+    return "".join(
+        f"{';'.join([p['hilo'], *p['pila']])} {p['muestras']}\n" for p in perfil["pilas"])
@@ -0,0 +1,212 @@
+"""
+DIAN — dian_trazas.py v0.1
+Trazas ligeras por solicitud: cliente → red → nodo → cola → Ollama.
+
+Implementa:
+  - Tramos (spans) con traza_id / tramo_id / padre, propagados con
+    contextvars dentro del proceso y en el cuerpo JSON entre nodos
+  - Buffer circular de las últimas trazas (Trazador) y exportación JSONL
+    (cada tramo terminado se añade al archivo si hay uno configurado)
+  - desglose(): reparte el tiempo de cada consulta a un nodo entre red,
+    cola, carga del modelo, evaluación del prompt y generación
+
+Uso:
+    from dian_trazas import TRAZADOR, tramo, desglose
+    with tramo("consenso") as raiz:
+        ...                                  # consultas a los nodos
+    print(desglose(raiz["traza"]))
+    TRAZADOR.exportar("trazas.jsonl")
+
+    # Todos los tramos del proceso a un archivo:
+    DIAN_TRAZAS=trazas.jsonl python dian_nodos.py --modo servidor
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+MAX_TRAZAS = 1024
+
+# (traza_id, tramo_id) del tramo en curso en este hilo / tarea asyncio
+_ACTUAL: contextvars.ContextVar = contextvars.ContextVar("dian_traza", default=None)
+
+
+def nuevo_id() -> str:
+    return os.urandom(8).hex()
+
+
+class Trazador:
+    """
+    Buffer circular de las últimas `max_trazas` trazas (traza_id → tramos).
+    archivo: JSONL donde se añade cada tramo al terminar (None: solo memoria).
+    """
+
+    def __init__(self, nodo: str = "", archivo: str = None, max_trazas: int = MAX_TRAZAS):
+        self.nodo = nodo
+        self.archivo = archivo
+        self.max_trazas = max_trazas
+        self._trazas: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, t: dict):
+        with self._lock:
+            tramos = self._trazas.get(t["traza"])
+            if tramos is None:
+                tramos = self._trazas[t["traza"]] = []
+                while len(self._trazas) > self.max_trazas:
+                    self._trazas.popitem(last=False)
+            tramos.append(t)
+            if self.archivo:
+                with open(self.archivo, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(t, ensure_ascii=False) + "\n")
+
+    def importar(self, tramos: list):
+        """Tramos recibidos de otro nodo (respuesta de /inferencia)."""
+        for t in tramos or ():
+            with self._lock:
+                conocidos = {x["tramo"] for x in self._trazas.get(t.get("traza"), ())}
+            if t.get("traza") and t.get("tramo") not in conocidos:
+                self.registrar(t)
+
+    def tramos(self, traza_id: str) -> list:
+        with self._lock:
+            return list(self._trazas.get(traza_id, ()))
+
+    def recientes(self, n: int = 50) -> list:
+        with self._lock:
+            ids = list(self._trazas)[-n:]
+            return [t for i in ids for t in self._trazas[i]]
+
+    def exportar(self, ruta: str, traza_id: str = None) -> int:
+        """Escribe el buffer (o una traza) en JSONL. Retorna los tramos escritos."""
+        with self._lock:
+            ids = [traza_id] if traza_id else list(self._trazas)
+            tramos = [t for i in ids for t in self._trazas.get(i, ())]
+        with open(ruta, "w", encoding="utf-8") as f:
+            for t in tramos:
+                f.write(json.dumps(t, ensure_ascii=False) + "\n")
+        return len(tramos)
+
+
+TRAZADOR = Trazador(archivo=os.environ.get("DIAN_TRAZAS") or None)
+
+
+def actual() -> dict:
+    """{"id", "padre"} del tramo en curso, para enviarlo a otro nodo; o None."""
+    contexto = _ACTUAL.get()
+    return {"id": contexto[0], "padre": contexto[1]} if contexto else None
+
+
+@contextmanager
+def tramo(nombre: str, remoto: dict = None, **atributos):
+    """
+    Mide el bloque como un tramo hijo del actual (o raíz de una traza
+    nueva). remoto: {"id", "padre"} recibido de otro nodo (ver actual()).
+    Cede el dict del tramo: se le pueden añadir atributos.
+    """
+    padre = _ACTUAL.get()
+    if remoto and remoto.get("id"):
+        padre = (str(remoto["id"]), remoto.get("padre"))
+    t = {
+        "traza": padre[0] if padre else nuevo_id(),
+        "tramo": nuevo_id(),
+        "padre": padre[1] if padre else None,
+        "nombre": nombre,
+        "nodo": TRAZADOR.nodo,
+        "inicio": time.time(),
+        "duracion_s": 0.0,
+        "atributos": atributos,
+    }
+    token = _ACTUAL.set((t["traza"], t["tramo"]))
+    inicio = time.perf_counter()
+    try:
+        yield t
+    except BaseException as e:
+        t["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        t["duracion_s"] = round(time.perf_counter() - inicio, 6)
+        _ACTUAL.reset(token)
+        TRAZADOR.registrar(t)
+
+
+def registrar_tramo(nombre: str, inicio: float, duracion_s: float, **atributos):
+    """Tramo ya transcurrido (p.ej. la espera en cola), hijo del actual."""
+    padre = _ACTUAL.get()
+    if padre is None:
+        return
+    TRAZADOR.registrar({
+        "traza": padre[0], "tramo": nuevo_id(), "padre": padre[1],
+        "nombre": nombre, "nodo": TRAZADOR.nodo, "inicio": inicio,
+        "duracion_s": round(duracion_s, 6), "atributos": atributos,
+    })
+
+
+# ─────────────────────────────────────────────
+# DESGLOSE
+# ─────────────────────────────────────────────
+
+def _descendiente(hijos: dict, raiz: str, nombre: str) -> dict:
+    pendientes = list(hijos.get(raiz, ()))
+    while pendientes:
+        t = pendientes.pop()
+        if t["nombre"] == nombre:
+            return t
+        pendientes.extend(hijos.get(t["tramo"], ()))
+    return None
+
+
+def desglose(traza_id: str, tramos: list = None) -> list:
+    """
+    Una fila por consulta a un nodo ("cliente.consultar") de la traza:
+      red        cliente − servidor (WiFi, TLS/TCP, serialización)
+      cola       espera en el LoteadorOllama del nodo
+      carga      load_duration de Ollama (pesos a memoria)
+      prompt     prompt_eval_duration
+      generacion eval_duration
+      otros      resto del servidor y de la llamada HTTP a Ollama
+    Campos None si el nodo no devolvió sus tramos (versión anterior).
+    """
+    tramos = TRAZADOR.tramos(traza_id) if tramos is None else tramos
+    hijos: dict = {}
+    for t in tramos:
+        hijos.setdefault(t["padre"], []).append(t)
+    filas = []
+    for cliente in (t for t in tramos if t["nombre"] == "cliente.consultar"):
+        total = cliente["duracion_s"]
+        servidor = _descendiente(hijos, cliente["tramo"], "servidor.inferencia")
+        fila = {"nodo_id": cliente["atributos"].get("nodo_id"), "total_s": total,
+                "red_s": None, "cola_s": None, "carga_s": None, "prompt_s": None,
+                "generacion_s": None, "otros_s": None, "error": cliente.get("error")}
+        if servidor is not None:
+            cola = _descendiente(hijos, servidor["tramo"], "cola")
+            ollama = _descendiente(hijos, servidor["tramo"], "ollama")
+            a = ollama["atributos"] if ollama else {}
+            fila["red_s"] = max(0.0, total - servidor["duracion_s"])
+            fila["cola_s"] = cola["duracion_s"] if cola else 0.0
+            fila["carga_s"] = a.get("carga_s")
+            fila["prompt_s"] = a.get("prompt_s")
+            fila["generacion_s"] = a.get("generacion_s")
+            medidos = fila["red_s"] + fila["cola_s"] + sum(
+                a.get(c) or 0.0 for c in ("carga_s", "prompt_s", "generacion_s"))
+            fila["otros_s"] = max(0.0, total - medidos)
+        filas.append({k: round(v, 4) if isinstance(v, float) else v
+                      for k, v in fila.items()})
+    return filas
+
+
+def imprimir_desglose(filas: list):
+    columnas = ("total_s", "red_s", "cola_s", "carga_s", "prompt_s", "generacion_s", "otros_s")
+    print(f"  {'NODO':<24}" + "".join(f"{c[:-2].upper():>11}" for c in columnas))
+    for fila in filas:
+        celdas = "".join(f"{'—' if fila[c] is None else f'{fila[c]:.2f}s':>11}"
+                         for c in columnas)
+        print(f"  {str(fila['nodo_id'])[:24]:<24}{celdas}")
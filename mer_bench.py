@@ -0,0 +1,541 @@
+"""
+DIAN — mer_bench.py v0.1
+Benchmarks de MER v0.2 sin Ollama ni hardware real.
+
+Implementa:
+  - Generador sintético de grafos MER (conceptos, triggers, episodios)
+  - Codec de semillas: texto (JSON) vs binario — tamaño y throughput
+  - Verificación de round-trip binario ↔ texto
+  - Extracción de conceptos: embeddings por oración vs TF-IDF local
+  - Selección de triggers: v0.2 (cuadrática) vs lineal, en transcripciones largas
+  - Micro-benchmarks de 1k a 1M conceptos (embedding falso determinista):
+    encode, recall, export/import y memoria, con línea base JSON y
+    detección de regresiones
+
+Uso:
+    python mer_bench.py --conceptos 100000
+    python mer_bench.py --conceptos 10000 --embeddings 768
+    python mer_bench.py --bench extraccion --latencia-embedding 25
+    python mer_bench.py --bench triggers --kb 100
+    python mer_bench.py --bench micro --guardar mer_base.json
+    python mer_bench.py --bench micro --escalas 1000,1000000 --comparar mer_base.json
+
+Autor: Federico Araya Villalta
+Repositorio: https://github.com/Fearvi/DIAN
+Licencia: Apache 2.0
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import platform
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+
+def cargar_mer():
+    """Carga MER_v0.2.py como módulo (el nombre del archivo no es importable)."""
+    ruta = Path(__file__).with_name("MER_v0.2.py")
+    spec = importlib.util.spec_from_file_location("mer_v02", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+mer = cargar_mer()
+
+
+# ─────────────────────────────────────────────
+# GENERADOR SINTÉTICO
+# ─────────────────────────────────────────────
+
+PALABRAS = ("nodo soberano atribución hash consenso memoria semilla protocolo "
+            "privacidad distribuido conocimiento inferencia modelo local red "
+            "humano trazabilidad verificable episodio concepto").split()
+
+
+def generar_sistema(n_conceptos: int, dim_embedding: int = 0,
+                    semilla: int = 42) -> "mer.EmergentMemorySystem":
+    """Construye un EmergentMemorySystem sintético de n_conceptos."""
+    rng = random.Random(semilla)
+    sistema = mer.EmergentMemorySystem(nodo_id="nodo-bench")
+    ids = [hashlib.sha256(f"c{i}".encode()).hexdigest() for i in range(n_conceptos)]
+
+    for i, cid in enumerate(ids):
+        essence = " ".join(rng.choice(PALABRAS) for _ in range(8))[:80]
+        nodo = mer.ConceptNode(cid, essence, rng.uniform(-1, 1))
+        for _ in range(rng.randint(1, 6)):
+            nodo.connections[ids[rng.randrange(n_conceptos)]] = rng.random()
+        if dim_embedding:
+            nodo.embedding = np.random.default_rng(i).standard_normal(
+                dim_embedding).astype(np.float32).tolist()
+        sistema.concept_graph[cid] = nodo
+
+    for i in range(max(1, n_conceptos // 20)):
+        episodio = mer.MemoryEpisode(
+            hashlib.sha256(f"e{i}".encode()).hexdigest()[:16],
+            1772000000.0 + i,
+            hashlib.sha256(f"a{i}".encode()).hexdigest() if i % 2 else None,
+        )
+        episodio.concept_nodes = [ids[rng.randrange(n_conceptos)] for _ in range(10)]
+        episodio.compute_signature(sistema.concept_graph)
+        sistema.episodes.append(episodio)
+
+        token = " ".join(rng.choice(PALABRAS) for _ in range(3))[:50] + f" {i}"
+        sistema.trigger_tokens[token] = mer.TriggerToken(
+            token, episodio.concept_nodes[:5],
+            hashlib.sha256(token.encode()).hexdigest(),
+        )
+    return sistema
+
+
+def embedding_falso(texto: str, dim: int = 768, latencia_s: float = 0.0) -> list:
+    """Embedding determinista (semilla = sha256 del texto), sin Ollama."""
+    if latencia_s:
+        time.sleep(latencia_s)
+    semilla = int.from_bytes(hashlib.sha256(texto.encode()).digest()[:8], "little")
+    vec = np.random.default_rng(semilla).standard_normal(dim).astype(np.float32)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def corpus_dian(fragmento: int = 2000) -> list:
+    """
+    Corpus de conversaciones DIAN a partir de la documentación del repo:
+    cada documento completo más fragmentos de ~fragmento caracteres.
+    """
+    raiz = Path(__file__).parent
+    textos = []
+    for ruta in sorted([*raiz.glob("*.md"), *raiz.glob("docs/*.md")]):
+        texto = re.sub(r"[#*`>|_\-]+", " ", ruta.read_text(encoding="utf-8"))
+        texto = re.sub(r"\s+", " ", texto).strip()
+        if not texto:
+            continue
+        textos.append(texto)
+        textos.extend(texto[i:i + fragmento] for i in range(0, len(texto), fragmento))
+    return textos
+
+
+def _huella(sistema) -> tuple:
+    """Contenido reconstruido comparable entre formatos (-0.0 == 0.0)."""
+    conceptos = [
+        (n.concept_id, n.essence, n.valence, sorted(n.connections.items()))
+        for n in sistema.concept_graph.values()
+    ]
+    triggers = [
+        (t.token, [c for c in t.linked_concepts if c], t.context_hash)
+        for t in sistema.trigger_tokens.values()
+    ]
+    episodios = [
+        (e.episode_id, e.timestamp, e.emotional_signature, e.complexity_score,
+         e.concept_nodes, e.dian_attribution_hash)
+        for e in sistema.episodes
+    ]
+    return conceptos, triggers, episodios
+
+
+def _cronometrar(funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcion(*args, **kwargs)
+    return resultado, time.perf_counter() - inicio
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: CODEC DE SEMILLAS
+# ─────────────────────────────────────────────
+
+def bench_codec(n_conceptos: int, dim_embedding: int = 0) -> dict:
+    """Compara semillas de texto (JSON) y binarias: tamaño y throughput."""
+    sistema = generar_sistema(n_conceptos, dim_embedding)
+    con_emb = dim_embedding > 0
+
+    texto, t_enc_texto = _cronometrar(sistema.export_memory_seeds, con_emb)
+    binario, t_enc_bin = _cronometrar(
+        sistema.export_memory_seeds_binary, con_emb, "int8")
+
+    desde_texto = mer.EmergentMemorySystem()
+    _, t_dec_texto = _cronometrar(desde_texto.import_memory_seeds, texto)
+    desde_bin = mer.EmergentMemorySystem()
+    _, t_dec_bin = _cronometrar(desde_bin.import_memory_seeds_binary, binario)
+
+    resultado = {
+        "conceptos": n_conceptos,
+        "dim_embedding": dim_embedding,
+        "bytes_texto": len(texto.encode("utf-8")),
+        "bytes_binario": len(binario),
+        "encode_texto_s": round(t_enc_texto, 4),
+        "encode_binario_s": round(t_enc_bin, 4),
+        "decode_texto_s": round(t_dec_texto, 4),
+        "decode_binario_s": round(t_dec_bin, 4),
+        "roundtrip_ok": _huella(desde_texto) == _huella(desde_bin),
+    }
+    if con_emb:
+        # Referencia: los mismos embeddings como listas JSON de float
+        resultado["bytes_embeddings_json"] = len(json.dumps(
+            [n.embedding for n in sistema.concept_graph.values()]))
+    resultado["ratio_tamano"] = round(
+        resultado["bytes_texto"] / max(resultado["bytes_binario"], 1), 2)
+    return resultado
+
+
+def imprimir_codec(r: dict):
+    print(f"\n{'='*55}")
+    print(f"  MER — Codec de semillas ({r['conceptos']} conceptos)")
+    print(f"{'='*55}")
+    print(f"  Texto:    {r['bytes_texto']/1024:>10.1f} KB  "
+          f"enc {r['encode_texto_s']:.3f}s  dec {r['decode_texto_s']:.3f}s")
+    print(f"  Binario:  {r['bytes_binario']/1024:>10.1f} KB  "
+          f"enc {r['encode_binario_s']:.3f}s  dec {r['decode_binario_s']:.3f}s")
+    print(f"  Reducción: {r['ratio_tamano']}×")
+    if "bytes_embeddings_json" in r:
+        print(f"  Embeddings JSON float: {r['bytes_embeddings_json']/1024:.1f} KB "
+              f"(la semilla de texto no los incluye)")
+    print(f"  Round-trip texto ↔ binario: {'✅' if r['roundtrip_ok'] else '❌'}")
+    print(f"{'='*55}\n")
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: EXTRACCIÓN DE CONCEPTOS
+# ─────────────────────────────────────────────
+
+def bench_extraccion(latencia_s: float = 0.02, dim: int = 768) -> dict:
+    """
+    Recorre el corpus DIAN con cada modo de extracción usando un embedding
+    falso con latencia fija (simula nomic-embed-text en CPU). Mide la parte
+    de conceptos de encode_conversation: extracción + embedding de cada
+    concepto nuevo (los triggers se miden aparte).
+    Solapamiento = Jaccard medio de las esencias extraídas por texto.
+    """
+    corpus = corpus_dian()
+    resultado = {"textos": len(corpus), "bytes": sum(len(t) for t in corpus),
+                 "latencia_embedding_s": latencia_s}
+
+    esencias = {}
+    for modo in ("embedding", "local"):
+        sistema = mer.EmergentMemorySystem(concept_extraction=modo)
+        llamadas = [0]
+
+        def embedding(texto, _llamadas=llamadas):
+            _llamadas[0] += 1
+            return embedding_falso(texto, dim, latencia_s)
+
+        sistema._get_embedding = embedding
+        vistos = set()
+
+        def procesar(texto):
+            conceptos = sistema._extract_key_concepts(texto)
+            for essence, concept_id in conceptos:
+                if concept_id not in vistos:
+                    vistos.add(concept_id)
+                    sistema._get_embedding(essence)
+            return {essence for essence, _ in conceptos}
+
+        esencias[modo], segundos = _cronometrar(lambda: [procesar(t) for t in corpus])
+        resultado[modo] = {
+            "segundos": round(segundos, 3),
+            "textos_por_s": round(len(corpus) / max(segundos, 1e-9), 2),
+            "embeddings": llamadas[0],
+            "conceptos": len(vistos),
+        }
+
+    jaccard = []
+    for actuales, locales in zip(esencias["embedding"], esencias["local"]):
+        union = actuales | locales
+        jaccard.append(len(actuales & locales) / len(union) if union else 1.0)
+    resultado["solapamiento_jaccard"] = round(float(np.mean(jaccard)), 4)
+    resultado["aceleracion"] = round(
+        resultado["embedding"]["segundos"]
+        / max(resultado["local"]["segundos"], 1e-9), 2)
+    return resultado
+
+
+def imprimir_extraccion(r: dict):
+    print(f"\n{'='*55}")
+    print(f"  MER — Extracción de conceptos ({r['textos']} textos, "
+          f"{r['bytes']/1024:.0f} KB)")
+    print(f"{'='*55}")
+    for modo in ("embedding", "local"):
+        m = r[modo]
+        print(f"  {modo:<10} {m['segundos']:>8.3f}s  ({m['textos_por_s']} textos/s)  "
+              f"embeddings: {m['embeddings']}  conceptos: {m['conceptos']}")
+    print(f"  Aceleración: {r['aceleracion']}×")
+    print(f"  Solapamiento de conceptos (Jaccard): {r['solapamiento_jaccard']:.2%}")
+    print(f"{'='*55}\n")
+
+
+# ─────────────────────────────────────────────
+# BENCHMARK: SELECCIÓN DE TRIGGERS
+# ─────────────────────────────────────────────
+
+def _identify_triggers_v02(text: str, episode, get_embedding) -> list:
+    """Implementación v0.2 original, como referencia."""
+    triggers = []
+    words = text.split()
+    for i in range(len(words) - 2):
+        phrase = " ".join(words[i:i + 3])
+        if len(phrase) > 15 and text.count(phrase) <= 2:
+            context_hash = hashlib.sha256(text.encode()).hexdigest()
+            embedding = get_embedding(phrase)
+            triggers.append(mer.TriggerToken(
+                token=phrase[:50],
+                linked_concepts=episode.concept_nodes[:5],
+                context_hash=context_hash,
+                embedding=embedding
+            ))
+    return triggers[:5]
+
+
+def transcripcion(kb: int) -> str:
+    """Transcripción sintética de ~kb KB a partir del corpus DIAN."""
+    base = " ".join(corpus_dian(fragmento=10 ** 9))
+    return (base * (kb * 1024 // max(len(base), 1) + 1))[:kb * 1024]
+
+
+def bench_triggers(kb: int = 100) -> dict:
+    texto = transcripcion(kb)
+    episodio = mer.MemoryEpisode("bench", 0.0)
+    llamadas = {"v02": 0, "lineal": 0}
+
+    def contar(clave):
+        def embedding(frase):
+            llamadas[clave] += 1
+            return None
+        return embedding
+
+    sistema = mer.EmergentMemorySystem()
+    sistema._get_embedding = contar("lineal")
+    viejos, t_v02 = _cronometrar(_identify_triggers_v02, texto, episodio, contar("v02"))
+    nuevos, t_lineal = _cronometrar(sistema._identify_triggers, texto, episodio)
+    return {
+        "kb": kb,
+        "palabras": len(texto.split()),
+        "v02_s": round(t_v02, 4),
+        "lineal_s": round(t_lineal, 4),
+        "aceleracion": round(t_v02 / max(t_lineal, 1e-9), 1),
+        "embeddings_v02": llamadas["v02"],
+        "embeddings_lineal": llamadas["lineal"],
+        "triggers_v02": [t.token for t in viejos],
+        "triggers_lineal": [t.token for t in nuevos],
+    }
+
+
+def imprimir_triggers(r: dict):
+    print(f"\n{'='*55}")
+    print(f"  MER — Selección de triggers ({r['kb']} KB, {r['palabras']} palabras)")
+    print(f"{'='*55}")
+    print(f"  v0.2:   {r['v02_s']:>8.4f}s  embeddings: {r['embeddings_v02']}")
+    print(f"  Lineal: {r['lineal_s']:>8.4f}s  embeddings: {r['embeddings_lineal']}")
+    print(f"  Aceleración: {r['aceleracion']}×")
+    for token in r["triggers_lineal"]:
+        print(f"    · {token}")
+    print(f"{'='*55}\n")
+
+
+# ─────────────────────────────────────────────
+# MICRO-BENCHMARKS Y REGRESIONES
+# ─────────────────────────────────────────────
+
+ESCALAS_MICRO = (1_000, 10_000, 100_000)   # 1_000_000 con --escalas
+DIM_MICRO = 64
+
+# Métricas comparadas contra la línea base: más alto = peor
+METRICAS_MICRO = ("generar_s", "bytes_por_concepto", "encode_ms", "recall_ms",
+                  "export_texto_s", "export_binario_s", "import_texto_s",
+                  "import_binario_s")
+
+
+def _mejor_de(repeticiones: int, funcion, *args) -> tuple:
+    """(resultado, menor tiempo) de `repeticiones` ejecuciones."""
+    mejor = None
+    for _ in range(max(1, repeticiones)):
+        resultado, segundos = _cronometrar(funcion, *args)
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return resultado, mejor
+
+
+def _mediana_por_llamada(funcion, argumentos: list) -> tuple:
+    """(resultados, mediana en s) de funcion(a) para cada a."""
+    medidas = [_cronometrar(funcion, a) for a in argumentos]
+    tiempos = sorted(t for _, t in medidas)
+    return [r for r, _ in medidas], tiempos[len(tiempos) // 2] if tiempos else 0.0
+
+
+def bench_micro(n_conceptos: int, dim: int = DIM_MICRO, encodes: int = 20,
+                recalls: int = 20, repeticiones: int = 3, semilla: int = 42) -> dict:
+    """
+    Caminos calientes de MER sobre un grafo sintético de n_conceptos, con
+    embedding_falso de `dim` (determinista, sin Ollama):
+
+      encode  encode_conversation de textos del corpus DIAN (extracción,
+              _identify_triggers, compute_signature)
+      recall  reconstruct_from_trigger: should_activate sobre todos los
+              triggers y _synthesize_narrative
+      export / import de semillas de texto y binarias
+      memoria bytes asignados al construir el grafo (tracemalloc)
+
+    encode y recall: mediana por llamada; export / import: el mejor de
+    `repeticiones`, para que la comparación con la línea base no salte
+    con el ruido de la máquina.
+    """
+    tracemalloc.start()
+    sistema, t_generar = _cronometrar(generar_sistema, n_conceptos, 0, semilla)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    def embedding(texto):
+        return embedding_falso(texto, dim)
+
+    sistema._get_embedding = embedding
+    for trigger in sistema.trigger_tokens.values():
+        trigger.embedding = embedding(trigger.token)
+
+    corpus = corpus_dian()
+    textos = [corpus[i % len(corpus)] for i in range(encodes)]
+    rng = random.Random(semilla)
+    tokens = rng.sample(sorted(sistema.trigger_tokens), min(recalls, len(sistema.trigger_tokens)))
+
+    _, t_encode = _mediana_por_llamada(sistema.encode_conversation, textos)
+    recuerdos, t_recall = _mediana_por_llamada(sistema.reconstruct_from_trigger, tokens)
+
+    texto, t_exp_texto = _mejor_de(repeticiones, sistema.export_memory_seeds)
+    binario, t_exp_binario = _mejor_de(repeticiones, sistema.export_memory_seeds_binary)
+    _, t_imp_texto = _mejor_de(
+        repeticiones, lambda: mer.EmergentMemorySystem().import_memory_seeds(texto))
+    _, t_imp_binario = _mejor_de(
+        repeticiones, lambda: mer.EmergentMemorySystem().import_memory_seeds_binary(binario))
+
+    return {
+        "conceptos": n_conceptos,
+        "triggers": len(sistema.trigger_tokens),
+        "dim_embedding": dim,
+        "generar_s": round(t_generar, 4),
+        "memoria_mb": round(memoria / 2 ** 20, 1),
+        "bytes_por_concepto": round(memoria / n_conceptos),
+        "encode_ms": round(1000 * t_encode, 3),
+        "recall_ms": round(1000 * t_recall, 3),
+        "recall_activados": sum(r is not None for r in recuerdos),
+        "export_texto_s": round(t_exp_texto, 4),
+        "export_binario_s": round(t_exp_binario, 4),
+        "import_texto_s": round(t_imp_texto, 4),
+        "import_binario_s": round(t_imp_binario, 4),
+        "bytes_texto": len(texto.encode("utf-8")),
+        "bytes_binario": len(binario),
+    }
+
+
+def bench_micro_escalas(escalas: tuple = ESCALAS_MICRO, dim: int = DIM_MICRO,
+                        repeticiones: int = 3) -> dict:
+    return {
+        "version": 1,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {"python": platform.python_version(), "numpy": np.__version__,
+                    "plataforma": platform.platform()},
+        "repeticiones": repeticiones,
+        "escalas": {str(n): bench_micro(n, dim, repeticiones=repeticiones) for n in escalas},
+    }
+
+
+def imprimir_micro(r: dict):
+    print(f"\n{'='*92}")
+    print(f"  MER — Micro-benchmarks (embedding falso, dim {DIM_MICRO})")
+    print(f"{'='*92}")
+    print(f"  {'conceptos':>10} {'MB':>8} {'B/conc':>7} {'encode ms':>10} {'recall ms':>10} "
+          f"{'exp txt s':>10} {'exp bin s':>10} {'imp txt s':>10} {'imp bin s':>10}")
+    for m in r["escalas"].values():
+        print(f"  {m['conceptos']:>10} {m['memoria_mb']:>8} {m['bytes_por_concepto']:>7} "
+              f"{m['encode_ms']:>10} {m['recall_ms']:>10} {m['export_texto_s']:>10} "
+              f"{m['export_binario_s']:>10} {m['import_texto_s']:>10} "
+              f"{m['import_binario_s']:>10}")
+    print(f"{'='*92}\n")
+
+
+def comparar_micro(base: dict, actual: dict, umbral: float = 0.25,
+                   minimo_ms: float = 1.0) -> list:
+    """
+    Regresiones de `actual` frente a `base` en las escalas comunes: métricas
+    de METRICAS_MICRO que empeoran más de `umbral`. Las diferencias de
+    tiempo menores que `minimo_ms` se ignoran (ruido en escalas pequeñas).
+    Retorna [(escala, métrica, base, actual)].
+    """
+    regresiones = []
+    for escala, m in actual["escalas"].items():
+        b = base.get("escalas", {}).get(escala)
+        if not b:
+            continue
+        for metrica in METRICAS_MICRO:
+            antes, ahora = b.get(metrica), m.get(metrica)
+            if not antes or ahora is None or ahora <= antes * (1 + umbral):
+                continue
+            diferencia_ms = (ahora - antes) * (1000 if metrica.endswith("_s") else 1)
+            if metrica != "bytes_por_concepto" and diferencia_ms < minimo_ms:
+                continue
+            regresiones.append((escala, metrica, antes, ahora))
+    return regresiones
+
+
+def imprimir_regresiones(regresiones: list, umbral: float):
+    if not regresiones:
+        print(f"  Sin regresiones frente a la línea base (umbral {umbral:.0%})\n")
+        return
+    print(f"  REGRESIONES (umbral {umbral:.0%}):")
+    for escala, metrica, antes, ahora in regresiones:
+        print(f"    {escala:>10} {metrica:<20} {antes} → {ahora} "
+              f"({ahora / antes - 1:+.0%})")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MER v0.2 — Benchmarks')
+    parser.add_argument('--bench', choices=['codec', 'extraccion', 'triggers', 'micro', 'todos'],
+                        default='todos', help='Benchmark a ejecutar')
+    parser.add_argument('--conceptos', type=int, default=10000,
+                        help='Número de conceptos sintéticos')
+    parser.add_argument('--embeddings', type=int, default=0,
+                        help='Dimensión de embeddings sintéticos (0 = sin)')
+    parser.add_argument('--latencia-embedding', type=float, default=20.0,
+                        help='Latencia simulada por embedding en ms')
+    parser.add_argument('--kb', type=int, default=100,
+                        help='Tamaño de la transcripción para triggers (KB)')
+    parser.add_argument('--escalas', type=str,
+                        default=','.join(str(n) for n in ESCALAS_MICRO),
+                        help='Conceptos por escala del micro-benchmark (p.ej. 1000,1000000)')
+    parser.add_argument('--repeticiones', type=int, default=3,
+                        help='Micro: repeticiones de export/import (se toma la mejor)')
+    parser.add_argument('--guardar', type=str, default='',
+                        help='Guardar el resultado de micro como JSON (línea base)')
+    parser.add_argument('--comparar', type=str, default='',
+                        help='Línea base JSON: informa regresiones y sale con código 1')
+    parser.add_argument('--umbral', type=float, default=0.25,
+                        help='Empeoramiento relativo tolerado frente a la línea base')
+    args = parser.parse_args()
+
+    if args.bench in ('codec', 'todos'):
+        imprimir_codec(bench_codec(args.conceptos, args.embeddings))
+    if args.bench in ('extraccion', 'todos'):
+        imprimir_extraccion(bench_extraccion(args.latencia_embedding / 1000))
+    if args.bench in ('triggers', 'todos'):
+        imprimir_triggers(bench_triggers(args.kb))
+    if args.bench in ('micro', 'todos'):
+        escalas = tuple(int(n) for n in args.escalas.split(',') if n)
+        r = bench_micro_escalas(escalas, repeticiones=args.repeticiones)
+        imprimir_micro(r)
+        if args.guardar:
+            Path(args.guardar).write_text(json.dumps(r, indent=2), encoding="utf-8")
+            print(f"  Línea base guardada: {args.guardar}")
+        if args.comparar:
+            base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))
+            regresiones = comparar_micro(base, r, args.umbral)
+            imprimir_regresiones(regresiones, args.umbral)
+            if regresiones:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()